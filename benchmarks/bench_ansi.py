@@ -0,0 +1,9 @@
+"""
+`sformat` with and without styles applied.
+"""
+from devtools import sformat
+
+
+def bench_sformat(bench):
+    bench(sformat, 'hello world', sformat.red, sformat.bold, name_='sformat')
+    bench(sformat, 'hello world', sformat.red, apply=False, name_='sformat_no_apply')
@@ -0,0 +1,57 @@
+"""
+`debug()` calls: the first call from a call site, which has to find and parse its source, repeat calls and calls
+suppressed by sampling.
+"""
+import linecache
+from io import StringIO
+from itertools import count
+
+from devtools import Debug
+
+debug = Debug(highlight=False)
+debug_highlight = Debug(highlight=True)
+out = StringIO()
+value = {'a': [1, 2, 3], 'b': {'c': 'd' * 50}, 'e': list(range(20))}
+call_sites = count()
+
+
+def repeat_call():
+    debug(value, file_=out)
+    out.seek(0)
+    out.truncate()
+
+
+def repeat_call_highlight():
+    debug_highlight(value, file_=out)
+    out.seek(0)
+    out.truncate()
+
+
+def suppressed_call():
+    # only the first call is printed
+    debug.once()(value, file_=out)
+
+
+def process():
+    debug._process((value,), {}, 1)
+
+
+def first_call():
+    # a new file each time, so nothing about the call site is cached
+    filename = f'<debug-first-call-{next(call_sites)}>'
+    source = 'def f(debug, value, out):\n    debug(value, file_=out)\n'
+    linecache.cache[filename] = len(source), None, source.splitlines(True), filename
+    namespace: dict = {}
+    exec(compile(source, filename, 'exec'), namespace)
+    namespace['f'](debug, value, out)
+    del linecache.cache[filename]
+    out.seek(0)
+    out.truncate()
+
+
+def bench_debug(bench):
+    bench(first_call, name_='first_call', duration_=0.5)
+    bench(repeat_call, name_='repeat_call')
+    bench(repeat_call_highlight, name_='repeat_call_highlight')
+    bench(suppressed_call, name_='suppressed_call')
+    bench(process, name_='process')
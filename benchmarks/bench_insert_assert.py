@@ -0,0 +1,47 @@
+"""
+insert_assert() on a heavily parametrised test module, where the same call site is hit once per case.
+"""
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from devtools import pytest_plugin
+
+CASES = 500
+
+# language=Python
+test_module = f"""\
+import pytest
+
+
+@pytest.mark.parametrize('x', range({CASES}))
+def test_param(x, insert_assert):
+    insert_assert({{'x': x, 'items': [x] * 5, 'name': f'case {{x}}'}})
+"""
+
+
+def run_module(directory: Path) -> None:
+    # pytest's output is noise here
+    with redirect_stdout(StringIO()):
+        code = pytest.main(
+            [str(directory), '-q', '-p', 'devtools.pytest_plugin', '-p', 'no:cacheprovider', '--insert-assert-print']
+        )
+    assert code == 0, code
+
+
+def single_call_site() -> None:
+    pytest_plugin.insert_assert({'x': 1, 'items': [1] * 5, 'name': 'case 1'})
+    pytest_plugin.to_replace.clear()
+
+
+def bench_call_site(bench):
+    bench(single_call_site, name_='call_site')
+
+
+def bench_parametrised(bench):
+    with tempfile.TemporaryDirectory() as d:
+        Path(d, 'test_param.py').write_text(test_module)
+        bench(run_module, Path(d), name_=f'parametrised_{CASES}', rounds_=5, warmup_=1, duration_=5)
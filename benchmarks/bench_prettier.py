@@ -0,0 +1,71 @@
+"""
+`PrettyFormat` on realistic payloads, with and without highlighting.
+"""
+from dataclasses import dataclass
+from typing import List
+
+from devtools import pformat
+
+wide_dict = {f'key_{i}': {'id': i, 'name': f'item {i}', 'score': i / 7, 'active': i % 2 == 0} for i in range(200)}
+
+
+def nested(depth: int) -> dict:
+    value: dict = {'leaf': [1, 2, 3]}
+    for i in range(depth):
+        value = {f'level_{i}': value, 'siblings': [i, str(i), None]}
+    return value
+
+
+deep = nested(50)
+long_string = 'lorem ipsum dolor sit amet ' * 2000
+long_lines = '\n'.join(f'line {i}: ' + 'x' * 80 for i in range(500))
+long_bytes = bytes(range(256)) * 100
+
+
+@dataclass
+class Address:
+    street: str
+    city: str
+    postcode: str
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    emails: List[str]
+    addresses: List[Address]
+
+
+users = [
+    User(i, f'user {i}', [f'u{i}@example.com', f'user.{i}@example.org'], [Address(f'{i} High St', 'London', 'N1 1AA')])
+    for i in range(200)
+]
+
+
+def generator():
+    return (i * i for i in range(1000))
+
+
+def bench_wide_dict(bench):
+    bench(pformat, wide_dict, name_='wide_dict')
+    bench(pformat, wide_dict, highlight=True, name_='wide_dict_highlight')
+
+
+def bench_deep(bench):
+    bench(pformat, deep, name_='deep')
+
+
+def bench_strings(bench):
+    bench(pformat, long_string, name_='long_string')
+    bench(pformat, long_lines, name_='long_lines')
+    bench(pformat, long_bytes, name_='long_bytes')
+
+
+def bench_dataclasses(bench):
+    bench(pformat, users, name_='dataclasses')
+    bench(pformat, users, highlight=True, name_='dataclasses_highlight')
+
+
+def bench_generator(bench):
+    bench(lambda: pformat(generator()), name_='generator')
@@ -0,0 +1,37 @@
+"""
+Overhead of timing blocks with `Timer` and `debug.timer`.
+"""
+from devtools import Timer
+from devtools.timer import TimerRegistry
+
+timer = Timer(verbose=False)
+streaming = Timer(verbose=False, streaming=True)
+registry = TimerRegistry()
+
+
+def with_timer():
+    with timer:
+        pass
+    timer._local.buffer.results.clear()
+
+
+def with_streaming():
+    with streaming:
+        pass
+
+
+def with_span():
+    with registry.span('span'):
+        pass
+
+
+@registry.measure('measured')
+def measured():
+    pass
+
+
+def bench_timer(bench):
+    bench(with_timer, name_='timer')
+    bench(with_streaming, name_='streaming')
+    bench(with_span, name_='span')
+    bench(measured, name_='measure')
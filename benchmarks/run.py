@@ -0,0 +1,107 @@
+"""
+Run the benchmarks in `benchmarks/bench_*.py` and compare them with a previous run, see `make benchmark`.
+
+Each module defines `bench_*` functions taking a `bench(func, *args, name_=None, **kwargs)` callable with the same
+signature as the `devtools_bench` pytest fixture. Results are saved as timer baselines in
+`benchmarks/results/<python version>/<commit>.json` and compared with the previous run on the same Python version,
+or the run for `--compare <commit>`. The exit code is 1 if any benchmark got significantly slower by more than
+`--threshold`.
+"""
+import argparse
+import fnmatch
+import importlib
+import subprocess
+import sys
+from pathlib import Path
+
+from devtools import Timer
+from devtools.baseline import compare, format_comparisons, load, save
+from devtools.timer import TimerStats
+from devtools.utils import use_highlight
+
+BENCH_DIR = Path(__file__).parent
+RESULTS_DIR = BENCH_DIR / 'results'
+
+
+def git_commit(ref: str = 'HEAD') -> str:
+    commit = subprocess.run(
+        ['git', 'rev-parse', '--short', ref], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    if ref == 'HEAD':
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BENCH_DIR, capture_output=True, text=True
+        ).stdout
+        if status.strip():
+            commit += '-dirty'
+    return commit
+
+
+def results_dir() -> Path:
+    return RESULTS_DIR / f'py{sys.version_info[0]}.{sys.version_info[1]}'
+
+
+def run(pattern: str, duration: float) -> 'dict[str, TimerStats]':
+    results: 'dict[str, TimerStats]' = {}
+
+    def bench(f, *args, name_=None, **kwargs):
+        name = f'{module_name}.{name_ or f.__name__}'
+        if not fnmatch.fnmatch(name, pattern):
+            return None
+        kwargs.setdefault('duration_', duration)
+        result = Timer(name, verbose=False).bench(f, *args, **kwargs)
+        print(result, flush=True)
+        results[name] = result.stats
+        return result
+
+    for path in sorted(BENCH_DIR.glob('bench_*.py')):
+        module_name = path.stem[len('bench_') :]
+        module = importlib.import_module(path.stem)
+        for attr, func in vars(module).items():
+            if attr.startswith('bench_') and callable(func):
+                func(bench)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('pattern', nargs='?', default='*', help='only run benchmarks matching this glob')
+    parser.add_argument('--duration', type=float, default=1.0, help='target time in seconds for each benchmark')
+    parser.add_argument('--compare', metavar='COMMIT', help='compare with the results for this commit')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown which fails, default 0.1 (10%%)')
+    parser.add_argument('--no-save', action='store_true', help="don't save the results")
+    args = parser.parse_args()
+
+    directory = results_dir()
+    if args.compare:
+        previous: 'Path | None' = directory / f'{git_commit(args.compare)}.json'
+        if not previous.exists():
+            print(f'no results for {args.compare} in {directory}')
+            return 1
+    else:
+        previous_runs = sorted(directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        previous = previous_runs[-1] if previous_runs else None
+    # loaded before running since the previous run may be for the same commit and get overwritten
+    old = load(previous) if previous is not None else None
+
+    results = run(args.pattern, args.duration)
+    if not args.no_save:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{git_commit()}.json'
+        # keep results for benchmarks which weren't run this time
+        saved = load(path) if path.exists() else {}
+        saved.update(results)
+        save(saved, path)
+        print(f'results saved to {path}')
+
+    if previous is None or old is None:
+        return 0
+    print(f'\ncompared with {previous.stem}:')
+    old = {name: stats for name, stats in old.items() if fnmatch.fnmatch(name, args.pattern)}
+    comparisons = compare(old, results)
+    print(format_comparisons(comparisons, highlight=use_highlight()))
+    regressed = [c for c in comparisons if c.regressed(args.threshold)]
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,58 @@
-from .ansi import sformat, sprint
-from .debug import Debug, debug
-from .prettier import PrettyFormat, pformat, pprint
-from .timer import Timer
+import sys
+
 from .version import VERSION
 
 __version__ = VERSION
 
 __all__ = 'sformat', 'sprint', 'Debug', 'debug', 'PrettyFormat', 'pformat', 'pprint', 'Timer', 'VERSION'
+
+MYPY = False
+if MYPY:
+    from typing import Any, List
+
+    from .ansi import sformat, sprint
+    from .debug import Debug, debug
+    from .prettier import PrettyFormat, pformat, pprint
+    from .timer import Timer
+
+# submodules are only imported when one of their names is first used so `import devtools` stays cheap, e.g. when
+# it's installed in sitecustomize
+_lazy_imports = {
+    'sformat': 'ansi',
+    'sprint': 'ansi',
+    'Debug': 'debug',
+    'debug': 'debug',
+    'PrettyFormat': 'prettier',
+    'pformat': 'prettier',
+    'pprint': 'prettier',
+    'Timer': 'timer',
+}
+
+
+def __getattr__(name: str) -> 'Any':
+    module_name = _lazy_imports.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    __import__(f'{__name__}.{module_name}')
+    value = getattr(sys.modules[f'{__name__}.{module_name}'], name)
+    setattr(sys.modules[__name__], name, value)
+    return value
+
+
+def __dir__() -> 'List[str]':
+    return sorted(set(globals()) | set(_lazy_imports))
+
+
+# avoid importing `types`
+ModuleType = type(sys)
+
+
+class _Package(ModuleType):  # type: ignore[valid-type,misc]
+    def __setattr__(self, name: str, value: 'Any') -> None:
+        # importing the `devtools.debug` submodule binds it to `devtools.debug`, which should be the `debug` instance
+        if name == 'debug' and isinstance(value, ModuleType) and value.__name__ == f'{__name__}.debug':
+            value = value.debug
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -4,6 +4,10 @@ from pathlib import Path
 
 from .version import VERSION
 
+MYPY = False
+if MYPY:
+    from typing import List
+
 # language=python
 install_code = """
 # add devtools `debug` function to builtins
@@ -74,11 +78,46 @@ def install() -> int:
     return 0
 
 
+def compare(args: 'List[str]') -> int:
+    """
+    Compare two timer baselines saved with `Timer.save()`, returns 1 if anything got significantly slower by more
+    than the threshold, set with `--threshold=0.2` for 20%, default 10%.
+    """
+    from .baseline import compare as compare_stats
+    from .baseline import format_comparisons, load
+    from .utils import use_highlight
+
+    threshold = 0.1
+    paths = []
+    for arg in args:
+        if arg.startswith('--threshold='):
+            try:
+                threshold = float(arg.split('=', 1)[1])
+            except ValueError:
+                print(f'invalid threshold {arg!r}')
+                return 1
+        else:
+            paths.append(arg)
+    if len(paths) != 2:
+        print('usage: `python -m devtools compare <old baseline> <new baseline> [--threshold=0.1]`')
+        return 1
+    try:
+        old, new = load(paths[0]), load(paths[1])
+    except (OSError, ValueError) as e:
+        print(f'unable to load baseline: {e}')
+        return 1
+    comparisons = compare_stats(old, new)
+    print(format_comparisons(comparisons, highlight=use_highlight()))
+    return 1 if any(c.regressed(threshold) for c in comparisons) else 0
+
+
 if __name__ == '__main__':
     if 'install' in sys.argv:
         sys.exit(install())
     elif 'print-code' in sys.argv:
         sys.exit(print_code())
+    elif sys.argv[1:2] == ['compare']:
+        sys.exit(compare(sys.argv[2:]))
     else:
-        print(f'python-devtools v{VERSION}, CLI usage: `python -m devtools install|print-code`')
+        print(f'python-devtools v{VERSION}, CLI usage: `python -m devtools install|print-code|compare`')
         sys.exit(1)
@@ -0,0 +1,146 @@
+"""
+Save timer stats as a baseline and compare later runs against it, see `Timer.save()`, `Timer.compare()` and
+`python -m devtools compare`.
+
+Baselines are JSON files holding the histogram of each named timing rather than raw samples so they stay small
+however many samples were taken. Runs are compared with a Mann-Whitney U test on the histograms, which doesn't
+assume timings are normally distributed.
+"""
+import json
+from math import erfc, sqrt
+
+from .ansi import sformat
+from .timer import TimerStats, format_duration
+
+__all__ = 'save', 'load', 'compare', 'Comparison', 'format_comparisons'
+
+MYPY = False
+if MYPY:
+    from pathlib import Path
+    from typing import Dict, List, Optional, Tuple, Union
+
+BASELINE_VERSION = 1
+
+
+def save(stats: 'Dict[str, TimerStats]', path: 'Union[str, Path]') -> None:
+    data = {'version': BASELINE_VERSION, 'timers': {name: s.to_dict() for name, s in stats.items()}}
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def load(path: 'Union[str, Path]') -> 'Dict[str, TimerStats]':
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get('version') != BASELINE_VERSION:
+        raise ValueError(f'{path} is not a devtools timer baseline')
+    return {name: TimerStats.from_dict(d) for name, d in data['timers'].items()}
+
+
+class Comparison:
+    """
+    Comparison of one named timing between a baseline and a new run, `old` or `new` is None if the name is
+    only present in one of them.
+
+    `change` is the ratio of new to old median, `p_value` comes from a two sided Mann-Whitney U test.
+    """
+
+    __slots__ = 'name', 'old', 'new', 'change', 'p_value'
+
+    def __init__(self, name: str, old: 'Optional[TimerStats]', new: 'Optional[TimerStats]') -> None:
+        self.name = name
+        self.old = old
+        self.new = new
+        self.change: 'Optional[float]' = None
+        self.p_value: 'Optional[float]' = None
+        if old is not None and new is not None and old.count and new.count:
+            self.change = new.percentile(0.5) / (old.percentile(0.5) or 1)
+            self.p_value = mann_whitney(old, new)
+
+    def verdict(self, alpha: float = 0.05) -> str:
+        if self.old is None:
+            return 'added'
+        elif self.new is None:
+            return 'removed'
+        elif self.p_value is None or self.change is None or self.p_value >= alpha or self.change == 1:
+            return 'same'
+        elif self.change > 1:
+            return 'slower'
+        else:
+            return 'faster'
+
+    def regressed(self, threshold: float = 0.1, alpha: float = 0.05) -> bool:
+        """
+        Whether the new run is significantly slower and by more than `threshold`, e.g. 0.1 for 10%.
+        """
+        return self.verdict(alpha) == 'slower' and self.change is not None and self.change > 1 + threshold
+
+    def __repr__(self) -> str:
+        return f'<Comparison {self.name!r} change={self.change} p_value={self.p_value}>'
+
+
+def compare(old: 'Dict[str, TimerStats]', new: 'Dict[str, TimerStats]') -> 'List[Comparison]':
+    names = list(old) + [name for name in new if name not in old]
+    return [Comparison(name, old.get(name), new.get(name)) for name in names]
+
+
+def mann_whitney(a: TimerStats, b: TimerStats) -> float:
+    """
+    Two sided p-value of the Mann-Whitney U test between two histograms using the normal approximation with
+    a correction for ties, samples in the same bucket count as tied.
+    """
+    n1, n2 = a.count, b.count
+    a_buckets, b_buckets = a._buckets, b._buckets
+    u = 0.0
+    b_below = 0
+    tie_sum = 0
+    for index in sorted(set(a_buckets) | set(b_buckets)):
+        a_n, b_n = a_buckets.get(index, 0), b_buckets.get(index, 0)
+        u += a_n * (b_below + b_n / 2)
+        b_below += b_n
+        t = a_n + b_n
+        tie_sum += t**3 - t
+
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_sum / (n * (n - 1))) if n > 1 else 0
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sqrt(variance)
+    return min(erfc(max(z, 0) / sqrt(2)), 1.0)
+
+
+_VERDICT_STYLES = {
+    'faster': sformat.green,
+    'slower': sformat.red,
+    'same': sformat.dim,
+    'added': sformat.cyan,
+    'removed': sformat.cyan,
+}
+
+
+def format_comparisons(comparisons: 'List[Comparison]', alpha: float = 0.05, highlight: bool = False) -> str:
+    """
+    Format comparisons as a table with the median of each run, the change and the confidence that it's real.
+    """
+    rows: 'List[Tuple[str, ...]]' = [('name', 'old', 'new', 'change', 'confidence', '')]
+    verdicts = ['']
+    for c in comparisons:
+        old = format_duration(c.old.percentile(0.5)) if c.old is not None else '-'
+        new = format_duration(c.new.percentile(0.5)) if c.new is not None else '-'
+        change = f'{(c.change - 1) * 100:+0.1f}%' if c.change is not None else '-'
+        confidence = f'{(1 - c.p_value) * 100:0.1f}%' if c.p_value is not None else '-'
+        verdict = c.verdict(alpha)
+        rows.append((c.name, old, new, change, confidence, verdict))
+        verdicts.append(verdict)
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for row, verdict in zip(rows, verdicts):
+        line = '  '.join(
+            cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths))
+        ).rstrip()
+        if not verdict:
+            line = sformat(line, sformat.bold, apply=highlight)
+        elif verdict in _VERDICT_STYLES:
+            line = sformat(line, _VERDICT_STYLES[verdict], apply=highlight)
+        lines.append(line)
+    return '\n'.join(lines)
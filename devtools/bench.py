@@ -0,0 +1,164 @@
+"""
+Microbenchmarks built on `Timer`, see `Timer.bench()`.
+
+The number of calls per round is calibrated so each round takes a fixed share of the target duration, then
+after some warmup rounds each round's time per call is recorded, less the measured cost of the timing loop
+itself. Outlying rounds are rejected using the interquartile range before stats are calculated.
+"""
+import gc
+from itertools import repeat
+from time import perf_counter_ns
+
+from .timer import PERCENTILES, TimerStats, format_duration, percentile_name
+
+__all__ = 'bench', 'BenchResult'
+
+MYPY = False
+if MYPY:
+    from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# required for type hinting since `BenchResult` has a method called `str`
+StrType = str
+
+
+class BenchResult:
+    """
+    Result of `bench()`: `stats` holds the time per call in nanoseconds of each round which wasn't rejected
+    as an outlier.
+    """
+
+    __slots__ = 'name', 'loops', 'rounds', 'outliers', 'overhead_ns', 'stats'
+
+    def __init__(self, name: str, loops: int, rounds: int, outliers: int, overhead_ns: float, stats: TimerStats):
+        self.name = name
+        self.loops = loops
+        self.rounds = rounds
+        self.outliers = outliers
+        self.overhead_ns = overhead_ns
+        self.stats = stats
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    @property
+    def ci(self) -> float:
+        """
+        Half width of the 95% confidence interval of the mean in nanoseconds.
+        """
+        return 1.96 * self.stats.stdev / self.stats.count**0.5 if self.stats.count else 0.0
+
+    def str(self) -> StrType:
+        stats = self.stats
+        percentiles = ' '.join(f'{percentile_name(q)}={format_duration(stats.percentile(q))}' for q in PERCENTILES)
+        return (
+            f'{self.name}: {format_duration(stats.mean)} ± {format_duration(self.ci)} per call '
+            f'({self.rounds} rounds of {self.loops:,} loops, {self.outliers} outliers rejected) '
+            f'min={format_duration(stats.min)} max={format_duration(stats.max)} {percentiles}'
+        )
+
+    def __str__(self) -> StrType:
+        return self.str()
+
+    def __repr__(self) -> StrType:
+        return f'<BenchResult {self.name!r} mean={self.mean:0.1f}ns ci={self.ci:0.1f}ns>'
+
+
+def bench(
+    func: 'Callable[..., Any]',
+    args: 'Tuple[Any, ...]' = (),
+    kwargs: 'Optional[Dict[str, Any]]' = None,
+    *,
+    name: 'Optional[str]' = None,
+    duration: float = 1.0,
+    rounds: int = 20,
+    warmup: int = 2,
+    enable_gc: bool = False,
+) -> BenchResult:
+    """
+    Benchmark `func(*args, **kwargs)`.
+
+    :param duration: target total time in seconds for the timed rounds, excluding calibration and warmup
+    :param rounds: number of timed rounds, each round calls `func` the same calibrated number of times
+    :param warmup: number of rounds to run before timing
+    :param enable_gc: whether to leave garbage collection enabled while running rounds, by default it's disabled
+        as with `timeit`
+    """
+    kwargs = kwargs or {}
+    if rounds < 1:
+        raise ValueError('rounds must be at least 1')
+    gc_enabled = gc.isenabled()
+    if not enable_gc:
+        gc.disable()
+    try:
+        loops = _calibrate(func, args, kwargs, duration * 1e9 / rounds)
+        overhead = min(_time_empty(loops) for _ in range(5))
+        for _ in range(warmup):
+            _time(func, args, kwargs, loops)
+        samples = [max(_time(func, args, kwargs, loops) - overhead, 0) / loops for _ in range(rounds)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    kept = _reject_outliers(samples)
+    stats = TimerStats()
+    for sample in kept:
+        stats.add(round(sample))
+    if not name:
+        name = getattr(func, '__qualname__', None) or repr(func)
+    return BenchResult(
+        name,
+        loops=loops,
+        rounds=rounds,
+        outliers=len(samples) - len(kept),
+        overhead_ns=overhead / loops,
+        stats=stats,
+    )
+
+
+def _time(func: 'Callable[..., Any]', args: 'Tuple[Any, ...]', kwargs: 'Dict[str, Any]', loops: int) -> int:
+    it = repeat(None, loops)
+    start = perf_counter_ns()
+    for _ in it:
+        func(*args, **kwargs)
+    return perf_counter_ns() - start
+
+
+def _time_empty(loops: int) -> int:
+    it = repeat(None, loops)
+    start = perf_counter_ns()
+    for _ in it:
+        pass
+    return perf_counter_ns() - start
+
+
+def _calibrate(func: 'Callable[..., Any]', args: 'Tuple[Any, ...]', kwargs: 'Dict[str, Any]', target_ns: float) -> int:
+    """
+    Find the number of loops which takes roughly `target_ns`, growing the count geometrically like `timeit`.
+    """
+    # the first call is often much slower (imports, caches), it would make the count far too low
+    func(*args, **kwargs)
+    loops = 1
+    while True:
+        elapsed = _time(func, args, kwargs, loops)
+        if elapsed >= target_ns:
+            return loops
+        if elapsed < target_ns / 100:
+            loops *= 10
+        else:
+            # close enough to estimate the count directly
+            return max(loops, int(loops * target_ns / max(elapsed, 1)))
+
+
+def _reject_outliers(samples: 'List[float]') -> 'List[float]':
+    """
+    Remove samples more than 1.5 interquartile ranges outside the quartiles.
+    """
+    if len(samples) < 4:
+        return samples
+    ordered = sorted(samples)
+    n = len(ordered)
+    q1, q3 = ordered[n // 4], ordered[(3 * n) // 4]
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    return [s for s in samples if low <= s <= high]
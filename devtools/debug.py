@@ -1,16 +1,24 @@
 import os
 import sys
+from time import perf_counter_ns, time
 
 from .ansi import sformat
+from .dedup import Deduplicator, value_fingerprint
+from .filtering import CallFilter, parse_filter
 from .prettier import PrettyFormat
-from .timer import Timer
+from .sampling import Sampler, parse_sample
+from .timer import TimerRegistry
 from .utils import env_bool, env_true, is_literal, use_highlight
 
 __all__ = 'Debug', 'debug'
 MYPY = False
 if MYPY:
     from types import FrameType
-    from typing import Any, Generator, List, Optional, Union
+    from typing import Any, Dict, Generator, Hashable, List, Optional, Union
+
+    from .diff import Change
+    from .loop_monitor import LoopMonitor
+    from .profiler import Profile
 
 pformat = PrettyFormat(
     indent_step=int(os.getenv('PY_DEVTOOLS_INDENT', 4)),
@@ -20,6 +28,7 @@ pformat = PrettyFormat(
 )
 # required for type hinting because I (stupidly) added methods called `str`
 StrType = str
+_MISSING = object()
 
 
 class DebugArgument:
@@ -60,13 +69,59 @@ class DebugArgument:
         return self.str()
 
 
+class DebugChanges:
+    """
+    Used in place of `DebugArgument` by `debug.watch()` to show changes to a value since the previous call.
+    """
+
+    __slots__ = 'name', 'changes'
+
+    def __init__(self, name: str, changes: 'List[Change]') -> None:
+        self.name = name
+        self.changes = changes
+
+    def str(self, highlight: bool = False) -> StrType:
+        lines = []
+        for c in self.changes:
+            kind = sformat(c.kind, _change_styles[c.kind], apply=highlight)
+            path = sformat(f'{self.name}{c.path}', sformat.blue, apply=highlight)
+            if c.kind == '+':
+                value = pformat(c.new, indent=4, highlight=highlight)
+            elif c.kind == '-':
+                value = pformat(c.old, indent=4, highlight=highlight)
+            else:
+                old = pformat(c.old, indent=4, highlight=highlight)
+                value = f'{old} -> {pformat(c.new, indent=4, highlight=highlight)}'
+            lines.append(f'{kind} {path}: {value}')
+        return '\n    '.join(lines)
+
+    def __str__(self) -> StrType:
+        return self.str()
+
+
+_change_styles = {'+': sformat.green, '-': sformat.red, '~': sformat.yellow}
+
+
 class DebugOutput:
     """
     Represents the output of a debug command.
     """
 
     arg_class = DebugArgument
-    __slots__ = 'filename', 'lineno', 'frame', 'arguments', 'warning'
+    __slots__ = (
+        'filename',
+        'lineno',
+        'frame',
+        'arguments',
+        'warning',
+        'suppressed',
+        'monotonic_ns',
+        'timestamp',
+        'pid',
+        'thread_name',
+        'task_name',
+        'duration_ns',
+    )
 
     def __init__(
         self,
@@ -76,26 +131,60 @@ class DebugOutput:
         frame: str,
         arguments: 'List[DebugArgument]',
         warning: 'Union[None, str, bool]' = None,
+        suppressed: int = 0,
     ) -> None:
         self.filename = filename
         self.lineno = lineno
         self.frame = frame
         self.arguments = arguments
         self.warning = warning
+        self.suppressed = suppressed
+        # the following are only set when `Debug(metadata=True)`
+        self.monotonic_ns: 'Optional[int]' = None
+        self.timestamp: 'Optional[float]' = None
+        self.pid: 'Optional[int]' = None
+        self.thread_name: 'Optional[str]' = None
+        self.task_name: 'Optional[str]' = None
+        self.duration_ns: 'Optional[int]' = None
 
     def str(self, highlight: bool = False) -> StrType:
+        return f'{self.header_str(highlight)}\n    {self.arguments_str(highlight)}'
+
+    def arguments_str(self, highlight: bool = False) -> StrType:
+        return '\n    '.join(a.str(highlight) for a in self.arguments)
+
+    def header_str(self, highlight: bool = False) -> StrType:
         if highlight:
             prefix = (
                 f'{sformat(self.filename, sformat.magenta)}:{sformat(self.lineno, sformat.green)} '
                 f'{sformat(self.frame, sformat.green, sformat.italic)}'
             )
-            if self.warning:
-                prefix += sformat(f' ({self.warning})', sformat.dim)
         else:
             prefix = f'{self.filename}:{self.lineno} {self.frame}'
-            if self.warning:
-                prefix += f' ({self.warning})'
-        return f'{prefix}\n    ' + '\n    '.join(a.str(highlight) for a in self.arguments)
+        notes = ''
+        if self.warning:
+            notes += f' ({self.warning})'
+        if self.suppressed:
+            notes += f' ({self.suppressed} call{"" if self.suppressed == 1 else "s"} suppressed)'
+        if self.monotonic_ns is not None:
+            notes += f' [{self.metadata_str()}]'
+        return prefix + sformat(notes, sformat.dim, apply=highlight and bool(notes))
+
+    def metadata_str(self) -> StrType:
+        from time import localtime, strftime
+
+        parts = []
+        if self.timestamp is not None:
+            parts.append(strftime('%H:%M:%S', localtime(self.timestamp)) + f'.{int(self.timestamp % 1 * 1e6):06d}')
+        if self.pid is not None:
+            parts.append(f'pid={self.pid}')
+        if self.thread_name is not None:
+            parts.append(f'thread={self.thread_name}')
+        if self.task_name is not None:
+            parts.append(f'task={self.task_name}')
+        if self.duration_ns is not None:
+            parts.append(f'{self.duration_ns / 1e6:0.3f}ms')
+        return ' '.join(parts)
 
     def __str__(self) -> StrType:
         return self.str()
@@ -105,12 +194,93 @@ class DebugOutput:
         return f'<DebugOutput {self.filename}:{self.lineno} {self.frame} arguments: {arguments}>'
 
 
+class SampledDebug:
+    """
+    Returned by `debug.every()`, `debug.once()` and `debug.rate()`, calls are passed to `debug()`
+    if the `Sampler` allows them.
+    """
+
+    __slots__ = '_debug', 'sampler'
+
+    def __init__(self, debug: 'Debug', sampler: Sampler) -> None:
+        self._debug = debug
+        self.sampler = sampler
+
+    def __call__(
+        self,
+        *args: 'Any',
+        file_: 'Any' = None,
+        flush_: bool = True,
+        frame_depth_: int = 2,
+        **kwargs: 'Any',
+    ) -> 'Any':
+        debug_ = self._debug
+        if debug_._filter is None:
+            # check the sampler here so suppressed calls return as soon as possible
+            try:
+                suppressed = self.sampler.check(sys._getframe(frame_depth_ - 1))
+            except ValueError:
+                pass
+            else:
+                if suppressed < 0:
+                    return _return_args(args, kwargs)
+                return debug_._call(args, kwargs, file_, flush_, frame_depth_ + 1, self.sampler, suppressed)
+        return debug_._call(args, kwargs, file_, flush_, frame_depth_ + 1, self.sampler)
+
+    def __repr__(self) -> StrType:
+        return f'<SampledDebug {self.sampler!r}>'
+
+
+class DebugCapture:
+    """
+    Context manager returned by `debug.capture()`, arguments in the records are the values passed to `debug()`,
+    not copies of them.
+    """
+
+    __slots__ = '_debug', 'records', '_previous'
+
+    def __init__(self, debug: 'Debug') -> None:
+        self._debug = debug
+        self.records: 'List[DebugOutput]' = []
+        self._previous: 'Optional[List[DebugOutput]]' = None
+
+    def __enter__(self) -> 'List[DebugOutput]':
+        self._previous = self._debug._records
+        self._debug._records = self.records
+        return self.records
+
+    def __exit__(self, *args: 'Any') -> None:
+        self._debug._records = self._previous
+
+
 class Debug:
     output_class = DebugOutput
 
-    def __init__(self, *, warnings: 'Optional[bool]' = None, highlight: 'Optional[bool]' = None):
+    def __init__(
+        self,
+        *,
+        warnings: 'Optional[bool]' = None,
+        highlight: 'Optional[bool]' = None,
+        sample: 'Union[None, str, Sampler]' = None,
+        filter: 'Union[None, str, CallFilter]' = None,
+        dedup: 'Optional[bool]' = None,
+        metadata: 'Optional[bool]' = None,
+    ):
         self._show_warnings = env_bool(warnings, 'PY_DEVTOOLS_WARNINGS', True)
         self._highlight = highlight
+        self._sampler = parse_sample(os.getenv('PY_DEVTOOLS_SAMPLE') if sample is None else sample)
+        # cached so that per call site state survives between calls
+        self._once: 'Optional[SampledDebug]' = None
+        self._every: 'Dict[int, SampledDebug]' = {}
+        self._rate: 'Dict[float, SampledDebug]' = {}
+        self._filter = parse_filter(os.getenv('PY_DEVTOOLS_FILTER') if filter is None else filter)
+        self._dedup = Deduplicator() if env_bool(dedup, 'PY_DEVTOOLS_DEDUP', False) else None
+        self._watched: 'Dict[Hashable, Any]' = {}
+        self._metadata = env_bool(metadata, 'PY_DEVTOOLS_METADATA', False)
+        # set by `capture()`, calls are appended here instead of being printed
+        self._records: 'Optional[List[DebugOutput]]' = None
+        # `debug.timer()` returns a new `Timer`, `debug.timer.measure()` etc. record named timings
+        self.timer = TimerRegistry()
 
     def __call__(
         self,
@@ -120,43 +290,232 @@ class Debug:
         frame_depth_: int = 2,
         **kwargs: 'Any',
     ) -> 'Any':
-        d_out = self._process(args, kwargs, frame_depth_)
-        s = d_out.str(use_highlight(self._highlight, file_))
+        return self._call(args, kwargs, file_, flush_, frame_depth_ + 1, self._sampler)
+
+    def every(self, n: int) -> SampledDebug:
+        """
+        Print the first call and then every n-th call from each call site, e.g. `debug.every(100)(row)`.
+        """
+        sampled = self._every.get(n)
+        if sampled is None:
+            sampled = self._every[n] = SampledDebug(self, Sampler('every', n))
+        return sampled
+
+    def once(self) -> SampledDebug:
+        """
+        Print only the first call from each call site.
+        """
+        sampled = self._once
+        if sampled is None:
+            sampled = self._once = SampledDebug(self, Sampler('once'))
+        return sampled
+
+    def rate(self, per_second: float) -> SampledDebug:
+        """
+        Print at most `per_second` calls per second from each call site.
+        """
+        sampled = self._rate.get(per_second)
+        if sampled is None:
+            sampled = self._rate[per_second] = SampledDebug(self, Sampler('rate', per_second))
+        return sampled
+
+    def set_filter(self, filter: 'Union[None, str, CallFilter]') -> None:
+        """
+        Only print calls from matching modules, e.g. `debug.set_filter('billing.*,-billing.tests.*')`,
+        `None` removes the filter.
+        """
+        self._filter = parse_filter(filter)
+
+    @property
+    def filter(self) -> 'Optional[CallFilter]':
+        return self._filter
+
+    def _call(
+        self,
+        args: 'Any',
+        kwargs: 'Any',
+        file_: 'Any',
+        flush_: bool,
+        frame_depth: int,
+        sampler: 'Optional[Sampler]',
+        suppressed: 'Optional[int]' = None,
+    ) -> 'Any':
+        """
+        BEWARE: like `_process`, `frame_depth` is counted from `_process` which is called from here.
+
+        `suppressed` is set if `sampler` has already been checked by `SampledDebug`.
+        """
+        call_frame: 'Optional[FrameType]' = None
+        fingerprint: 'Optional[Hashable]' = None
+        if self._filter is not None or sampler is not None or self._dedup is not None:
+            try:
+                call_frame = sys._getframe(frame_depth - 1)
+            except ValueError:
+                pass
+            if call_frame is not None:
+                if self._filter is not None and not self._filter.check(call_frame):
+                    return _return_args(args, kwargs)
+                if sampler is not None and suppressed is None:
+                    suppressed = sampler.check(call_frame)
+                    if suppressed < 0:
+                        return _return_args(args, kwargs)
+                if self._dedup is not None:
+                    fingerprint = value_fingerprint(args, kwargs)
+                    site_key = call_frame.f_code, call_frame.f_lasti
+                    if fingerprint is not None and self._dedup.repeated(site_key, fingerprint):
+                        return _return_args(args, kwargs)
+
+        d_out = self._process(args, kwargs, frame_depth)
+        d_out.suppressed = suppressed or 0
+        if self._records is not None:
+            self._records.append(d_out)
+            return _return_args(args, kwargs)
+        self._print(d_out, file_, flush_, sampler, call_frame, fingerprint)
+        return _return_args(args, kwargs)
+
+    def _print(
+        self,
+        d_out: DebugOutput,
+        file_: 'Any',
+        flush_: bool,
+        sampler: 'Optional[Sampler]',
+        call_frame: 'Optional[FrameType]',
+        fingerprint: 'Optional[Hashable]',
+    ) -> None:
+        highlight = use_highlight(self._highlight, file_)
+        s = _format(d_out, highlight)
+        if call_frame is not None:
+            location = f'{d_out.filename}:{d_out.lineno} {d_out.frame}'
+            if sampler is not None:
+                sampler.emitted(call_frame, location, file_, highlight)
+            if self._dedup is not None:
+                site_key = call_frame.f_code, call_frame.f_lasti
+                if fingerprint is None:
+                    # compare the formatted arguments, the first line is left out since with metadata its timestamp
+                    # and duration change on every call
+                    fingerprint = s.partition('\n')[2]
+                    if self._dedup.repeated(site_key, fingerprint):
+                        return
+                summary = self._dedup.emitted(site_key, fingerprint, location, file_, highlight)
+                if summary:
+                    print(summary, file=file_)
         print(s, file=file_, flush=flush_)
-        if kwargs:
-            return (*args, kwargs)
-        elif len(args) == 1:
-            return args[0]
+
+    def watch(
+        self,
+        value: 'Any',
+        *,
+        key: 'Optional[Hashable]' = None,
+        file_: 'Any' = None,
+        flush_: bool = True,
+        frame_depth_: int = 2,
+    ) -> 'Any':
+        """
+        Print `value` the first time it's seen, then only the paths which changed since the previous call from the
+        same call site (or with the same `key`). Nothing is printed if the value hasn't changed.
+        """
+        try:
+            call_frame: 'Optional[FrameType]' = sys._getframe(frame_depth_ - 1)
+        except ValueError:
+            call_frame = None
+        if call_frame is not None and self._filter is not None and not self._filter.check(call_frame):
+            return value
+        if key is None and call_frame is not None:
+            key = call_frame.f_code, call_frame.f_lasti
+
+        from .diff import diff, snapshot
+
+        new = snapshot(value)
+        old = self._watched.get(key, _MISSING)
+        self._watched[key] = new
+        if old is _MISSING:
+            d_out = self._process((value,), {}, frame_depth_)
         else:
-            return args
+            changes = diff(old, new)
+            if not changes:
+                return value
+            d_out = self._process((value,), {}, frame_depth_)
+            name = d_out.arguments[0].name
+            if not name or is_literal(name):
+                name = 'value'
+            d_out.arguments = [DebugChanges(name, changes)]  # type: ignore[list-item]
+
+        if self._records is not None:
+            self._records.append(d_out)
+            return value
+        s = _format(d_out, use_highlight(self._highlight, file_))
+        print(s, file=file_, flush=flush_)
+        return value
+
+    def flush(self) -> None:
+        """
+        Print "last message repeated N times" summaries for call sites with repeated output suppressed
+        by `dedup` mode, and the number of calls suppressed by sampling since each call site was last printed.
+        """
+        if self._dedup is not None:
+            for summary, file in self._dedup.flush():
+                print(summary, file=file, flush=True)
+        samplers = [s.sampler for s in (self._once, *self._every.values(), *self._rate.values()) if s is not None]
+        if self._sampler is not None:
+            samplers.append(self._sampler)
+        for sampler in samplers:
+            for summary, file in sampler.flush():
+                print(summary, file=file, flush=True)
 
     def format(self, *args: 'Any', frame_depth_: int = 2, **kwargs: 'Any') -> DebugOutput:
         return self._process(args, kwargs, frame_depth_)
 
+    def capture(self) -> 'DebugCapture':
+        """
+        Record calls rather than printing them, use as `with debug.capture() as records:`, each call appends
+        its `DebugOutput` to `records` without formatting it.
+        """
+        return DebugCapture(self)
+
+    def profile(self, interval_ms: float = 5.0, **kwargs: 'Any') -> 'Profile':
+        """
+        Sampling profiler, use as `with debug.profile():`, prints the functions and call paths seen most often when
+        the block exits, see `Profile` for options.
+        """
+        from .profiler import Profile
+
+        return Profile(interval_ms, **kwargs)
+
+    def loop_monitor(self, threshold_ms: float = 100, **kwargs: 'Any') -> 'LoopMonitor':
+        """
+        Monitor asyncio event loop lag and capture the stacks of code blocking the loop for longer than
+        `threshold_ms`, use as `with debug.loop_monitor():` inside a running loop, see `LoopMonitor` for options.
+        """
+        from .loop_monitor import LoopMonitor
+
+        return LoopMonitor(threshold_ms, **kwargs)
+
     def breakpoint(self) -> None:
         import pdb
 
         pdb.Pdb(skip=['devtools.*']).set_trace()
 
-    def timer(self, name: 'Optional[str]' = None, *, verbose: bool = True, file: 'Any' = None, dp: int = 3) -> Timer:
-        return Timer(name=name, verbose=verbose, file=file, dp=dp)
-
     def _process(self, args: 'Any', kwargs: 'Any', frame_depth: int) -> DebugOutput:
         """
         BEWARE: this must be called from a function exactly `frame_depth` levels below the top of the stack.
         """
+        start = perf_counter_ns() if self._metadata else 0
+        timestamp = time() if start else 0.0
         # HELP: any errors other than ValueError from _getframe? If so please submit an issue
         try:
             call_frame: 'FrameType' = sys._getframe(frame_depth)
         except ValueError:
             # "If [ValueError] is deeper than the call stack, ValueError is raised"
-            return self.output_class(
+            d_out = self.output_class(
                 filename='<unknown>',
                 lineno=0,
                 frame='',
                 arguments=list(self._args_inspection_failed(args, kwargs)),
                 warning=self._show_warnings and 'error parsing code, call stack too shallow',
             )
+            if start:
+                _add_metadata(d_out, start, timestamp)
+            return d_out
 
         function = call_frame.f_code.co_name
 
@@ -190,13 +549,16 @@ class Debug:
             else:
                 arguments = list(self._process_args(ex, args, kwargs))
 
-        return self.output_class(
+        d_out = self.output_class(
             filename=str(path),
             lineno=lineno,
             frame=function,
             arguments=arguments,
             warning=self._show_warnings and warning,
         )
+        if start:
+            _add_metadata(d_out, start, timestamp)
+        return d_out
 
     def _args_inspection_failed(self, args: 'Any', kwargs: 'Any') -> 'Generator[DebugArgument, None, None]':
         for arg in args:
@@ -225,4 +587,49 @@ class Debug:
             yield self.output_class.arg_class(value, name=name, variable=kw_arg_names.get(name))
 
 
+def _add_metadata(d_out: DebugOutput, start: int, timestamp: float) -> None:
+    """
+    Called at the end of `_process` so `duration_ns` covers inspecting the call, see `_format` for formatting.
+    """
+    import threading
+
+    d_out.monotonic_ns = start
+    d_out.timestamp = timestamp
+    d_out.pid = os.getpid()
+    d_out.thread_name = threading.current_thread().name
+    # avoid importing asyncio if it's not already in use
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is not None:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            # no running event loop
+            pass
+        else:
+            if task is not None:
+                d_out.task_name = task.get_name() if hasattr(task, 'get_name') else repr(task)
+    d_out.duration_ns = perf_counter_ns() - start
+
+
+def _format(d_out: DebugOutput, highlight: bool) -> str:
+    """
+    Format output for printing, with metadata on the time taken formatting the arguments is added to `duration_ns`.
+    """
+    if d_out.duration_ns is None:
+        return d_out.str(highlight)
+    start = perf_counter_ns()
+    arguments = d_out.arguments_str(highlight)
+    d_out.duration_ns += perf_counter_ns() - start
+    return f'{d_out.header_str(highlight)}\n    {arguments}'
+
+
+def _return_args(args: 'Any', kwargs: 'Any') -> 'Any':
+    if kwargs:
+        return (*args, kwargs)
+    elif len(args) == 1:
+        return args[0]
+    else:
+        return args
+
+
 debug = Debug()
@@ -0,0 +1,83 @@
+__all__ = 'Deduplicator', 'value_fingerprint'
+
+MYPY = False
+if MYPY:
+    from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# immutable types whose values can be compared instead of formatting the output
+_VALUE_TYPES = {int, float, complex, bool, str, bytes, type(None)}
+# types compared by repr, since equal values can be formatted differently
+_REPR_TYPES = {float, complex}
+
+
+def value_fingerprint(args: 'Any', kwargs: 'Any') -> 'Optional[Tuple[Any, ...]]':
+    """
+    Cheap fingerprint of the arguments to `debug()`, or `None` if any argument might be mutable and the
+    formatted output must be used instead.
+
+    The fingerprint holds the values themselves and is compared by equality, not by hash since e.g.
+    `hash(-1) == hash(-2)`.
+    """
+    fingerprint = []
+    for arg in (*args, *kwargs.values()):
+        t = type(arg)
+        if t not in _VALUE_TYPES:
+            return None
+        # types are included since e.g. `1`, `1.0` and `True` are equal, floats use repr so `0.0` and `-0.0` differ
+        # and `nan` equals itself
+        fingerprint.append((t, repr(arg) if t in _REPR_TYPES else arg))
+    return tuple(kwargs), tuple(fingerprint)
+
+
+class Deduplicator:
+    """
+    Tracks the last output from each call site so repeated identical output can be collapsed into
+    a single "last message repeated N times" line.
+    """
+
+    __slots__ = ('_sites',)
+
+    def __init__(self) -> None:
+        # each site maps to [fingerprint, repeats, location, file, highlight]
+        self._sites: 'Dict[Hashable, List[Any]]' = {}
+
+    def repeated(self, key: 'Hashable', fingerprint: 'Hashable') -> bool:
+        """
+        Returns True, and counts the repeat, if `fingerprint` matches the last output from this call site.
+        """
+        site = self._sites.get(key)
+        if site is not None and site[0] == fingerprint:
+            site[1] += 1
+            return True
+        else:
+            return False
+
+    def emitted(
+        self, key: 'Hashable', fingerprint: 'Hashable', location: str, file: 'Any', highlight: bool
+    ) -> 'Optional[str]':
+        """
+        Record new output from a call site, returns the summary for repeats of the previous output, if any.
+        """
+        site = self._sites.get(key)
+        summary = _summary(site) if site is not None and site[1] else None
+        self._sites[key] = [fingerprint, 0, location, file, highlight]
+        return summary
+
+    def flush(self) -> 'List[Tuple[str, Any]]':
+        """
+        Returns summaries and their files for all call sites with pending repeats, and resets the repeat counts.
+        """
+        summaries = []
+        for site in self._sites.values():
+            if site[1]:
+                summaries.append((_summary(site), site[3]))
+                site[1] = 0
+        return summaries
+
+
+def _summary(site: 'List[Any]') -> str:
+    from .ansi import sformat
+
+    n = site[1]
+    text = f'{site[2]} (last message repeated {n} time{"" if n == 1 else "s"})'
+    return sformat(text, sformat.dim, apply=site[4])
@@ -0,0 +1,417 @@
+"""
+Structural snapshots and diffs of values, used by `debug.watch()`.
+
+Values are walked with the same type dispatch as `PrettyFormat`: mappings (including anything matching
+`LaxMapping`), lists, tuples (named tuples are treated like dataclasses), sets, dataclasses and everything
+else as a leaf.
+
+Each container node in a snapshot carries a hash of its contents computed bottom up while the snapshot is built,
+so changed subtrees are found with a single integer comparison when diffing, subtrees with equal hashes are still
+compared structurally since hashes can collide.
+"""
+from .prettier import generator_types
+from .utils import DataClassType, LaxMapping
+
+__all__ = 'Change', 'snapshot', 'diff', 'diff_values'
+
+MYPY = False
+if MYPY:
+    from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+ADDED = '+'
+REMOVED = '-'
+CHANGED = '~'
+
+# node kinds
+MAP = 'map'
+OBJ = 'obj'
+SEQ = 'seq'
+SET = 'set'
+
+# types which can be stored in snapshots as they are
+_LEAF_TYPES = {int, float, complex, bool, str, bytes, type(None)}
+_MISSING = object()
+
+
+class Node:
+    """
+    Snapshot of a container, `children` is a dict for mappings and objects, a tuple for sequences and
+    a frozenset for sets.
+    """
+
+    __slots__ = 'hash', 'kind', 'type_name', 'children'
+
+    def __init__(self, kind: str, type_name: str, children: 'Any') -> None:
+        self.kind = kind
+        self.type_name = type_name
+        self.children = children
+        if kind == SET:
+            self.hash = hash((kind, type_name, children))
+        elif kind == SEQ:
+            self.hash = hash((kind, type_name, tuple(_hash(c) for c in children)))
+        else:
+            self.hash = hash((kind, type_name, tuple((k, _hash(c)) for k, c in children.items())))
+
+    def __eq__(self, other: 'Any') -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Node) or self.hash != other.hash:
+            return False
+        # equal hashes don't prove the nodes are equal, e.g. hash(-1) == hash(-2)
+        if self.kind != other.kind or self.type_name != other.type_name:
+            return False
+        elif self.kind == SET:
+            return bool(self.children == other.children)
+        elif self.kind == SEQ:
+            return len(self.children) == len(other.children) and all(map(_same, self.children, other.children))
+        else:
+            other_children = other.children
+            return self.children.keys() == other_children.keys() and all(
+                _same(v, other_children[k]) for k, v in self.children.items()
+            )
+
+    def __hash__(self) -> int:
+        return self.hash
+
+    def __repr__(self) -> str:
+        return f'<Node {self.kind} {self.type_name} {self.hash}>'
+
+
+class Leaf(str):
+    """
+    Snapshot of a value which isn't a container and can't be stored as is, repr doesn't include quotes.
+    """
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+def _hash(v: 'Any') -> int:
+    try:
+        return hash((type(v), v))
+    except TypeError:
+        # shouldn't happen since leaves are either hashable builtin types or strings
+        return id(v)
+
+
+def _items(value: 'Any') -> 'Dict[Any, Any]':
+    return value if isinstance(value, dict) else dict(value.items())
+
+
+def _fields(value: 'Any') -> 'Dict[str, Any]':
+    if isinstance(value, tuple):
+        return dict(zip(getattr(value, '_fields'), value))
+    try:
+        return value.__dict__
+    except AttributeError:
+        return {f: getattr(value, f) for f in value.__slots__}
+
+
+def snapshot(value: 'Any') -> 'Any':
+    return _snapshot(value, set())
+
+
+def _snapshot(value: 'Any', seen: 'Set[int]') -> 'Any':
+    value_type = type(value)
+    if value_type in _LEAF_TYPES:
+        return value
+    elif isinstance(value, generator_types) or isinstance(value, type):
+        # don't consume generators
+        return Leaf(repr(value))
+
+    value_id = id(value)
+    if value_id in seen:
+        return Leaf('<recursion>')
+    seen.add(value_id)
+    try:
+        type_name = value_type.__name__
+        if isinstance(value, dict) or isinstance(value, LaxMapping):
+            return Node(MAP, type_name, {k: _snapshot(v, seen) for k, v in _items(value).items()})
+        elif isinstance(value, tuple) and hasattr(value, '_fields'):
+            return Node(OBJ, type_name, {f: _snapshot(v, seen) for f, v in zip(value._fields, value)})
+        elif isinstance(value, (list, tuple)):
+            return Node(SEQ, type_name, tuple(_snapshot(v, seen) for v in value))
+        elif isinstance(value, (set, frozenset)):
+            try:
+                return Node(SET, type_name, frozenset(value))
+            except TypeError:
+                return Leaf(repr(value))
+        elif isinstance(value, DataClassType):
+            return Node(OBJ, type_name, {f: _snapshot(v, seen) for f, v in _fields(value).items()})
+        else:
+            return Leaf(repr(value))
+    finally:
+        seen.discard(value_id)
+
+
+class Change:
+    __slots__ = 'kind', 'path', 'old', 'new'
+
+    def __init__(self, kind: str, path: str, old: 'Any' = None, new: 'Any' = None) -> None:
+        self.kind = kind
+        self.path = path
+        self.old = old
+        self.new = new
+
+    def __eq__(self, other: 'Any') -> bool:
+        if not isinstance(other, Change):
+            return False
+        return (self.kind, self.path, self.old, self.new) == (other.kind, other.path, other.old, other.new)
+
+    def __repr__(self) -> str:
+        if self.kind == ADDED:
+            return f'<Change {self.kind} {self.path}: {self.new!r}>'
+        elif self.kind == REMOVED:
+            return f'<Change {self.kind} {self.path}: {self.old!r}>'
+        else:
+            return f'<Change {self.kind} {self.path}: {self.old!r} -> {self.new!r}>'
+
+
+def diff(old: 'Any', new: 'Any', path: str = '', limit: 'Optional[int]' = None) -> 'List[Change]':
+    """
+    Compare two snapshots, returns the changed paths with thawed values.
+
+    `limit` stops the diff once that many changes have been found.
+    """
+    changes: 'List[Change]' = []
+    try:
+        _diff_nodes(old, new, path, changes, limit)
+    except _Limit:
+        pass
+    return changes
+
+
+class _Limit(Exception):
+    pass
+
+
+def _add(changes: 'List[Change]', change: Change, limit: 'Optional[int]') -> None:
+    changes.append(change)
+    if limit is not None and len(changes) >= limit:
+        raise _Limit()
+
+
+def _diff_nodes(old: 'Any', new: 'Any', path: str, changes: 'List[Change]', limit: 'Optional[int]') -> None:
+    if old is new:
+        return
+    old_node, new_node = isinstance(old, Node), isinstance(new, Node)
+    if not (old_node and new_node):
+        if old_node or new_node or type(old) is not type(new) or old != new:
+            _add(changes, Change(CHANGED, path, thaw(old), thaw(new)), limit)
+        return
+    if old == new:
+        return
+    if old.kind != new.kind or old.type_name != new.type_name:
+        _add(changes, Change(CHANGED, path, thaw(old), thaw(new)), limit)
+    elif old.kind == SET:
+        for v in old.children - new.children:
+            _add(changes, Change(REMOVED, f'{path}{{{v!r}}}', old=v), limit)
+        for v in new.children - old.children:
+            _add(changes, Change(ADDED, f'{path}{{{v!r}}}', new=v), limit)
+    elif old.kind == SEQ:
+        _diff_seq(old.children, new.children, path, changes, limit)
+    else:
+        key_path = _field_path if old.kind == OBJ else _key_path
+        old_children: 'Dict[Any, Any]' = old.children
+        new_children: 'Dict[Any, Any]' = new.children
+        for k, old_v in old_children.items():
+            new_v = new_children.get(k, _MISSING)
+            if new_v is _MISSING:
+                _add(changes, Change(REMOVED, key_path(path, k), old=thaw(old_v)), limit)
+            else:
+                _diff_nodes(old_v, new_v, key_path(path, k), changes, limit)
+        for k, new_v in new_children.items():
+            if k not in old_children:
+                _add(changes, Change(ADDED, key_path(path, k), new=thaw(new_v)), limit)
+
+
+def _diff_seq(
+    old: 'Tuple[Any, ...]', new: 'Tuple[Any, ...]', path: str, changes: 'List[Change]', limit: 'Optional[int]'
+) -> None:
+    # skip the common prefix and suffix so an insertion or deletion only reports the affected items
+    old_len, new_len = len(old), len(new)
+    start = 0
+    end = min(old_len, new_len)
+    while start < end and _same(old[start], new[start]):
+        start += 1
+    old_end, new_end = old_len, new_len
+    while old_end > start and new_end > start and _same(old[old_end - 1], new[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+
+    common = min(old_end, new_end) - start
+    for i in range(start, start + common):
+        _diff_nodes(old[i], new[i], f'{path}[{i}]', changes, limit)
+    for i in range(start + common, old_end):
+        _add(changes, Change(REMOVED, f'{path}[{i}]', old=thaw(old[i])), limit)
+    for i in range(start + common, new_end):
+        _add(changes, Change(ADDED, f'{path}[{i}]', new=thaw(new[i])), limit)
+
+
+def _same(a: 'Any', b: 'Any') -> bool:
+    if a is b:
+        return True
+    elif isinstance(a, Node) or isinstance(b, Node):
+        return a == b
+    else:
+        return type(a) is type(b) and a == b
+
+
+def _key_path(path: str, key: 'Any') -> str:
+    return f'{path}[{key!r}]'
+
+
+def _field_path(path: str, field: str) -> str:
+    return f'{path}.{field}'
+
+
+def diff_values(old: 'Any', new: 'Any', path: str = '', limit: 'Optional[int]' = None) -> 'List[Change]':
+    """
+    Compare two live values without snapshotting them first, used for assertion failures where each value is only
+    compared once. Subtrees which are the same object or compare equal are skipped without being walked.
+
+    Values in the returned changes are the original objects.
+    """
+    changes: 'List[Change]' = []
+    try:
+        _diff_values(old, new, path, changes, limit, set())
+    except _Limit:
+        pass
+    return changes
+
+
+def value_kind(value: 'Any') -> 'Optional[str]':
+    """
+    Kind of container with the same type dispatch as `snapshot()`, None for values treated as leaves.
+    """
+    if type(value) in _LEAF_TYPES:
+        return None
+    elif isinstance(value, dict) or isinstance(value, LaxMapping):
+        return MAP
+    elif isinstance(value, tuple) and hasattr(value, '_fields'):
+        return OBJ
+    elif isinstance(value, (list, tuple)):
+        return SEQ
+    elif isinstance(value, (set, frozenset)):
+        return SET
+    elif isinstance(value, DataClassType) and not isinstance(value, type):
+        return OBJ
+    else:
+        return None
+
+
+def _equal(a: 'Any', b: 'Any') -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        # e.g. numpy arrays
+        return False
+
+
+def _diff_values(
+    old: 'Any', new: 'Any', path: str, changes: 'List[Change]', limit: 'Optional[int]', seen: 'Set[int]'
+) -> None:
+    if _equal(old, new):
+        return
+    kind = value_kind(old)
+    # values of different types which compare equal are skipped above, otherwise they're a single change
+    if kind is None or kind != value_kind(new) or type(old) is not type(new) or id(old) in seen:
+        _add(changes, Change(CHANGED, path, old, new), limit)
+        return
+
+    seen.add(id(old))
+    try:
+        if kind == SET:
+            for v in old - new:
+                _add(changes, Change(REMOVED, f'{path}{{{v!r}}}', old=v), limit)
+            for v in new - old:
+                _add(changes, Change(ADDED, f'{path}{{{v!r}}}', new=v), limit)
+        elif kind == SEQ:
+            _diff_value_seq(old, new, path, changes, limit, seen)
+        else:
+            key_path: 'Callable[[str, Any], str]'
+            if kind == MAP:
+                key_path, old_items, new_items = _key_path, _items(old), _items(new)
+            else:
+                key_path, old_items, new_items = _field_path, _fields(old), _fields(new)
+            for k, old_v in old_items.items():
+                new_v = new_items.get(k, _MISSING)
+                if new_v is _MISSING:
+                    _add(changes, Change(REMOVED, key_path(path, k), old=old_v), limit)
+                else:
+                    _diff_values(old_v, new_v, key_path(path, k), changes, limit, seen)
+            for k, new_v in new_items.items():
+                if k not in old_items:
+                    _add(changes, Change(ADDED, key_path(path, k), new=new_v), limit)
+    finally:
+        seen.discard(id(old))
+
+
+def _diff_value_seq(
+    old: 'Any', new: 'Any', path: str, changes: 'List[Change]', limit: 'Optional[int]', seen: 'Set[int]'
+) -> None:
+    old_len, new_len = len(old), len(new)
+    start = 0
+    end = min(old_len, new_len)
+    while start < end and _equal(old[start], new[start]):
+        start += 1
+    old_end, new_end = old_len, new_len
+    while old_end > start and new_end > start and _equal(old[old_end - 1], new[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+
+    common = min(old_end, new_end) - start
+    for i in range(start, start + common):
+        _diff_values(old[i], new[i], f'{path}[{i}]', changes, limit, seen)
+    for i in range(start + common, old_end):
+        _add(changes, Change(REMOVED, f'{path}[{i}]', old=old[i]), limit)
+    for i in range(start + common, new_end):
+        _add(changes, Change(ADDED, f'{path}[{i}]', new=new[i]), limit)
+
+
+class Thawed:
+    """
+    Stand in for dataclasses and named tuples when rendering snapshots.
+    """
+
+    __slots__ = 'type_name', 'fields'
+
+    def __init__(self, type_name: str, fields: 'Dict[str, Any]') -> None:
+        self.type_name = type_name
+        self.fields = fields
+
+    def __repr__(self) -> str:
+        args = ', '.join(f'{k}={v!r}' for k, v in self.fields.items())
+        return f'{self.type_name}({args})'
+
+    def __pretty__(self, fmt: 'Any', skip_exc: 'Any', **kwargs: 'Any') -> 'Any':
+        if not self.fields:
+            raise skip_exc()
+        yield self.type_name + '('
+        yield 1
+        for k, v in self.fields.items():
+            yield f'{k}='
+            yield fmt(v)
+            yield ','
+            yield 0
+        yield -1
+        yield ')'
+
+
+def thaw(value: 'Any') -> 'Any':
+    """
+    Convert a snapshot back into plain python objects suitable for `pformat`.
+    """
+    if not isinstance(value, Node):
+        return value
+    elif value.kind == MAP:
+        return {k: thaw(v) for k, v in value.children.items()}
+    elif value.kind == OBJ:
+        return Thawed(value.type_name, {k: thaw(v) for k, v in value.children.items()})
+    elif value.kind == SEQ:
+        items = [thaw(v) for v in value.children]
+        return tuple(items) if value.type_name == 'tuple' else items
+    else:
+        return set(value.children)
@@ -0,0 +1,76 @@
+from fnmatch import fnmatchcase
+
+__all__ = 'CallFilter', 'parse_filter'
+
+MYPY = False
+if MYPY:
+    from types import CodeType, FrameType
+    from typing import Dict, List, Optional, Union
+
+
+class CallFilter:
+    """
+    Decides whether `debug()` calls from a module should be printed, based on glob patterns.
+
+    Patterns are comma separated, patterns starting with `-` exclude modules, e.g. `billing.*,-billing.tests.*`
+    prints calls from `billing` and its submodules except those in `billing.tests`. Patterns containing `/`
+    or ending with `.py` are matched against the file name rather than the module name.
+
+    If there are no include patterns, everything not excluded is printed.
+
+    The verdict is cached per code object, so after the first call from a function the check is a dict lookup.
+    """
+
+    __slots__ = 'spec', '_include', '_exclude', '_cache'
+
+    def __init__(self, spec: str) -> None:
+        self.spec = spec
+        self._include: 'List[str]' = []
+        self._exclude: 'List[str]' = []
+        for pattern in spec.split(','):
+            pattern = pattern.strip()
+            if pattern.startswith('-'):
+                self._exclude.append(pattern[1:].strip())
+            elif pattern:
+                self._include.append(pattern)
+        self._cache: 'Dict[CodeType, bool]' = {}
+
+    def check(self, frame: 'FrameType') -> bool:
+        code = frame.f_code
+        allowed = self._cache.get(code)
+        if allowed is None:
+            allowed = self._cache[code] = self.allowed(frame.f_globals.get('__name__') or '', code.co_filename)
+        return allowed
+
+    def allowed(self, module: str, filename: str) -> bool:
+        if any(_match(p, module, filename) for p in self._exclude):
+            return False
+        elif self._include:
+            return any(_match(p, module, filename) for p in self._include)
+        else:
+            return True
+
+    def __repr__(self) -> str:
+        return f'<CallFilter {self.spec!r}>'
+
+
+def _match(pattern: str, module: str, filename: str) -> bool:
+    if '/' in pattern or pattern.endswith('.py'):
+        return fnmatchcase(filename.replace('\\', '/'), pattern)
+    elif pattern.endswith('.*') and module == pattern[:-2]:
+        # "billing.*" should also match the "billing" package itself
+        return True
+    else:
+        return fnmatchcase(module, pattern)
+
+
+def parse_filter(spec: 'Union[None, str, CallFilter]') -> 'Optional[CallFilter]':
+    """
+    Build a `CallFilter` from a specification as used for the `PY_DEVTOOLS_FILTER` environment variable.
+    """
+    if spec is None or isinstance(spec, CallFilter):
+        return spec
+    elif spec.strip():
+        return CallFilter(spec)
+    else:
+        return None
@@ -0,0 +1,208 @@
+"""
+asyncio event loop lag and blocking call monitor, see `Debug.loop_monitor()`.
+
+A heartbeat callback is scheduled on the loop every `interval`, the difference between when it was due and when it
+ran is the loop's lag. A watchdog thread checks whether the heartbeat is overdue by more than `threshold`, if so
+the loop is blocked and the stack of the loop's thread is captured along with the current task. Captured stacks
+are aggregated so a callback blocking the loop repeatedly is reported once with stats of how long it blocked for.
+"""
+import asyncio
+import sys
+import threading
+from time import perf_counter_ns
+
+from .timer import TimerStats, format_duration
+
+__all__ = ('LoopMonitor',)
+
+MYPY = False
+if MYPY:
+    from types import FrameType
+    from typing import Any, Dict, Generator, List, Optional, Tuple
+
+
+class BlockingCall:
+    """
+    A stack seen blocking the loop, `stats` holds how long the loop was blocked each time.
+    """
+
+    __slots__ = 'stack', 'task_name', 'stats'
+
+    def __init__(self, stack: 'Tuple[str, ...]', task_name: 'Optional[str]') -> None:
+        self.stack = stack
+        self.task_name = task_name
+        self.stats = TimerStats()
+
+    def __pretty__(self, fmt: 'Any', **kwargs: 'Any') -> 'Generator[Any, None, None]':
+        stats = self.stats
+        task = f' in task {self.task_name!r}' if self.task_name else ''
+        yield (
+            f'{stats.count} times{task}: mean={format_duration(stats.mean)} max={format_duration(stats.max)} '
+            f'total={format_duration(stats.total)}'
+        )
+        yield 1
+        for i, line in enumerate(self.stack):
+            if i:
+                yield 0
+            yield line
+        yield -1
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and captures the stacks of code blocking the loop, use as a context manager inside
+    a running loop or call `start()` and `stop()`.
+
+    `lag` holds the lag of each heartbeat and `blocking` the calls which blocked the loop for longer than
+    `threshold_ms`, keyed by stack.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 100,
+        *,
+        interval_ms: float = 50,
+        stack_depth: int = 8,
+        top: int = 5,
+        file: 'Any' = None,
+        verbose: bool = True,
+    ) -> None:
+        """
+        :param threshold_ms: the loop is considered blocked if a heartbeat is overdue by more than this
+        :param interval_ms: time between heartbeats
+        :param stack_depth: number of frames captured from the innermost frame out for blocking calls
+        :param top: number of blocking calls shown by `report()`
+        :param verbose: whether to print the report when the monitor is used as a context manager
+        """
+        self.threshold_ns = int(threshold_ms * 1e6)
+        self.interval_ns = int(interval_ms * 1e6)
+        self.stack_depth = stack_depth
+        self.top = top
+        self.file = file
+        self.verbose = verbose
+        self.lag = TimerStats()
+        self.blocking: 'Dict[Tuple[str, ...], BlockingCall]' = {}
+        self._loop: 'Optional[asyncio.AbstractEventLoop]' = None
+        self._loop_thread_id = 0
+        self._handle: 'Optional[asyncio.TimerHandle]' = None
+        self._due_ns = 0
+        # set by the watchdog when the current heartbeat is overdue, recorded when the heartbeat finally runs
+        self._pending: 'Optional[BlockingCall]' = None
+        self._checked_due_ns = 0
+        self._watchdog: 'Optional[threading.Thread]' = None
+        self._stop_event = threading.Event()
+        self._start_ns = 0
+        self.duration_ns = 0
+
+    def start(self, loop: 'Optional[asyncio.AbstractEventLoop]' = None) -> 'LoopMonitor':
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._start_ns = perf_counter_ns()
+        self._schedule()
+        self._stop_event.clear()
+        self._watchdog = threading.Thread(target=self._watch, name='devtools-loop-monitor', daemon=True)
+        self._watchdog.start()
+        return self
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._watchdog is not None:
+            self._stop_event.set()
+            self._watchdog.join()
+            self._watchdog = None
+        if self._pending is not None:
+            # blocked until the monitor was stopped
+            self._pending.stats.add(perf_counter_ns() - self._due_ns)
+            self._pending = None
+        self.duration_ns += perf_counter_ns() - self._start_ns
+
+    def __enter__(self) -> 'LoopMonitor':
+        return self.start()
+
+    def __exit__(self, *args: 'Any') -> None:
+        self.stop()
+        if self.verbose:
+            self.report()
+
+    async def __aenter__(self) -> 'LoopMonitor':
+        return self.start()
+
+    async def __aexit__(self, *args: 'Any') -> None:
+        self.__exit__(*args)
+
+    def _schedule(self) -> None:
+        assert self._loop is not None
+        self._due_ns = perf_counter_ns() + self.interval_ns
+        self._handle = self._loop.call_later(self.interval_ns / 1e9, self._heartbeat)
+
+    def _heartbeat(self) -> None:
+        lag = perf_counter_ns() - self._due_ns
+        self.lag.add(lag)
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            pending.stats.add(lag)
+        self._schedule()
+
+    def _watch(self) -> None:
+        poll = min(self.interval_ns, self.threshold_ns) / 2e9
+        while not self._stop_event.wait(poll):
+            due = self._due_ns
+            if due != self._checked_due_ns and perf_counter_ns() - due > self.threshold_ns:
+                # only capture once per overdue heartbeat
+                self._checked_due_ns = due
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                key = self._stack(frame)
+                # the heartbeat may have run since it was found overdue, the frame is then whatever the loop
+                # went on to run rather than what blocked it
+                if self._due_ns == due:
+                    self._pending = self._blocking_call(key)
+
+    def _stack(self, frame: 'Optional[FrameType]') -> 'Tuple[str, ...]':
+        stack = []
+        depth = self.stack_depth
+        while frame is not None and depth:
+            code = frame.f_code
+            stack.append(f'{code.co_filename}:{frame.f_lineno} {code.co_name}')
+            frame = frame.f_back
+            depth -= 1
+        return tuple(stack)
+
+    def _blocking_call(self, key: 'Tuple[str, ...]') -> BlockingCall:
+        call = self.blocking.get(key)
+        if call is None:
+            task = asyncio.current_task(self._loop)
+            call = self.blocking[key] = BlockingCall(key, task.get_name() if task is not None else None)
+        return call
+
+    def report(self, file: 'Any' = None) -> None:
+        from .prettier import pformat
+
+        print(pformat(self), file=file or self.file, flush=True)
+
+    def __pretty__(self, fmt: 'Any', **kwargs: 'Any') -> 'Generator[Any, None, None]':
+        lag = self.lag
+        yield (
+            f'loop monitor: {lag.count} heartbeats over {format_duration(self.duration_ns)}, '
+            f'lag mean={format_duration(lag.mean)} p99={format_duration(lag.percentile(0.99))} '
+            f'max={format_duration(lag.max)}'
+        )
+        calls: 'List[BlockingCall]' = sorted(self.blocking.values(), key=lambda c: -c.stats.total)
+        if calls:
+            yield 1
+            count = sum(c.stats.count for c in calls)
+            yield f'{count} times blocked for more than {format_duration(self.threshold_ns)}:'
+            yield 1
+            for i, call in enumerate(calls[: self.top]):
+                if i:
+                    yield 0
+                yield fmt(call)
+            yield -1
+            yield -1
+
+    def __repr__(self) -> str:
+        return f'<LoopMonitor heartbeats={self.lag.count} blocking={len(self.blocking)}>'
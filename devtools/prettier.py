@@ -13,11 +13,6 @@ except ImportError:
 
     cache = lru_cache()
 
-try:
-    from sqlalchemy import inspect as sa_inspect
-except ImportError:
-    sa_inspect = None  # type: ignore[assignment]
-
 __all__ = 'PrettyFormat', 'pformat', 'pprint'
 MYPY = False
 if MYPY:
@@ -91,10 +86,11 @@ class PrettyFormat:
         self._stream = io.StringIO()
         self._format(value, indent_current=indent, indent_first=indent_first)
         s = self._stream.getvalue()
-        pygments, pyg_lexer, pyg_formatter = get_pygments()
-        if highlight and pygments:
-            # apparently highlight adds a trailing new line we don't want
-            s = pygments.highlight(s, lexer=pyg_lexer, formatter=pyg_formatter).rstrip('\n')
+        if highlight:
+            pygments, pyg_lexer, pyg_formatter = get_pygments()
+            if pygments:
+                # apparently highlight adds a trailing new line we don't want
+                s = pygments.highlight(s, lexer=pyg_lexer, formatter=pyg_formatter).rstrip('\n')
         return s
 
     def _format(self, value: 'Any', indent_current: int, indent_first: bool) -> None:
@@ -262,11 +258,10 @@ class PrettyFormat:
         self._format_fields(value, field_items, indent_current, indent_new)
 
     def _format_sqlalchemy_class(self, value: 'Any', _: str, indent_current: int, indent_new: int) -> None:
-        if sa_inspect is not None:
-            state = sa_inspect(value)
-            deferred = state.unloaded
-        else:
-            deferred = set()
+        # sqlalchemy must already be imported if value is a model
+        from sqlalchemy import inspect as sa_inspect
+
+        deferred = sa_inspect(value).unloaded
 
         fields = [
             (field, getattr(value, field) if field not in deferred else '<deferred>')
@@ -0,0 +1,247 @@
+"""
+Low overhead sampling profiler, see `Debug.profile()`.
+
+Stacks are sampled either from a `SIGPROF` handler driven by `signal.setitimer` (CPU time of the main thread) or
+from a background thread using `sys._current_frames()` (wall time of the profiling thread, or optionally of every
+thread). Each code object is interned once as an integer so a sample costs one walk up the stack and one dict update.
+"""
+import os
+import sys
+import threading
+from time import perf_counter_ns
+
+from .timer import format_duration
+
+__all__ = ('Profile',)
+
+MYPY = False
+if MYPY:
+    from pathlib import Path
+    from types import CodeType, FrameType
+    from typing import IO, Any, Dict, Generator, List, Optional, Tuple, Union
+
+MODES = 'signal', 'thread'
+
+
+class Profile:
+    """
+    Sample stacks while active, use as a context manager or call `start()` and `stop()`.
+
+    `samples` maps stacks (tuples of location ids from the outermost frame in) to the number of times they
+    were sampled, `locations` holds the name of each location id.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = 5.0,
+        *,
+        mode: 'Optional[str]' = None,
+        max_depth: int = 64,
+        top: int = 10,
+        file: 'Any' = None,
+        verbose: bool = True,
+        all_threads: bool = False,
+    ) -> None:
+        """
+        :param interval_ms: time between samples, at least 1ms to keep overhead bounded
+        :param mode: "signal" to sample the main thread from a `SIGPROF` handler, or "thread" to sample from
+            a background thread; by default "signal" is used where available in the main thread
+        :param max_depth: maximum number of frames recorded per sample, the outermost frames are dropped
+        :param top: number of functions and call paths shown by `report()`
+        :param verbose: whether to print the report when the profile is used as a context manager
+        :param all_threads: in "thread" mode, sample every thread rather than only the thread which started the
+            profile, idle threads waiting on I/O or locks are included in the counts
+        """
+        if mode is None:
+            main_thread = threading.current_thread() is threading.main_thread()
+            mode = 'signal' if hasattr(_signal(), 'setitimer') and main_thread else 'thread'
+        elif mode not in MODES:
+            raise ValueError(f'invalid profile mode {mode!r}, should be one of: {", ".join(MODES)}')
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.mode = mode
+        self.max_depth = max_depth
+        self.top = top
+        self.file = file
+        self.verbose = verbose
+        self.all_threads = all_threads
+        self.samples: 'Dict[Tuple[int, ...], int]' = {}
+        self.locations: 'List[str]' = []
+        self._location_ids: 'Dict[CodeType, int]' = {}
+        self._start_ns = 0
+        self.duration_ns = 0
+        self._thread: 'Optional[threading.Thread]' = None
+        self._target_id = 0
+        self._stop_event = threading.Event()
+        self._previous_handler: 'Any' = None
+
+    @property
+    def count(self) -> int:
+        return sum(self.samples.values())
+
+    def start(self) -> 'Profile':
+        self._start_ns = perf_counter_ns()
+        if self.mode == 'signal':
+            signal = _signal()
+            self._previous_handler = signal.signal(signal.SIGPROF, self._signal_handler)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._stop_event.clear()
+            self._target_id = threading.get_ident()
+            self._thread = threading.Thread(target=self._run, name='devtools-profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self.mode == 'signal':
+            signal = _signal()
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        elif self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.duration_ns += perf_counter_ns() - self._start_ns
+
+    def __enter__(self) -> 'Profile':
+        return self.start()
+
+    def __exit__(self, *args: 'Any') -> None:
+        self.stop()
+        if self.verbose:
+            self.report()
+
+    def _signal_handler(self, signum: int, frame: 'Optional[FrameType]') -> None:
+        if frame is not None:
+            self._sample(frame)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        target_id = self._target_id
+        wait = self._stop_event.wait
+        interval = self.interval
+        while not wait(interval):
+            if self.all_threads:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_id:
+                        self._sample(frame)
+            else:
+                target_frame = sys._current_frames().get(target_id)
+                if target_frame is not None:
+                    self._sample(target_frame)
+
+    def _sample(self, frame: 'Optional[FrameType]') -> None:
+        location_ids = self._location_ids
+        stack = []
+        depth = self.max_depth
+        while frame is not None and depth:
+            code = frame.f_code
+            if code is _STOP_CODE:
+                # the profiled thread is waiting for the sampler thread to finish
+                return
+            location_id = location_ids.get(code)
+            if location_id is None:
+                location_id = self._intern(code)
+            stack.append(location_id)
+            frame = frame.f_back
+            depth -= 1
+        stack.reverse()
+        key = tuple(stack)
+        self.samples[key] = self.samples.get(key, 0) + 1
+
+    def _intern(self, code: 'CodeType') -> int:
+        name = getattr(code, 'co_qualname', code.co_name)
+        location_id = self._location_ids[code] = len(self.locations)
+        self.locations.append(f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        return location_id
+
+    def functions(self) -> 'List[Tuple[str, int, int]]':
+        """
+        `(location, self samples, total samples)` for each function sampled, most self samples first.
+        """
+        self_counts: 'Dict[int, int]' = {}
+        total_counts: 'Dict[int, int]' = {}
+        for stack, n in self.samples.items():
+            if stack:
+                self_counts[stack[-1]] = self_counts.get(stack[-1], 0) + n
+            for location_id in set(stack):
+                total_counts[location_id] = total_counts.get(location_id, 0) + n
+        rows = [(self.locations[i], self_counts.get(i, 0), total) for i, total in total_counts.items()]
+        rows.sort(key=lambda row: (-row[1], -row[2]))
+        return rows
+
+    def paths(self) -> 'List[Tuple[List[str], int]]':
+        """
+        Sampled call paths from the outermost frame in, most samples first.
+        """
+        rows = [([self.locations[i] for i in stack], n) for stack, n in self.samples.items()]
+        rows.sort(key=lambda row: -row[1])
+        return rows
+
+    def report(self, file: 'Any' = None) -> None:
+        from .prettier import pformat
+
+        print(pformat(self), file=file or self.file, flush=True)
+
+    def export(self, file: 'Union[str, Path, IO[str]]') -> None:
+        """
+        Write samples in the collapsed stack format used by flamegraph tools.
+        """
+        lines = []
+        for stack, n in self.samples.items():
+            path = ';'.join(self.locations[i].replace(';', ':') for i in stack)
+            lines.append(f'{path} {n}\n')
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, 'w') as f:
+                f.writelines(lines)
+        else:
+            file.writelines(lines)
+
+    def __pretty__(self, fmt: 'Any', **kwargs: 'Any') -> 'Generator[Any, None, None]':
+        count = self.count or 1
+        yield (
+            f'profile: {self.count} samples every {format_duration(self.interval * 1e9)} ({self.mode} mode) '
+            f'over {format_duration(self.duration_ns)}'
+        )
+        yield 1
+        yield 'top functions (self, total):'
+        yield 1
+        for i, (location, self_n, total_n) in enumerate(self.functions()[: self.top]):
+            if i:
+                yield 0
+            yield f'{self_n / count * 100:5.1f}% {total_n / count * 100:5.1f}%  {location}'
+        yield -1
+        yield 0
+        yield 'top call paths:'
+        yield 1
+        for i, (path, n) in enumerate(self.paths()[: self.top]):
+            if i:
+                yield 0
+            yield f'{n / count * 100:5.1f}%  {_format_path(path)}'
+        yield -1
+        yield -1
+
+    def __repr__(self) -> str:
+        return f'<Profile {self.mode} samples={self.count} locations={len(self.locations)}>'
+
+
+_STOP_CODE = Profile.stop.__code__
+
+
+def _format_path(path: 'List[str]') -> str:
+    """
+    Join function names, collapsing recursive calls into "name ×N".
+    """
+    parts: 'List[List[Any]]' = []
+    for location in path:
+        name = location.split(' (', 1)[0]
+        if parts and parts[-1][0] == name:
+            parts[-1][1] += 1
+        else:
+            parts.append([name, 1])
+    return ' > '.join(name if n == 1 else f'{name} ×{n}' for name, n in parts)
+
+
+def _signal() -> 'Any':
+    import signal
+
+    return signal
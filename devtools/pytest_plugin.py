@@ -2,26 +2,36 @@ from __future__ import annotations as _annotations
 
 import ast
 import builtins
+import json
+import os
+import re
+import shutil
 import sys
+import tempfile
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
 from contextvars import ContextVar
 from dataclasses import dataclass
 from enum import Enum
 from functools import lru_cache
-from itertools import groupby
 from pathlib import Path
-from types import FrameType
+from types import CodeType, FrameType
 from typing import TYPE_CHECKING, Any, Callable, Generator, Sized
 
 import pytest
 from executing import Source
 
 from . import debug
+from .diff import ADDED, REMOVED, diff_values, value_kind
+from .prettier import pformat
+from .snapshot import Snapshot, snapshot, snapshot_path, to_snapshot, update_snapshots
+from .timer import PERCENTILES, Timer, TimerStats, format_duration, percentile_name
 
 if TYPE_CHECKING:
-    pass
+    from .bench import BenchResult
+    from .debug import DebugOutput
 
-__all__ = ('insert_assert',)
+__all__ = 'insert_assert', 'snapshot'
 
 
 @dataclass
@@ -29,23 +39,99 @@ class ToReplace:
     file: Path
     start_line: int
     end_line: int | None
+    # unformatted until `format_replacements()` is called at the end of the session
     code: str
+    indent: int = 0
+    # set when the value is too large to inline and is written to a snapshot file instead
+    snapshot_key: str | None = None
+    snapshot_value: Any = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'file': str(self.file),
+            'start_line': self.start_line,
+            'end_line': self.end_line,
+            'code': self.code,
+            'indent': self.indent,
+            'snapshot_key': self.snapshot_key,
+            'snapshot_value': self.snapshot_value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ToReplace:
+        return cls(
+            Path(data['file']),
+            data['start_line'],
+            data['end_line'],
+            data['code'],
+            data['indent'],
+            data['snapshot_key'],
+            data['snapshot_value'],
+        )
+
+
+WORKER_OUTPUT_KEY = 'devtools_insert_assert'
 
 
 to_replace: list[ToReplace] = []
+# values whose code is longer than this are written to snapshot files, 0 to always inline values
+snapshot_size = 0
+# argument code, start line, end line and indentation of each insert_assert() call site, keyed by
+# `(code, f_lasti)` so calls from parametrised tests and loops only analyse the source once
+call_sites: dict[tuple[CodeType, int], tuple[str, int, int, int]] = {}
+# line of the insert_assert() call which first used each snapshot key, to keep keys unique
+snapshot_keys: dict[tuple[Path, str], int] = {}
 insert_assert_calls: ContextVar[int] = ContextVar('insert_assert_calls', default=0)
 insert_assert_summary: ContextVar[list[str]] = ContextVar('insert_assert_summary')
 
+BENCH_WORKER_OUTPUT_KEY = 'devtools_bench'
+
+# stats of each test's setup, call and teardown durations keyed by test without parametrisation, see
+# `--devtools-durations`
+durations: dict[str, dict[str, TimerStats]] = {}
+# time per call of each benchmark run with the `devtools_bench` fixture, keyed by name
+bench_stats: dict[str, TimerStats] = {}
+# loaded from `--devtools-bench-compare`
+bench_baseline: dict[str, TimerStats] | None = None
+bench_threshold = 0.1
+durations_enabled = False
+
 
 def insert_assert(value: Any) -> int:
     call_frame: FrameType = sys._getframe(1)
     if sys.version_info < (3, 8):  # pragma: no cover
         raise RuntimeError('insert_assert() requires Python 3.8+')
 
-    format_code = load_black()
+    code = call_frame.f_code
+    site_key = code, call_frame.f_lasti
+    site = call_sites.get(site_key)
+    if site is None:
+        site = call_sites[site_key] = analyse_call_site(call_frame, value)
+    arg, start_line, end_line, indent = site
+
+    file = Path(code.co_filename)
+    tr = ToReplace(file, start_line, end_line, '', indent)
+    value_code = str(custom_repr(value))
+    if snapshot_size and len(value_code) > snapshot_size:
+        tr.snapshot_key = get_snapshot_key(file, code, arg, tr.start_line)
+        tr.snapshot_value = to_snapshot(value)
+        value_code = f'snapshot({tr.snapshot_key!r})'
+
+    # formatting is deferred to the end of the session so black runs once per file rather than once per call
+    tr.code = f'# insert_assert({arg})\nassert {arg} == {value_code}'
+    to_replace.append(tr)
+    calls = insert_assert_calls.get() + 1
+    insert_assert_calls.set(calls)
+    return calls
+
+
+def analyse_call_site(call_frame: FrameType, value: Any) -> tuple[str, int, int, int]:
+    """
+    Find the code of the argument passed to `insert_assert()` and the lines and indentation of the call.
+    """
     ex = Source.for_frame(call_frame).executing(call_frame)
     if ex.node is None:  # pragma: no cover
-        python_code = format_code(str(custom_repr(value)))
+        python_code = load_black()(str(custom_repr(value)))
         raise RuntimeError(
             f'insert_assert() was unable to find the frame from which it was called, called with:\n{python_code}'
         )
@@ -54,14 +140,17 @@ def insert_assert(value: Any) -> int:
         arg = ast_arg.id
     else:
         arg = ' '.join(map(str.strip, ex.source.asttokens().get_text(ast_arg).splitlines()))
+    return arg, ex.node.lineno, ex.node.end_lineno, ex.node.col_offset  # type: ignore[return-value]
 
-    python_code = format_code(f'# insert_assert({arg})\nassert {arg} == {custom_repr(value)}')
 
-    python_code = textwrap.indent(python_code, ex.node.col_offset * ' ')
-    to_replace.append(ToReplace(Path(call_frame.f_code.co_filename), ex.node.lineno, ex.node.end_lineno, python_code))
-    calls = insert_assert_calls.get() + 1
-    insert_assert_calls.set(calls)
-    return calls
+def get_snapshot_key(file: Path, code: CodeType, arg: str, line: int) -> str:
+    base_key = f'{getattr(code, "co_qualname", code.co_name)}:{arg}'
+    key = base_key
+    n = 1
+    while snapshot_keys.setdefault((file, key), line) != line:
+        n += 1
+        key = f'{base_key}#{n}'
+    return key
 
 
 def pytest_addoption(parser: Any) -> None:
@@ -77,12 +166,74 @@ def pytest_addoption(parser: Any) -> None:
         default=False,
         help='Fail tests which include one or more insert_assert() calls',
     )
+    parser.addoption(
+        '--no-devtools-diff',
+        action='store_true',
+        default=False,
+        help="Use pytest's own explanation for failed == assertions on containers rather than devtools' diff",
+    )
+    parser.addoption(
+        '--insert-assert-snapshot-size',
+        type=int,
+        default=0,
+        help=(
+            'Write values whose code is longer than this many characters to snapshot files in "__snapshots__" '
+            'rather than inserting them in tests'
+        ),
+    )
+
+    parser.addoption(
+        '--devtools-durations',
+        type=int,
+        default=None,
+        metavar='N',
+        help=(
+            'Show setup, call and teardown duration stats of the N slowest tests by total time, with parametrised '
+            'tests combined (N=0 for all)'
+        ),
+    )
+    parser.addoption(
+        '--devtools-bench-save',
+        default=None,
+        metavar='PATH',
+        help='Save the results of benchmarks run with the devtools_bench fixture as a baseline',
+    )
+    parser.addoption(
+        '--devtools-bench-compare',
+        default=None,
+        metavar='PATH',
+        help='Fail benchmarks run with the devtools_bench fixture which are slower than in this baseline',
+    )
+    parser.addoption(
+        '--devtools-bench-threshold',
+        type=float,
+        default=0.1,
+        metavar='FRACTION',
+        help='Minimum slowdown compared to the baseline for a benchmark to fail, default 0.1 (10%%)',
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    global snapshot_size, bench_baseline, bench_threshold, durations_enabled
+    snapshot_size = config.getoption('insert_assert_snapshot_size', 0) or 0
+    durations_enabled = config.getoption('devtools_durations', None) is not None
+    bench_threshold = config.getoption('devtools_bench_threshold', 0.1)
+    compare_path = config.getoption('devtools_bench_compare', None)
+    if compare_path:
+        from .baseline import load
+
+        try:
+            bench_baseline = load(compare_path)
+        except (OSError, ValueError) as e:
+            raise pytest.UsageError(f'--devtools-bench-compare: unable to load baseline: {e}') from e
 
 
 @pytest.fixture(scope='session', autouse=True)
 def insert_assert_add_to_builtins() -> None:
     try:
         setattr(builtins, 'insert_assert', insert_assert)
+        if not hasattr(builtins, 'snapshot'):
+            setattr(builtins, 'snapshot', snapshot)
         # we also install debug here since the default script doesn't install it
         setattr(builtins, 'debug', debug)
     except TypeError:
@@ -106,59 +257,251 @@ def insert_assert_fixture() -> Callable[[Any], int]:
     return insert_assert
 
 
+@pytest.fixture(name='debug_records')
+def debug_records_fixture() -> Generator[list[DebugOutput], None, None]:
+    """
+    `debug()` calls made during the test, recorded as `DebugOutput` objects rather than printed.
+    """
+    with debug.capture() as records:
+        yield records
+
+
+@pytest.fixture(name='devtools_bench')
+def devtools_bench_fixture(request: pytest.FixtureRequest) -> Callable[..., BenchResult]:
+    """
+    Benchmark a function with `Timer.bench()`, e.g. `devtools_bench(func, *args, duration_=0.5, **kwargs)`.
+
+    Results are named after the test unless `name_` is given. If `--devtools-bench-compare` is set the test
+    fails when the benchmark is significantly slower than in the baseline by more than
+    `--devtools-bench-threshold`.
+    """
+
+    def bench(func: Callable[..., Any], *args: Any, name_: str | None = None, **kwargs: Any) -> BenchResult:
+        name = name_ or request.node.nodeid
+        result = Timer(name, verbose=False).bench(func, *args, **kwargs)
+        bench_stats.setdefault(name, TimerStats()).merge(result.stats)
+        request.node.add_report_section('call', 'devtools bench', result.str())
+        check_bench_regression(name, result.stats)
+        return result
+
+    return bench
+
+
+def check_bench_regression(name: str, stats: TimerStats) -> None:
+    if bench_baseline is None or name not in bench_baseline:
+        return
+    from .baseline import Comparison
+
+    c = Comparison(name, bench_baseline[name], stats)
+    if c.regressed(bench_threshold):
+        old, new = c.old.percentile(0.5), c.new.percentile(0.5)  # type: ignore[union-attr]
+        slower = (c.change - 1) * 100  # type: ignore[operator]
+        pytest.fail(
+            f'devtools-bench: {name} is {slower:0.1f}% slower than the baseline '
+            f'({format_duration(old)} -> {format_duration(new)} per call, p={c.p_value:0.3f})',
+            pytrace=False,
+        )
+
+
+def pytest_runtest_logreport(report: pytest.TestReport) -> None:
+    """
+    Record durations for `--devtools-durations`, under pytest-xdist this is also called on the controller with
+    workers' reports.
+    """
+    if durations_enabled:
+        test = report.nodeid.split('[', 1)[0]
+        phases = durations.get(test)
+        if phases is None:
+            phases = durations[test] = {}
+        stats = phases.get(report.when)
+        if stats is None:
+            stats = phases[report.when] = TimerStats()
+        stats.add(int(report.duration * 1e9))
+
+
+def format_durations(top: int) -> list[str]:
+    """
+    Table of duration stats for each phase of the slowest tests by total time.
+    """
+    tests = sorted(durations.items(), key=lambda item: -sum(s.total for s in item[1].values()))
+    if top:
+        tests = tests[:top]
+    percentiles = [percentile_name(q) for q in PERCENTILES]
+    rows = [('test', 'phase', 'count', 'mean', *percentiles, 'max', 'total')]
+    for test, phases in tests:
+        first = True
+        for when in 'setup', 'call', 'teardown':
+            stats = phases.get(when)
+            if stats is None:
+                continue
+            rows.append(
+                (
+                    test if first else '',
+                    when,
+                    str(stats.count),
+                    format_duration(stats.mean),
+                    *(format_duration(stats.percentile(q)) for q in PERCENTILES),
+                    format_duration(stats.max),
+                    format_duration(stats.total),
+                )
+            )
+            first = False
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [
+        '  '.join(cell.ljust(w) if i < 2 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths))).rstrip()
+        for row in rows
+    ]
+
+
 def pytest_report_teststatus(report: pytest.TestReport, config: pytest.Config) -> Any:
     if report.when == 'teardown' and report.failed and 'devtools-insert-assert:' in repr(report.longrepr):
         return 'insert assert', 'i', ('INSERT ASSERT', {'cyan': True})
 
 
 @pytest.fixture(scope='session', autouse=True)
-def insert_assert_session(pytestconfig: pytest.Config) -> Generator[None, None, None]:
-    """
-    Actual logic for updating code examples.
-    """
+def insert_assert_session() -> None:
     try:
         __builtins__['insert_assert'] = insert_assert
     except TypeError:
         # happens on pypy
         pass
 
-    yield
 
+# maximum number of differences shown when an == assertion between containers fails
+MAX_DIFF_CHANGES = 50
+# maximum number of lines shown for each value in a difference
+MAX_DIFF_VALUE_LINES = 10
+
+
+def pytest_assertrepr_compare(config: pytest.Config, op: str, left: Any, right: Any) -> list[str] | None:
+    """
+    Explain failed `==` assertions between containers by listing only the paths which differ.
+
+    Both sides are walked together and subtrees which are the same object or compare equal are skipped without
+    being formatted, so large values with few differences are explained quickly.
+    """
+    if op != '==' or config.getoption('no_devtools_diff', False):
+        return None
+    if isinstance(right, Snapshot):
+        try:
+            left, right = to_snapshot(left), right.value
+        except KeyError:
+            return None
+    if value_kind(left) is None or value_kind(right) is None:
+        return None
+
+    changes = diff_values(left, right, limit=MAX_DIFF_CHANGES + 1)
+    if not changes:
+        return None
+    shown = changes[:MAX_DIFF_CHANGES]
+    count = f'{len(shown)}{"+" if len(changes) > len(shown) else ""}'
+    lines = [
+        f'{type(left).__name__} == {type(right).__name__}: {count} difference{plural(shown)} '
+        f'(- left only, + right only, ~ left -> right)'
+    ]
+    for change in shown:
+        path = change.path or '(root)'
+        if change.kind == ADDED:
+            value = format_diff_value(change.new)
+        elif change.kind == REMOVED:
+            value = format_diff_value(change.old)
+        else:
+            value = f'{format_diff_value(change.old)} -> {format_diff_value(change.new)}'
+        lines.extend(f'{change.kind} {path}: {value}'.split('\n'))
+    if len(changes) > len(shown):
+        lines.append('... more differences not shown')
+    return lines
+
+
+def format_diff_value(value: Any) -> str:
+    lines = pformat(value).split('\n')
+    if len(lines) > MAX_DIFF_VALUE_LINES:
+        lines = lines[: MAX_DIFF_VALUE_LINES - 1] + [f'... {len(lines) - MAX_DIFF_VALUE_LINES + 1} more lines']
+    return '\n'.join(lines)
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """
+    Actual logic for updating code examples.
+
+    Under pytest-xdist, workers send their replacements to the controller which applies them all at once,
+    see `pytest_testnodedown`.
+    """
+    config = session.config
+    workeroutput = getattr(config, 'workeroutput', None)
+    if workeroutput is not None:
+        workeroutput[WORKER_OUTPUT_KEY] = json.dumps([tr.to_dict() for tr in to_replace])
+        to_replace.clear()
+        workeroutput[BENCH_WORKER_OUTPUT_KEY] = json.dumps({name: s.to_dict() for name, s in bench_stats.items()})
+        bench_stats.clear()
+    else:
+        apply_replacements(config.getoption('insert_assert_print'))
+        save_path = config.getoption('devtools_bench_save', None)
+        if save_path and bench_stats:
+            from .baseline import save
+
+            save(bench_stats, save_path)
+    snapshot_keys.clear()
+    call_sites.clear()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node: Any, error: Any) -> None:
+    """
+    pytest-xdist hook called on the controller when a worker finishes, collect the worker's replacements.
+    """
+    workeroutput = getattr(node, 'workeroutput', {})
+    data = workeroutput.get(WORKER_OUTPUT_KEY)
+    if data:
+        to_replace.extend(ToReplace.from_dict(d) for d in json.loads(data))
+    data = workeroutput.get(BENCH_WORKER_OUTPUT_KEY)
+    if data:
+        for name, d in json.loads(data).items():
+            bench_stats.setdefault(name, TimerStats()).merge(TimerStats.from_dict(d))
+
+
+def apply_replacements(print_instead: bool) -> None:
     if not to_replace:
         return None
 
-    print_instead = pytestconfig.getoption('insert_assert_print')
+    # group by file without assuming replacements for a file are contiguous, e.g. with interleaved tests
+    by_file: dict[Path, list[ToReplace]] = {}
+    for tr in to_replace:
+        by_file.setdefault(tr.file, []).append(tr)
 
     highlight = None
     if print_instead:
         highlight = get_pygments()
+        format_replacements(to_replace)
+    else:
+        # only the first replacement for each line is used
+        first: dict[tuple[Path, int], ToReplace] = {}
+        for tr in to_replace:
+            first.setdefault((tr.file, tr.start_line), tr)
+        format_replacements(list(first.values()))
+        write_snapshots(list(first.values()))
 
-    files = 0
     dup_count = 0
+    bytes_changed = 0
     summary = []
-    for file, group in groupby(to_replace, key=lambda tr: tr.file):
-        # we have to substitute lines in reverse order to avoid messing up line numbers
-        lines = file.read_text().splitlines()
-        duplicates: set[int] = set()
-        for tr in sorted(group, key=lambda x: x.start_line, reverse=True):
-            if print_instead:
+    for file, group in by_file.items():
+        if print_instead:
+            for tr in sorted(group, key=lambda x: x.start_line, reverse=True):
                 hr = '-' * 80
                 code = highlight(tr.code) if highlight else tr.code
                 line_no = f'{tr.start_line}' if tr.start_line == tr.end_line else f'{tr.start_line}-{tr.end_line}'
                 summary.append(f'{file} - {line_no}:\n{hr}\n{code}{hr}\n')
-            else:
-                if tr.start_line in duplicates:
-                    dup_count += 1
-                else:
-                    duplicates.add(tr.start_line)
-                    lines[tr.start_line - 1 : tr.end_line] = tr.code.splitlines()
-        if not print_instead:
-            file.write_text('\n'.join(lines))
-        files += 1
+        else:
+            dups, changed = rewrite_file(file, group)
+            dup_count += dups
+            bytes_changed += changed
+
+    files = len(by_file)
     prefix = 'Printed' if print_instead else 'Replaced'
-    summary.append(
-        f'{prefix} {len(to_replace)} insert_assert() call{plural(to_replace)} in {files} file{plural(files)}'
-    )
+    line = f'{prefix} {len(to_replace)} insert_assert() call{plural(to_replace)} in {files} file{plural(files)}'
+    if not print_instead:
+        line += f' ({bytes_changed:+,} bytes)'
+    summary.append(line)
     if dup_count:
         summary.append(
             f'\n{dup_count} insert skipped because an assert statement on that line had already be inserted!'
@@ -168,10 +511,132 @@ def insert_assert_session(pytestconfig: pytest.Config) -> Generator[None, None,
     to_replace.clear()
 
 
-def pytest_terminal_summary() -> None:
+def write_snapshots(replacements: list[ToReplace]) -> None:
+    updates: dict[Path, dict[str, Any]] = {}
+    for tr in replacements:
+        if tr.snapshot_key is not None:
+            updates.setdefault(snapshot_path(tr.file), {})[tr.snapshot_key] = tr.snapshot_value
+    for path, snapshots in updates.items():
+        update_snapshots(path, snapshots)
+
+
+# unlike str.splitlines(), only split on the line endings python itself recognises in source, so characters like
+# form feeds in strings aren't treated as line breaks
+LINE_ENDINGS = re.compile(r'\r\n|\r|\n')
+
+
+def split_lines(content: str) -> list[str]:
+    lines = LINE_ENDINGS.split(content)
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+
+def rewrite_file(file: Path, replacements: list[ToReplace]) -> tuple[int, int]:
+    """
+    Apply all replacements for a file in one pass and write it atomically via a temporary file, preserving line
+    endings and whether the file ends with a newline.
+
+    Returns the number of duplicate replacements skipped and the change in the file's size in bytes.
+    """
+    with file.open(encoding='utf-8', newline='') as f:
+        content = f.read()
+    newline = '\r\n' if '\r\n' in content else '\n'
+    lines = split_lines(content)
+
+    by_line: dict[int, ToReplace] = {}
+    for tr in replacements:
+        by_line.setdefault(tr.start_line, tr)
+    dup_count = len(replacements) - len(by_line)
+
+    # build the new file front to back from the original lines, so line numbers never go stale
+    new_lines: list[str] = []
+    position = 0
+    for start_line in sorted(by_line):
+        tr = by_line[start_line]
+        if start_line - 1 < position:
+            # overlaps the previous replacement
+            dup_count += 1
+            continue
+        new_lines.extend(lines[position : start_line - 1])
+        new_lines.extend(split_lines(tr.code))
+        position = tr.end_line if tr.end_line is not None else start_line
+    new_lines.extend(lines[position:])
+
+    new_content = newline.join(new_lines)
+    if content.endswith(('\n', '\r')):
+        new_content += newline
+    if new_content == content:
+        return dup_count, 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=file.parent, prefix=f'.{file.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(new_content)
+        shutil.copymode(file, tmp_path)
+        os.replace(tmp_path, file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return dup_count, len(new_content.encode()) - len(content.encode())
+
+
+# above this many snippets, files are formatted in parallel
+PARALLEL_FORMAT_THRESHOLD = 200
+SNIPPET_MARKER = '# devtools-insert-assert-snippet\n'
+
+
+def format_replacements(replacements: list[ToReplace]) -> None:
+    """
+    Format the code of replacements with black in one batch per file, files are formatted in a process pool
+    when there are many snippets.
+    """
+    by_file: dict[Path, list[ToReplace]] = {}
+    for tr in replacements:
+        by_file.setdefault(tr.file, []).append(tr)
+    batches = [[tr.code for tr in group] for group in by_file.values()]
+
+    if len(batches) > 1 and len(replacements) >= PARALLEL_FORMAT_THRESHOLD:
+        with ProcessPoolExecutor(min(len(batches), os.cpu_count() or 1)) as pool:
+            formatted = list(pool.map(format_batch, batches))
+    else:
+        formatted = [format_batch(batch) for batch in batches]
+
+    for group, codes in zip(by_file.values(), formatted):
+        for tr, code in zip(group, codes):
+            tr.code = textwrap.indent(code, tr.indent * ' ')
+
+
+def format_batch(snippets: list[str]) -> list[str]:
+    """
+    Format snippets with black by joining them into one module separated by marker comments, formatting that
+    and splitting it apart again.
+
+    If the snippets aren't valid python together, or black moves the markers, they're formatted one by one.
+    """
+    format_code = load_black()
+    if len(snippets) > 1:
+        joined = ''.join(f'{SNIPPET_MARKER}{snippet}\n' for snippet in snippets)
+        try:
+            ast.parse(joined)
+        except SyntaxError:
+            pass
+        else:
+            parts = format_code(joined).split(SNIPPET_MARKER)
+            if len(parts) == len(snippets) + 1 and not parts[0].strip():
+                return [part.rstrip('\n') + '\n' for part in parts[1:]]
+    return [format_code(snippet) for snippet in snippets]
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
     summary = insert_assert_summary.get(None)
     if summary:
         print('\n'.join(summary))
+    top = config.getoption('devtools_durations', None)
+    if top is not None and durations:
+        terminalreporter.write_sep('=', f'devtools durations{f" (top {top})" if top else ""}')
+        for line in format_durations(top):
+            terminalreporter.write_line(line)
 
 
 def custom_repr(value: Any) -> Any:
@@ -205,18 +670,40 @@ def plural(v: int | Sized) -> str:
 @lru_cache(maxsize=None)
 def load_black() -> Callable[[str], str]:
     """
-    Build black configuration from "pyproject.toml".
-
-    Black doesn't have a nice self-contained API for reading pyproject.toml, hence all this.
+    Function to format code with black configured from "pyproject.toml", code is returned as is if black
+    isn't installed.
     """
     try:
         from black import format_file_contents
-        from black.files import find_pyproject_toml, parse_pyproject_toml
-        from black.mode import Mode, TargetVersion
         from black.parsing import InvalidInput
+        from black.report import NothingChanged
     except ImportError:
         return lambda x: x
 
+    mode, fast = black_config()
+
+    def format_code(code: str) -> str:
+        try:
+            return format_file_contents(code, fast=fast, mode=mode)
+        except NothingChanged:
+            # batches of snippets can already be formatted
+            return code
+        except InvalidInput as e:
+            print('black error, you will need to format the code manually,', e)
+            return code
+
+    return format_code
+
+
+def black_config() -> tuple[Any, bool]:
+    """
+    Build black configuration from "pyproject.toml".
+
+    Black doesn't have a nice self-contained API for reading pyproject.toml, hence all this.
+    """
+    from black.files import find_pyproject_toml, parse_pyproject_toml
+    from black.mode import Mode, TargetVersion
+
     def convert_target_version(target_version_config: Any) -> set[Any] | None:
         if target_version_config is not None:
             return None
@@ -262,16 +749,7 @@ def load_black() -> Callable[[str], str]:
             mode_ = Mode(**kwargs)
             fast = bool(config.get('fast'))
 
-    mode = mode_ or Mode()
-
-    def format_code(code: str) -> str:
-        try:
-            return format_file_contents(code, fast=fast, mode=mode)
-        except InvalidInput as e:
-            print('black error, you will need to format the code manually,', e)
-            return code
-
-    return format_code
+    return mode_ or Mode(), fast
 
 
 # isatty() is false inside pytest, hence calling this now
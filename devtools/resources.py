@@ -0,0 +1,210 @@
+"""
+Optional resource usage captured alongside wall time by `Timer`: CPU time, garbage collection and memory allocation.
+
+Each measurement is only set up when it's enabled, the gc callback and `tracemalloc` are only active while a timer
+using them is running.
+"""
+import gc
+from time import perf_counter_ns, process_time_ns, thread_time_ns
+
+__all__ = 'ResourceUsage', 'ResourceTotals', 'format_bytes'
+
+MYPY = False
+if MYPY:
+    from typing import Any, Dict, Optional
+
+# required for type hinting since `ResourceUsage` and `ResourceTotals` have methods called `str`
+StrType = str
+
+
+class _GcMonitor:
+    """
+    Counts garbage collections and the time they take using `gc.callbacks`, the callback is only installed
+    while at least one timer is using it.
+    """
+
+    def __init__(self) -> None:
+        self.collections = 0
+        self.pause_ns = 0
+        self._users = 0
+        self._start = 0
+
+    def acquire(self) -> None:
+        if self._users == 0:
+            gc.callbacks.append(self._callback)
+        self._users += 1
+
+    def release(self) -> None:
+        self._users -= 1
+        if self._users == 0:
+            gc.callbacks.remove(self._callback)
+
+    def _callback(self, phase: str, info: 'Dict[str, Any]') -> None:
+        if phase == 'start':
+            self._start = perf_counter_ns()
+        else:
+            self.collections += 1
+            self.pause_ns += perf_counter_ns() - self._start
+
+
+class _MemoryMonitor:
+    """
+    Starts `tracemalloc` while at least one timer is using it, unless it was already tracing.
+    """
+
+    def __init__(self) -> None:
+        self._users = 0
+        self._started = False
+
+    def acquire(self) -> None:
+        import tracemalloc
+
+        if self._users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        self._users += 1
+
+    def release(self) -> None:
+        self._users -= 1
+        if self._users == 0 and self._started:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._started = False
+
+
+gc_monitor = _GcMonitor()
+memory_monitor = _MemoryMonitor()
+
+
+class ResourceUsage:
+    """
+    Resource usage over one timed block, `None` values weren't measured.
+    """
+
+    __slots__ = (
+        'cpu_ns',
+        'thread_ns',
+        'gc_collections',
+        'gc_pause_ns',
+        'memory_delta',
+        'memory_peak',
+        '_cpu_start',
+        '_thread_start',
+        '_gc_start',
+        '_memory_start',
+    )
+
+    def __init__(self, cpu: bool = False, gc: bool = False, memory: bool = False) -> None:
+        self.cpu_ns: 'Optional[int]' = None
+        self.thread_ns: 'Optional[int]' = None
+        self.gc_collections: 'Optional[int]' = None
+        self.gc_pause_ns: 'Optional[int]' = None
+        self.memory_delta: 'Optional[int]' = None
+        self.memory_peak: 'Optional[int]' = None
+        self._cpu_start = (process_time_ns(), thread_time_ns()) if cpu else None
+        self._gc_start = None
+        if gc:
+            gc_monitor.acquire()
+            self._gc_start = gc_monitor.collections, gc_monitor.pause_ns
+        self._memory_start = None
+        if memory:
+            import tracemalloc
+
+            memory_monitor.acquire()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+
+    def capture(self) -> None:
+        if self._cpu_start is not None:
+            process_start, thread_start = self._cpu_start
+            self.cpu_ns = process_time_ns() - process_start
+            self.thread_ns = thread_time_ns() - thread_start
+            self._cpu_start = None
+        if self._gc_start is not None:
+            collections_start, pause_start = self._gc_start
+            self.gc_collections = gc_monitor.collections - collections_start
+            self.gc_pause_ns = gc_monitor.pause_ns - pause_start
+            self._gc_start = None
+            gc_monitor.release()
+        if self._memory_start is not None:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory_delta = current - self._memory_start
+            # before python 3.9 the peak can't be reset so it may include allocations from before the timer started
+            self.memory_peak = max(peak - self._memory_start, 0)
+            self._memory_start = None
+            memory_monitor.release()
+
+    def str(self, dp: int = 3) -> StrType:
+        parts = []
+        if self.cpu_ns is not None and self.thread_ns is not None:
+            parts.append(f'cpu={self.cpu_ns / 1e9:0.{dp}f}s thread={self.thread_ns / 1e9:0.{dp}f}s')
+        if self.gc_collections is not None and self.gc_pause_ns is not None:
+            parts.append(f'gc={self.gc_collections} ({self.gc_pause_ns / 1e9:0.{dp}f}s)')
+        if self.memory_delta is not None and self.memory_peak is not None:
+            parts.append(f'mem={format_bytes(self.memory_delta, sign=True)} peak={format_bytes(self.memory_peak)}')
+        return ' '.join(parts)
+
+    def __str__(self) -> StrType:
+        return self.str()
+
+
+class ResourceTotals:
+    """
+    Aggregated resource usage over many timed blocks, used by `Timer.summary()`.
+    """
+
+    __slots__ = 'count', 'cpu_ns', 'thread_ns', 'gc_collections', 'gc_pause_ns', 'memory_delta', 'memory_peak'
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.cpu_ns = 0
+        self.thread_ns = 0
+        self.gc_collections = 0
+        self.gc_pause_ns = 0
+        self.memory_delta = 0
+        self.memory_peak = 0
+
+    def add(self, usage: ResourceUsage) -> None:
+        self.count += 1
+        self.cpu_ns += usage.cpu_ns or 0
+        self.thread_ns += usage.thread_ns or 0
+        self.gc_collections += usage.gc_collections or 0
+        self.gc_pause_ns += usage.gc_pause_ns or 0
+        self.memory_delta += usage.memory_delta or 0
+        self.memory_peak = max(self.memory_peak, usage.memory_peak or 0)
+
+    def merge(self, other: 'ResourceTotals') -> None:
+        self.count += other.count
+        self.cpu_ns += other.cpu_ns
+        self.thread_ns += other.thread_ns
+        self.gc_collections += other.gc_collections
+        self.gc_pause_ns += other.gc_pause_ns
+        self.memory_delta += other.memory_delta
+        self.memory_peak = max(self.memory_peak, other.memory_peak)
+
+    def str(self, dp: int, cpu: bool, gc: bool, memory: bool) -> StrType:
+        if not self.count:
+            return ''
+        parts = []
+        if cpu:
+            parts.append(f'cpu mean={self.cpu_ns / self.count / 1e9:0.{dp}f}s')
+        if gc:
+            parts.append(f'gc={self.gc_collections} ({self.gc_pause_ns / 1e9:0.{dp}f}s)')
+        if memory:
+            mean = format_bytes(self.memory_delta // self.count, sign=True)
+            parts.append(f'mem mean={mean} peak max={format_bytes(self.memory_peak)}')
+        return ' '.join(parts)
+
+
+def format_bytes(n: int, sign: bool = False) -> str:
+    prefix = ('+' if n >= 0 else '-') if sign else ''
+    n = abs(n)
+    for unit in 'B', 'KiB', 'MiB':
+        if n < 1024:
+            return f'{prefix}{n:0.0f}{unit}' if unit == 'B' else f'{prefix}{n:0.1f}{unit}'
+        n /= 1024  # type: ignore[assignment]
+    return f'{prefix}{n:0.1f}GiB'
@@ -0,0 +1,133 @@
+from time import perf_counter_ns
+
+__all__ = 'Sampler', 'parse_sample'
+
+MYPY = False
+if MYPY:
+    from types import FrameType
+    from typing import Any, Dict, List, Optional, Tuple, Union
+
+EVERY = 'every'
+ONCE = 'once'
+RATE = 'rate'
+
+
+class Sampler:
+    """
+    Decides, per call site, whether a `debug()` call should be emitted.
+
+    Call sites are keyed on the id of `f_code` and `f_lasti` of the calling frame, so the decision is a dict lookup
+    and an integer increment - no line number lookup, source inspection or formatting happens for suppressed calls.
+
+    * `Sampler('every', n)` emits the first call and then every n-th call from each site
+    * `Sampler('once')` emits only the first call from each site
+    * `Sampler('rate', per_second)` emits at most `per_second` calls per second from each site
+    """
+
+    __slots__ = 'mode', 'value', '_interval_ns', '_sites'
+
+    def __init__(self, mode: str, value: float = 1) -> None:
+        if mode not in {EVERY, ONCE, RATE}:
+            raise ValueError(f'invalid sampling mode {mode!r}, should be "every", "once" or "rate"')
+        if value <= 0:
+            raise ValueError(f'invalid sampling value {value!r}, should be greater than zero')
+        if mode == EVERY:
+            value = max(int(value), 1)
+        self.mode = mode
+        self.value = value
+        self._interval_ns = int(1_000_000_000 / value) if mode == RATE else 0
+        # each site maps to [calls, suppressed since last reported, time of last emitted call, code, location, file,
+        # highlight], the last three are set by `emitted()`
+        self._sites: 'Dict[Tuple[int, int], List[Any]]' = {}
+
+    def check(self, frame: 'FrameType') -> int:
+        """
+        Returns -1 if this call should be suppressed, otherwise the number of calls suppressed at this
+        call site since they were last reported.
+        """
+        code = frame.f_code
+        # code objects are hashed by value which is slow, so their id is used, the code object is kept in the site
+        # so the id can't be reused
+        key = id(code), frame.f_lasti
+        site = self._sites.get(key)
+        if site is None:
+            self._sites[key] = [1, 0, perf_counter_ns() if self._interval_ns else 0, code, None, None, False]
+            return 0
+
+        mode = self.mode
+        if mode == ONCE:
+            site[1] += 1
+            return -1
+        site[0] += 1
+        if mode == EVERY:
+            emit = (site[0] - 1) % self.value == 0
+        else:
+            now = perf_counter_ns()
+            emit = now - site[2] >= self._interval_ns
+            if emit:
+                site[2] = now
+
+        if emit:
+            suppressed = site[1]
+            site[1] = 0
+            return suppressed
+        else:
+            site[1] += 1
+            return -1
+
+    def emitted(self, frame: 'FrameType', location: str, file: 'Any', highlight: bool) -> None:
+        """
+        Record where output from a call site was printed, so suppressed calls can be reported by `flush()`.
+        """
+        site = self._sites.get((id(frame.f_code), frame.f_lasti))
+        if site is not None:
+            site[4], site[5], site[6] = location, file, highlight
+
+    def suppressed(self) -> int:
+        """
+        Total number of calls suppressed since they were last reported.
+        """
+        return sum(site[1] for site in self._sites.values())
+
+    def flush(self) -> 'List[Tuple[str, Any]]':
+        """
+        Returns summaries and their files for call sites with calls suppressed since their output was last printed,
+        and resets the suppressed counts. Without this, sites which stop being emitted, e.g. with "once", would never
+        report them.
+        """
+        from .ansi import sformat
+
+        summaries = []
+        for site in self._sites.values():
+            if site[1] and site[4] is not None:
+                text = f'{site[4]} ({site[1]} call{"" if site[1] == 1 else "s"} suppressed)'
+                summaries.append((sformat(text, sformat.dim, apply=site[6]), site[5]))
+                site[1] = 0
+        return summaries
+
+    def reset(self) -> None:
+        self._sites.clear()
+
+    def __repr__(self) -> str:
+        if self.mode == ONCE:
+            return f'<Sampler {self.mode}>'
+        return f'<Sampler {self.mode} {self.value:g}>'
+
+
+def parse_sample(sample: 'Union[None, str, Sampler]') -> 'Optional[Sampler]':
+    """
+    Build a `Sampler` from a specification like "every:10", "once", "rate:2.5" or "10" (equivalent to "every:10"),
+    this is the format used for the `PY_DEVTOOLS_SAMPLE` environment variable.
+    """
+    if sample is None or isinstance(sample, Sampler):
+        return sample
+    sample = sample.strip().lower()
+    if not sample:
+        return None
+    mode, _, value = sample.partition(':')
+    if not value and mode not in {EVERY, ONCE, RATE}:
+        mode, value = EVERY, mode
+    try:
+        return Sampler(mode, float(value) if value else 1)
+    except ValueError as e:
+        raise ValueError(f'invalid sampling specification {sample!r}: {e}') from e
@@ -0,0 +1,122 @@
+"""
+External snapshot files for large `insert_assert()` values, see `--insert-assert-snapshot-size`.
+
+Values are stored as JSON in `__snapshots__/<test module>.json` next to the test module, keyed by test function
+and argument, the inserted assertion compares against `snapshot(key)` which loads the file lazily the first time
+it's compared.
+"""
+import json
+import os
+import sys
+import tempfile
+from enum import Enum
+from pathlib import Path
+
+__all__ = 'snapshot', 'Snapshot', 'to_snapshot', 'snapshot_path', 'update_snapshots'
+
+MYPY = False
+if MYPY:
+    from typing import Any, Dict, Optional, Tuple
+
+SNAPSHOT_DIR = '__snapshots__'
+
+# parsed snapshot files, keyed by path and checked against the file's modification time
+_cache: 'Dict[Path, Tuple[int, Dict[str, Any]]]' = {}
+
+
+def snapshot_path(test_file: 'Path') -> 'Path':
+    return test_file.parent / SNAPSHOT_DIR / f'{test_file.stem}.json'
+
+
+def to_snapshot(value: 'Any') -> 'Any':
+    """
+    Convert a value to the JSON compatible form it's stored and compared in: sequences become lists, sets become
+    sorted lists, dict keys become strings and anything else JSON can't represent becomes its repr.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    elif isinstance(value, dict):
+        return {k if isinstance(k, str) else repr(k): to_snapshot(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [to_snapshot(v) for v in value]
+    elif isinstance(value, (set, frozenset)):
+        return sorted((to_snapshot(v) for v in value), key=repr)
+    elif isinstance(value, Enum):
+        return f'{value.__class__.__name__}.{value.name}'
+    else:
+        return repr(value)
+
+
+def load_snapshots(path: 'Path') -> 'Dict[str, Any]':
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with path.open(encoding='utf-8') as f:
+        data = json.load(f)
+    _cache[path] = mtime, data
+    return data
+
+
+def update_snapshots(path: 'Path', updates: 'Dict[str, Any]') -> None:
+    """
+    Add or replace snapshots in a file, written with sorted keys so changes diff cleanly.
+    """
+    data = dict(load_snapshots(path))
+    data.update(updates)
+    path.parent.mkdir(exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write('\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _cache.pop(path, None)
+
+
+class Snapshot:
+    """
+    A value stored in a snapshot file, compares equal to values which convert to the same snapshot.
+    """
+
+    __slots__ = 'path', 'key'
+
+    def __init__(self, path: 'Path', key: str) -> None:
+        self.path = path
+        self.key = key
+
+    @property
+    def value(self) -> 'Any':
+        try:
+            return load_snapshots(self.path)[self.key]
+        except KeyError:
+            raise KeyError(
+                f'snapshot {self.key!r} not found in {self.path}, use insert_assert() to create it'
+            ) from None
+
+    def __eq__(self, other: 'Any') -> bool:
+        if isinstance(other, Snapshot):
+            return self.value == other.value
+        return self.value == to_snapshot(other)
+
+    def __ne__(self, other: 'Any') -> bool:
+        return not self == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f'snapshot({self.key!r})'
+
+
+def snapshot(key: str, *, file: 'Optional[str]' = None) -> Snapshot:
+    """
+    Reference a snapshot stored for the calling test module.
+    """
+    test_file = Path(file or sys._getframe(1).f_code.co_filename)
+    return Snapshot(snapshot_path(test_file), key)
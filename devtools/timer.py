@@ -1,51 +1,345 @@
-from time import perf_counter
+import os
+import threading
+from contextvars import ContextVar
+from math import ceil
+from time import perf_counter_ns
+from weakref import WeakSet
 
-__all__ = ('Timer',)
+from .resources import ResourceTotals, ResourceUsage
+
+__all__ = 'Timer', 'TimerStats', 'TimerRegistry'
 
 MYPY = False
 if MYPY:
-    from typing import Any, List, Optional
+    from pathlib import Path
+    from typing import IO, Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+    from .baseline import Comparison
+    from .bench import BenchResult
+    from .timer_export import SpanExporter
+
+    F = TypeVar('F', bound=Callable[..., Any])
 
 # required for type hinting because I (stupidly) added methods called `str`
 StrType = str
 
+# each power of two is split into 2**_SUB_BITS histogram buckets, giving percentiles within ~1.6%
+_SUB_BITS = 5
+_SUB = 1 << _SUB_BITS
+PERCENTILES = 0.5, 0.9, 0.99, 0.999
+
 
 class TimerResult:
-    def __init__(self, name: 'Optional[str]' = None, verbose: bool = True) -> None:
+    __slots__ = '_name', 'verbose', 'resources', '_start_ns', '_finish_ns'
+
+    def __init__(
+        self, name: 'Optional[str]' = None, verbose: bool = True, resources: 'Optional[ResourceUsage]' = None
+    ) -> None:
         self._name = name
         self.verbose = verbose
-        self.finish: 'Optional[float]' = None
-        self.start = perf_counter()
+        self.resources = resources
+        self._finish_ns: 'Optional[int]' = None
+        self._start_ns = perf_counter_ns()
+
+    @property
+    def start(self) -> float:
+        return self._start_ns / 1e9
+
+    @property
+    def finish(self) -> 'Optional[float]':
+        return None if self._finish_ns is None else self._finish_ns / 1e9
 
     def capture(self) -> None:
-        self.finish = perf_counter()
+        self._finish_ns = perf_counter_ns()
+        if self.resources is not None:
+            self.resources.capture()
 
-    def elapsed(self) -> float:
-        if self.finish:
-            return self.finish - self.start
+    def elapsed_ns(self) -> int:
+        if self._finish_ns is None:
+            return -1
         else:
+            return self._finish_ns - self._start_ns
+
+    def elapsed(self) -> float:
+        if self._finish_ns is None:
             return -1
+        else:
+            return (self._finish_ns - self._start_ns) / 1e9
 
     def str(self, dp: int = 3) -> StrType:
         if self._name:
-            return f'{self._name}: {self.elapsed():0.{dp}f}s elapsed'
+            s = f'{self._name}: {self.elapsed():0.{dp}f}s elapsed'
         else:
-            return f'{self.elapsed():0.{dp}f}s elapsed'
+            s = f'{self.elapsed():0.{dp}f}s elapsed'
+        if self.resources is not None:
+            s += f' {self.resources.str(dp)}'
+        return s
 
     def __str__(self) -> StrType:
         return self.str()
 
 
-_SUMMARY_TEMPLATE = '{count} times: mean={mean:0.{dp}f}s stdev={stddev:0.{dp}f}s min={min:0.{dp}f}s max={max:0.{dp}f}s'
+class TimerStats:
+    """
+    Streaming statistics for durations in nanoseconds, memory use is constant whatever the number of samples.
+
+    Mean and variance use Welford's algorithm, percentiles come from a histogram with logarithmically sized
+    buckets so they're accurate to within ~1.6%.
+    """
+
+    __slots__ = 'count', 'total', 'mean', '_m2', 'min', 'max', '_buckets'
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = 0
+        self.max = 0
+        self._buckets: 'Dict[int, int]' = {}
+
+    def add(self, ns: int) -> None:
+        if ns < 0:
+            ns = 0
+        count = self.count = self.count + 1
+        self.total += ns
+        delta = ns - self.mean
+        self.mean += delta / count
+        self._m2 += delta * (ns - self.mean)
+        if count == 1:
+            self.min = self.max = ns
+        elif ns < self.min:
+            self.min = ns
+        elif ns > self.max:
+            self.max = ns
+
+        index = _bucket_index(ns)
+        buckets = self._buckets
+        buckets[index] = buckets.get(index, 0) + 1
+
+    def merge(self, other: 'TimerStats') -> None:
+        """
+        Combine stats from another `TimerStats`, e.g. from another thread or process.
+        """
+        if not other.count:
+            return
+        if not self.count:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        # copy the buckets first, other may still be recording in another thread
+        for index, n in list(other._buckets.items()):
+            self._buckets[index] = self._buckets.get(index, 0) + n
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return self.variance**0.5
+
+    def percentile(self, q: float) -> float:
+        """
+        Approximate `q` (between 0 and 1) percentile in nanoseconds.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, ceil(round(q * self.count, 9)))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return float(min(max(_bucket_mid(index), self.min), self.max))
+        return float(self.max)  # pragma: no cover
+
+    def histogram(self) -> 'List[List[int]]':
+        """
+        Histogram as `[bucket_index, count]` pairs, see `bucket_value()` to convert indexes to nanoseconds.
+        """
+        return [[index, self._buckets[index]] for index in sorted(self._buckets)]
+
+    def to_dict(self) -> 'Dict[str, Any]':
+        """
+        JSON serialisable representation, see `from_dict()`.
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'm2': self._m2,
+            'min': self.min,
+            'max': self.max,
+            'histogram': self.histogram(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: 'Dict[str, Any]') -> 'TimerStats':
+        stats = cls()
+        stats.count = data['count']
+        stats.total = data['total']
+        stats.mean = data['mean']
+        stats._m2 = data['m2']
+        stats.min = data['min']
+        stats.max = data['max']
+        stats._buckets = {index: n for index, n in data['histogram']}
+        return stats
+
+    def summary(self, dp: int = 3) -> StrType:
+        s = 1e9
+        percentiles = ' '.join(f'{percentile_name(q)}={self.percentile(q) / s:0.{dp}f}s' for q in PERCENTILES)
+        return _SUMMARY_TEMPLATE.format(
+            count=self.count,
+            mean=self.mean / s,
+            stddev=self.stdev / s,
+            min=self.min / s,
+            max=self.max / s,
+            percentiles=percentiles,
+            dp=dp,
+        )
+
+    def __repr__(self) -> StrType:
+        return f'<TimerStats count={self.count} mean={self.mean:0.0f}ns>'
+
+
+def _bucket_index(ns: int) -> int:
+    if ns < 2 * _SUB:
+        return ns
+    shift = ns.bit_length() - _SUB_BITS - 1
+    return shift * _SUB + (ns >> shift)
+
+
+def bucket_value(index: int) -> int:
+    """
+    Lower bound in nanoseconds of a histogram bucket.
+    """
+    if index < 2 * _SUB:
+        return index
+    shift = index // _SUB - 1
+    return (index - shift * _SUB) << shift
+
+
+def _bucket_mid(index: int) -> int:
+    if index < 2 * _SUB:
+        return index
+    shift = index // _SUB - 1
+    return bucket_value(index) + ((1 << shift) >> 1)
+
+
+def percentile_name(q: float) -> str:
+    """
+    Label for a percentile between 0 and 1 as used in summaries, e.g. "p99" or "p999".
+    """
+    return 'p' + f'{q * 100:g}'.replace('.', '')
+
+
+_SUMMARY_TEMPLATE = (
+    '{count} times: mean={mean:0.{dp}f}s stdev={stddev:0.{dp}f}s min={min:0.{dp}f}s max={max:0.{dp}f}s {percentiles}'
+)
+
+
+class _TimerBuffer:
+    """
+    Results from one thread, only that thread adds to it so no locking is required.
+    """
+
+    __slots__ = 'results', 'stats', 'resource_totals'
+
+    def __init__(self) -> None:
+        self.results: 'List[TimerResult]' = []
+        self.stats = TimerStats()
+        self.resource_totals = ResourceTotals()
 
 
 class Timer:
-    def __init__(self, name: 'Optional[str]' = None, verbose: bool = True, file: 'Any' = None, dp: int = 3) -> None:
+    """
+    Times blocks of code, safe to use from multiple threads and asyncio tasks at once: each thread records into
+    its own buffer and timers started in a thread or task are captured in the same thread or task, buffers are
+    merged when `results`, `stats` or `summary()` are accessed.
+    """
+
+    def __init__(
+        self,
+        name: 'Optional[str]' = None,
+        verbose: bool = True,
+        file: 'Any' = None,
+        dp: int = 3,
+        streaming: bool = False,
+        cpu: bool = False,
+        gc: bool = False,
+        memory: bool = False,
+    ) -> None:
+        """
+        :param streaming: if True, individual results aren't kept, instead durations are added to `stats`
+            so memory use is constant however many times the timer is used.
+        :param cpu: if True, also measure process and thread CPU time
+        :param gc: if True, also count garbage collections and the time they take
+        :param memory: if True, also measure the change in allocated memory and peak allocation with `tracemalloc`
+        """
         self.file = file
         self.dp = dp
         self._name = name
         self._verbose = verbose
-        self.results: 'List[TimerResult]' = []
+        self.streaming = streaming
+        self._resources = cpu, gc, memory
+        self._local = threading.local()
+        self._buffers: 'List[_TimerBuffer]' = []
+        self._buffers_lock = threading.Lock()
+        # stats collected from other processes by `collect()`
+        self._collected: 'Dict[str, TimerStats]' = {}
+        _all_timers.add(self)
+
+    def _reset_after_fork(self) -> None:
+        # a forked worker shouldn't report results recorded by its parent before the fork
+        self._local = threading.local()
+        self._buffers = []
+        self._buffers_lock = threading.Lock()
+        self._collected = {}
+
+    @property
+    def results(self) -> 'List[TimerResult]':
+        """
+        Results from all threads ordered by start time, always empty in streaming mode.
+        """
+        if len(self._buffers) == 1:
+            return self._buffers[0].results
+        results = [r for buffer in list(self._buffers) for r in buffer.results]
+        results.sort(key=lambda r: r._start_ns)
+        return results
+
+    @property
+    def stats(self) -> TimerStats:
+        """
+        Stats from all threads and from other processes added with `collect()`, only populated in streaming mode.
+        """
+        stats = TimerStats()
+        for buffer in list(self._buffers):
+            stats.merge(buffer.stats)
+        for collected in self._collected.values():
+            stats.merge(collected)
+        return stats
+
+    @property
+    def resource_totals(self) -> ResourceTotals:
+        totals = ResourceTotals()
+        for buffer in list(self._buffers):
+            totals.merge(buffer.resource_totals)
+        return totals
+
+    def _buffer(self) -> _TimerBuffer:
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = _TimerBuffer()
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+            return buffer
 
     def __call__(self, name: 'Optional[str]' = None, verbose: 'Optional[bool]' = None) -> 'Timer':
         if name:
@@ -55,45 +349,521 @@ class Timer:
         return self
 
     def start(self, name: 'Optional[str]' = None, verbose: 'Optional[bool]' = None) -> 'Timer':
-        self.results.append(TimerResult(name or self._name, self._verbose if verbose is None else verbose))
+        resources = ResourceUsage(*self._resources) if any(self._resources) else None
+        r = TimerResult(name or self._name, self._verbose if verbose is None else verbose, resources)
+        if not self.streaming:
+            self._buffer().results.append(r)
+        _open_results.set(_open_results.get() + ((self, r),))
         return self
 
     def capture(self, verbose: 'Optional[bool]' = None) -> 'TimerResult':
-        r = self.results[-1]
+        """
+        Capture the most recently started timer in the current thread or task.
+        """
+        # drop any results already captured from a different thread or task
+        open_ = [(timer, r) for timer, r in _open_results.get() if r._finish_ns is None]
+        for i in range(len(open_) - 1, -1, -1):
+            if open_[i][0] is self:
+                r = open_.pop(i)[1]
+                _open_results.set(tuple(open_))
+                break
+        else:
+            _open_results.set(tuple(open_))
+            # started in a different thread or task, fall back to the most recently started unfinished result
+            unfinished = [r for r in self.results if r._finish_ns is None]
+            if not unfinished:
+                raise RuntimeError('timer not started')
+            r = unfinished[-1]
         r.capture()
+        if self.streaming:
+            buffer = self._buffer()
+            buffer.stats.add(r.elapsed_ns())
+            if r.resources is not None:
+                buffer.resource_totals.add(r.resources)
         print_ = r.verbose if verbose is None else verbose
         if print_:
             print(r.str(self.dp), file=self.file, flush=True)
         return r
 
     def summary(self, verbose: bool = False) -> 'List[float]':
+        """
+        Print a summary of results, returns the individual times in seconds except in streaming mode where
+        they aren't kept and an empty list is returned, use `stats` instead.
+        """
         times = []
-        for r in self.results:
-            if not r.finish:
-                r.capture()
-            if verbose:
-                print(f'    {r.str(self.dp)}', file=self.file)
-            times.append(r.elapsed())
-
-        if times:
-            from statistics import mean, stdev
-
-            print(
-                f'{len(times)} times: '
-                f'mean={mean(times):0.{self.dp}f}s '
-                f'stdev={stdev(times) if len(times) > 1 else 0:0.{self.dp}f}s '
-                f'min={min(times):0.{self.dp}f}s '
-                f'max={max(times):0.{self.dp}f}s',
-                file=self.file,
-                flush=True,
-            )
+        if self.streaming:
+            while any(timer is self and r._finish_ns is None for timer, r in _open_results.get()):
+                self.capture(verbose=False)
+            stats, totals = self.stats, self.resource_totals
+        else:
+            stats, totals = TimerStats(), ResourceTotals()
+            for r in self.results:
+                if r.finish is None:
+                    r.capture()
+                if verbose:
+                    print(f'    {r.str(self.dp)}', file=self.file)
+                times.append(r.elapsed())
+                stats.add(r.elapsed_ns())
+                if r.resources is not None:
+                    totals.add(r.resources)
+            for collected in self._collected.values():
+                stats.merge(collected)
+
+        if stats.count:
+            summary = stats.summary(self.dp)
+            if totals.count:
+                summary += ' ' + totals.str(self.dp, *self._resources)
+            print(summary, file=self.file, flush=True)
         else:
             raise RuntimeError('timer not started')
         return times
 
+    def stats_by_name(self) -> 'Dict[str, TimerStats]':
+        """
+        Stats for finished results grouped by result name, in streaming mode there's just one entry for the timer,
+        stats collected from other processes are included.
+        """
+        stats = self._local_stats_by_name()
+        for name, collected in self._collected.items():
+            stats.setdefault(name, TimerStats()).merge(collected)
+        return stats
+
+    def _local_stats_by_name(self) -> 'Dict[str, TimerStats]':
+        default = self._name or 'timer'
+        stats: 'Dict[str, TimerStats]' = {}
+        if self.streaming:
+            local = TimerStats()
+            for buffer in list(self._buffers):
+                local.merge(buffer.stats)
+            if local.count:
+                stats[default] = local
+        else:
+            for r in self.results:
+                if r.finish is not None:
+                    stats.setdefault(r._name or default, TimerStats()).add(r.elapsed_ns())
+        return stats
+
+    def dump(self, directory: 'Union[str, Path]') -> 'Path':
+        """
+        Save this process's stats by name to a file in `directory` so they can be combined with stats from other
+        processes using `collect()`, e.g. call `dump()` at the end of each task run in a process pool.
+
+        Each process writes to its own file, which is replaced atomically so calling `dump()` repeatedly is
+        safe while another process is collecting.
+        """
+        from pathlib import Path
+
+        from .baseline import save
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'timer-{os.getpid()}-{id(self):x}.json'
+        tmp_path = path.with_suffix('.tmp')
+        # only this process's stats so collecting and dumping in the same process doesn't count anything twice
+        save(self._local_stats_by_name(), tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def collect(self, directory: 'Union[str, Path]') -> None:
+        """
+        Add stats saved by `dump()` in other processes to this timer, they're included in `stats`, `summary()`
+        and `stats_by_name()`. Collecting the same directory again replaces the previously collected stats.
+        """
+        from pathlib import Path
+
+        from .baseline import load
+
+        collected: 'Dict[str, TimerStats]' = {}
+        own_prefix = f'timer-{os.getpid()}-{id(self):x}.'
+        for path in sorted(Path(directory).glob('timer-*.json')):
+            if path.name.startswith(own_prefix):
+                continue
+            for name, stats in load(path).items():
+                collected.setdefault(name, TimerStats()).merge(stats)
+        self._collected = collected
+
+    def save(self, path: 'Union[str, Path]') -> None:
+        """
+        Save stats by name as a baseline for `compare()` or `python -m devtools compare`.
+        """
+        from .baseline import save
+
+        save(self.stats_by_name(), path)
+
+    def compare(
+        self,
+        baseline: 'Union[str, Path, Dict[str, TimerStats]]',
+        alpha: float = 0.05,
+        highlight: 'Optional[bool]' = None,
+    ) -> 'List[Comparison]':
+        """
+        Compare stats by name against a baseline saved with `save()`, prints a table of changes if the timer is
+        verbose. Changes are only considered significant if the p-value of a Mann-Whitney U test is below `alpha`.
+        """
+        return _compare(self.stats_by_name(), baseline, alpha, self.file if self._verbose else False, highlight)
+
+    def bench(
+        self,
+        func: 'Callable[..., Any]',
+        *args: 'Any',
+        duration_: float = 1.0,
+        rounds_: int = 20,
+        warmup_: int = 2,
+        gc_: bool = False,
+        **kwargs: 'Any',
+    ) -> 'BenchResult':
+        """
+        Benchmark `func(*args, **kwargs)`: the number of calls per round is chosen to take `duration_` seconds in
+        total over `rounds_` rounds, `warmup_` rounds are run first, the overhead of the timing loop is
+        subtracted and outlying rounds are rejected, garbage collection is disabled unless `gc_` is True.
+
+        The result is printed if the timer is verbose.
+        """
+        from .bench import bench
+
+        result = bench(
+            func,
+            args,
+            kwargs,
+            name=self._name,
+            duration=duration_,
+            rounds=rounds_,
+            warmup=warmup_,
+            enable_gc=gc_,
+        )
+        if self._verbose:
+            print(result.str(), file=self.file, flush=True)
+        return result
+
     def __enter__(self) -> 'Timer':
         self.start()
         return self
 
     def __exit__(self, *args: 'Any') -> None:
         self.capture()
+
+
+_all_timers: 'WeakSet[Timer]' = WeakSet()
+# timers which have been started but not yet captured in the current thread or task, one variable is shared by all
+# timers since a context keeps every variable ever set in it alive
+_open_results: 'ContextVar[Tuple[Tuple[Timer, TimerResult], ...]]' = ContextVar('devtools_timer_open', default=())
+
+
+_all_registries: 'WeakSet[TimerRegistry]' = WeakSet()
+
+
+def _reset_timers_after_fork() -> None:
+    for timer in list(_all_timers):
+        timer._reset_after_fork()
+    for registry in list(_all_registries):
+        registry._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_timers_after_fork)
+
+
+def format_duration(ns: float) -> StrType:
+    """
+    Format a duration in nanoseconds with units chosen to suit its size, e.g. "12.3ms".
+    """
+    for unit, scale in _UNITS:
+        if ns >= scale:
+            break
+    v = ns / scale
+    if v >= 100:
+        return f'{v:0.1f}{unit}'
+    elif v >= 10:
+        return f'{v:0.2f}{unit}'
+    else:
+        return f'{v:0.3f}{unit}'
+
+
+_UNITS = ('s', 1e9), ('ms', 1e6), ('us', 1e3), ('ns', 1)
+
+
+class SpanStats:
+    """
+    Stats for one path in the span tree: `stats` holds total times, `self_ns` the sum of time not spent in
+    child spans.
+    """
+
+    __slots__ = 'stats', 'self_ns'
+
+    def __init__(self) -> None:
+        self.stats = TimerStats()
+        self.self_ns = 0
+
+
+# the innermost open span in the current thread or asyncio task
+_current_span: 'ContextVar[Optional[Span]]' = ContextVar('devtools_current_span', default=None)
+
+
+class Span:
+    """
+    Context manager timing a block of code, see `TimerRegistry.span()`.
+
+    Spans nest: the innermost open span is tracked with a `ContextVar` so nesting is correct across threads and
+    asyncio tasks, times are aggregated both by name and by path from the outermost span.
+    """
+
+    __slots__ = 'name', 'path', '_registry', '_parent', '_token', '_start', '_child_ns'
+
+    def __init__(self, registry: 'TimerRegistry', name: str) -> None:
+        self.name = name
+        self._registry = registry
+        self.path: 'Tuple[str, ...]' = ()
+        self._parent: 'Optional[Span]' = None
+        self._token: 'Any' = None
+        self._start = 0
+        self._child_ns = 0
+
+    def __enter__(self) -> 'Span':
+        parent = self._parent = _current_span.get()
+        self.path = (*parent.path, self.name) if parent is not None else (self.name,)
+        self._token = _current_span.set(self)
+        self._child_ns = 0
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *args: 'Any') -> None:
+        finish = perf_counter_ns()
+        elapsed = finish - self._start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # exited in a different context to the one it was entered in
+            _current_span.set(self._parent)
+        if self._parent is not None:
+            self._parent._child_ns += elapsed
+        # children running concurrently in other tasks can take longer in total than their parent
+        self._registry.record(self.name, self.path, self._start, elapsed, max(elapsed - self._child_ns, 0))
+
+
+class TimerRegistry:
+    """
+    Named timings aggregated into streaming stats, available as `debug.timer`.
+
+    Calling the registry returns a new `Timer` as `debug.timer()` always has, while `measure()` and `span()`
+    record into `stats` by name and into `tree` by path of nested spans, they allocate nothing beyond the
+    span object itself so they can be left in production code. `report()` prints the span tree.
+
+    Spans from all threads record into the same stats under a lock, so counts and histograms always agree.
+    """
+
+    def __init__(self, file: 'Any' = None) -> None:
+        self.file = file
+        self.stats: 'Dict[str, TimerStats]' = {}
+        self.tree: 'Dict[Tuple[str, ...], SpanStats]' = {}
+        self.exporters: 'List[SpanExporter]' = []
+        self._lock = threading.Lock()
+        _all_registries.add(self)
+
+    def _reset_after_fork(self) -> None:
+        # the lock may have been held by another thread when the process forked
+        self._lock = threading.Lock()
+
+    def _copy_stats(self) -> 'Dict[str, TimerStats]':
+        copies = {}
+        with self._lock:
+            for name, stats in self.stats.items():
+                copy = copies[name] = TimerStats()
+                copy.merge(stats)
+        return copies
+
+    def __call__(
+        self,
+        name: 'Optional[str]' = None,
+        *,
+        verbose: bool = True,
+        file: 'Any' = None,
+        dp: int = 3,
+        streaming: bool = False,
+        cpu: bool = False,
+        gc: bool = False,
+        memory: bool = False,
+    ) -> Timer:
+        return Timer(name=name, verbose=verbose, file=file, dp=dp, streaming=streaming, cpu=cpu, gc=gc, memory=memory)
+
+    def bench(
+        self, func: 'Callable[..., Any]', *args: 'Any', name_: 'Optional[str]' = None, **kwargs: 'Any'
+    ) -> 'BenchResult':
+        """
+        Benchmark `func(*args, **kwargs)` and print the result, see `Timer.bench()` for options.
+        """
+        return Timer(name_, file=self.file).bench(func, *args, **kwargs)
+
+    def save(self, path: 'Union[str, Path]') -> None:
+        """
+        Save stats from `measure()` and `span()` as a baseline, see `Timer.save()`.
+        """
+        from .baseline import save
+
+        save(self._copy_stats(), path)
+
+    def compare(
+        self,
+        baseline: 'Union[str, Path, Dict[str, TimerStats]]',
+        alpha: float = 0.05,
+        highlight: 'Optional[bool]' = None,
+    ) -> 'List[Comparison]':
+        """
+        Compare stats from `measure()` and `span()` against a baseline and print the result, see `Timer.compare()`.
+        """
+        return _compare(self._copy_stats(), baseline, alpha, self.file, highlight)
+
+    def get(self, name: str) -> TimerStats:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats.setdefault(name, TimerStats())
+        return stats
+
+    def record(self, name: str, path: 'Tuple[str, ...]', start_ns: int, elapsed_ns: int, self_ns: int) -> None:
+        with self._lock:
+            self.get(name).add(elapsed_ns)
+            span_stats = self.tree.get(path)
+            if span_stats is None:
+                span_stats = self.tree[path] = SpanStats()
+            span_stats.stats.add(elapsed_ns)
+            span_stats.self_ns += self_ns
+        if self.exporters:
+            for exporter in self.exporters:
+                exporter.write(path, start_ns, elapsed_ns, self_ns)
+
+    def export(self, file: 'Union[str, Path, IO[str]]', format: str = 'chrome') -> 'SpanExporter':
+        """
+        Write spans to `file` as they close, either in the Chrome trace event format (`format='chrome'`) for
+        Perfetto or `chrome://tracing`, or in the collapsed stack format (`format='collapsed'`) for flamegraphs.
+
+        Use the returned exporter as a context manager or call its `close()` method to stop exporting.
+        """
+        from .timer_export import EXPORTERS
+
+        try:
+            exporter_cls = EXPORTERS[format]
+        except KeyError:
+            raise ValueError(f'invalid export format {format!r}, should be one of: {", ".join(EXPORTERS)}')
+        exporter = exporter_cls(file, registry=self)
+        self.exporters.append(exporter)
+        return exporter
+
+    def span(self, name: str) -> Span:
+        """
+        Time a block of code, e.g. `with debug.timer.span('db.query'): ...`.
+        """
+        return Span(self, name)
+
+    def measure(self, name: 'Optional[str]' = None) -> 'Callable[[F], F]':
+        """
+        Decorator timing every call to a function or coroutine function as a span, `name` defaults to
+        the function's qualified name.
+        """
+
+        def decorator(func: 'F') -> 'F':
+            from functools import wraps
+            from inspect import iscoroutinefunction
+
+            span_name = name or func.__qualname__
+
+            if iscoroutinefunction(func):
+
+                @wraps(func)
+                async def async_wrapper(*args: 'Any', **kwargs: 'Any') -> 'Any':
+                    with Span(self, span_name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper  # type: ignore[return-value]
+            else:
+
+                @wraps(func)
+                def wrapper(*args: 'Any', **kwargs: 'Any') -> 'Any':
+                    with Span(self, span_name):
+                        return func(*args, **kwargs)
+
+                return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def report(self, file: 'Any' = None) -> None:
+        """
+        Print the tree of spans, most expensive first at each level, with total and self time as percentages
+        of the total time of all outermost spans.
+        """
+        from .prettier import pformat
+
+        with self._lock:
+            roots = _build_tree(self.tree)
+        grand_total = sum(node.stats.stats.total for node in roots) or 1
+        print('\n'.join(pformat(root.with_total(grand_total)) for root in roots), file=file or self.file, flush=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+            self.tree.clear()
+
+
+def _compare(
+    stats: 'Dict[str, TimerStats]',
+    baseline: 'Union[str, Path, Dict[str, TimerStats]]',
+    alpha: float,
+    file: 'Any',
+    highlight: 'Optional[bool]',
+) -> 'List[Comparison]':
+    from .baseline import compare, format_comparisons, load
+    from .utils import use_highlight
+
+    if not isinstance(baseline, dict):
+        baseline = load(baseline)
+    comparisons = compare(baseline, stats)
+    if file is not False:
+        highlight = use_highlight(highlight, file)
+        print(format_comparisons(comparisons, alpha, highlight), file=file, flush=True)
+    return comparisons
+
+
+class _SpanNode:
+    __slots__ = 'name', 'stats', 'children', 'grand_total'
+
+    def __init__(self, name: str, stats: SpanStats) -> None:
+        self.name = name
+        self.stats = stats
+        self.children: 'List[_SpanNode]' = []
+        self.grand_total = 1
+
+    def with_total(self, grand_total: int) -> '_SpanNode':
+        self.grand_total = grand_total
+        for child in self.children:
+            child.with_total(grand_total)
+        return self
+
+    def __pretty__(self, fmt: 'Any', **kwargs: 'Any') -> 'Any':
+        stats = self.stats.stats
+        total_pc = stats.total / self.grand_total * 100
+        self_pc = self.stats.self_ns / self.grand_total * 100
+        yield (
+            f'{self.name}: total={format_duration(stats.total)} ({total_pc:0.1f}%) '
+            f'self={format_duration(self.stats.self_ns)} ({self_pc:0.1f}%) '
+            f'calls={stats.count} mean={format_duration(stats.mean)} p99={format_duration(stats.percentile(0.99))}'
+        )
+        if self.children:
+            yield 1
+            for i, child in enumerate(self.children):
+                if i:
+                    yield 0
+                yield fmt(child)
+            yield -1
+
+
+def _build_tree(tree: 'Dict[Tuple[str, ...], SpanStats]') -> 'List[_SpanNode]':
+    nodes = {path: _SpanNode(path[-1], stats) for path, stats in tree.items()}
+    roots = []
+    for path, node in nodes.items():
+        parent = nodes.get(path[:-1])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    for node in nodes.values():
+        node.children.sort(key=lambda n: -n.stats.stats.total)
+    roots.sort(key=lambda n: -n.stats.stats.total)
+    return roots
@@ -0,0 +1,114 @@
+"""
+Export timer spans as they close, see `TimerRegistry.export()`.
+
+Events are written to the file as each span closes, so memory use doesn't grow however long the export runs.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+
+__all__ = 'ChromeTraceExporter', 'CollapsedStackExporter', 'EXPORTERS'
+
+MYPY = False
+if MYPY:
+    from pathlib import Path
+    from typing import IO, Any, Dict, Optional, Tuple, Type, Union
+
+    from .timer import TimerRegistry
+
+
+class SpanExporter(ABC):
+    """
+    Base class for exporters, subclasses implement `write()` and optionally `start()` and `finish()` to write
+    anything needed before the first and after the last span.
+    """
+
+    def __init__(self, file: 'Union[str, Path, IO[str]]', registry: 'Optional[TimerRegistry]' = None) -> None:
+        if isinstance(file, (str, os.PathLike)):
+            self._file: 'IO[str]' = open(file, 'w')
+            self._close_file = True
+        else:
+            self._file = file
+            self._close_file = False
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+        self.count = 0
+        self.start()
+
+    def start(self) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, path: 'Tuple[str, ...]', start_ns: int, elapsed_ns: int, self_ns: int) -> None:
+        ...
+
+    def finish(self) -> None:
+        pass
+
+    def close(self) -> None:
+        """
+        Stop exporting spans and close the file.
+        """
+        if self._registry is not None:
+            self._registry.exporters.remove(self)
+            self._registry = None
+        with self._lock:
+            self.finish()
+            if self._close_file:
+                self._file.close()
+            else:
+                self._file.flush()
+
+    def __enter__(self) -> 'SpanExporter':
+        return self
+
+    def __exit__(self, *args: 'Any') -> None:
+        self.close()
+
+
+class ChromeTraceExporter(SpanExporter):
+    """
+    Writes spans as "complete" events in the Chrome trace event format, which can be opened with
+    [Perfetto](https://ui.perfetto.dev) or `chrome://tracing`.
+    """
+
+    def start(self) -> None:
+        self._file.write('[')
+
+    def write(self, path: 'Tuple[str, ...]', start_ns: int, elapsed_ns: int, self_ns: int) -> None:
+        event = {
+            'name': path[-1],
+            'cat': 'devtools',
+            'ph': 'X',
+            'ts': start_ns / 1000,
+            'dur': elapsed_ns / 1000,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': {'path': ';'.join(path), 'depth': len(path) - 1},
+        }
+        line = json.dumps(event, separators=(',', ':'))
+        with self._lock:
+            self._file.write(f'\n{line}' if self.count == 0 else f',\n{line}')
+            self.count += 1
+
+    def finish(self) -> None:
+        self._file.write('\n]\n')
+
+
+class CollapsedStackExporter(SpanExporter):
+    """
+    Writes the self time of each span in microseconds in the "collapsed stack" format used by
+    flamegraph tools, e.g. `flamegraph.pl`, `inferno` or speedscope. Stacks are written once per span,
+    these tools sum repeated stacks.
+    """
+
+    def write(self, path: 'Tuple[str, ...]', start_ns: int, elapsed_ns: int, self_ns: int) -> None:
+        line = f'{";".join(p.replace(";", ":") for p in path)} {self_ns // 1000}\n'
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+
+
+EXPORTERS: 'Dict[str, Type[SpanExporter]]' = {'chrome': ChromeTraceExporter, 'collapsed': CollapsedStackExporter}
@@ -149,6 +149,9 @@ class DataClassType(metaclass=MetaDataClassType):
 
 class MetaSQLAlchemyClassType(type):
     def __instancecheck__(self, instance: 'Any') -> bool:
+        if 'sqlalchemy' not in sys.modules:
+            # instance can't be a model, avoid importing sqlalchemy or retrying a failed import for every value
+            return False
         try:
             from sqlalchemy.orm import DeclarativeBase
         except ImportError:
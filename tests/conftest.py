@@ -1,5 +1,12 @@
 import os
 
+try:
+    # imported before any pytester runs: otherwise black is unloaded after each in-process run and since it's
+    # compiled, importing it again mixes old and new classes, e.g. `black.report.NothingChanged`
+    import black.report  # noqa: F401
+except ImportError:
+    pass
+
 pytest_plugins = ['pytester']
 
 
@@ -0,0 +1,166 @@
+import json
+import random
+import subprocess
+import sys
+
+import pytest
+
+from devtools import debug
+from devtools.ansi import strip_ansi
+from devtools.baseline import Comparison, compare, format_comparisons, load, mann_whitney, save
+from devtools.timer import Timer, TimerStats
+
+
+def make_stats(mean, n=200, spread=0.05, seed=0):
+    rand = random.Random(seed)
+    stats = TimerStats()
+    for _ in range(n):
+        stats.add(int(rand.gauss(mean, mean * spread)))
+    return stats
+
+
+def test_to_from_dict():
+    stats = make_stats(1_000_000)
+    loaded = TimerStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+    assert loaded.to_dict() == stats.to_dict()
+    assert loaded.percentile(0.99) == stats.percentile(0.99)
+
+
+def test_save_load(tmp_path):
+    path = tmp_path / 'baseline.json'
+    save({'a': make_stats(1000), 'b': make_stats(2000)}, path)
+    loaded = load(path)
+    assert list(loaded) == ['a', 'b']
+    assert loaded['b'].count == 200
+
+
+def test_load_invalid(tmp_path):
+    path = tmp_path / 'other.json'
+    path.write_text('{"foo": 1}')
+    with pytest.raises(ValueError, match='is not a devtools timer baseline'):
+        load(path)
+
+
+def test_mann_whitney():
+    assert mann_whitney(make_stats(1000, seed=1), make_stats(1000, seed=2)) > 0.05
+    assert mann_whitney(make_stats(1000, seed=1), make_stats(1100, seed=2)) < 0.001
+    assert mann_whitney(make_stats(1000, n=1), make_stats(1000, n=1)) == 1.0
+
+
+def test_compare():
+    old = {'same': make_stats(1000, seed=1), 'slow': make_stats(1000), 'fast': make_stats(1000), 'gone': make_stats(5)}
+    new = {'same': make_stats(1000, seed=2), 'slow': make_stats(1500), 'fast': make_stats(500), 'new': make_stats(5)}
+    comparisons = compare(old, new)
+    assert [(c.name, c.verdict()) for c in comparisons] == [
+        ('same', 'same'),
+        ('slow', 'slower'),
+        ('fast', 'faster'),
+        ('gone', 'removed'),
+        ('new', 'added'),
+    ]
+    assert comparisons[1].change == pytest.approx(1.5, rel=0.05)
+    assert comparisons[3].change is None
+
+    table = format_comparisons(comparisons)
+    lines = table.split('\n')
+    assert lines[0].split() == ['name', 'old', 'new', 'change', 'confidence']
+    assert lines[2].startswith('slow ')
+    assert lines[2].split()[-3].startswith('+')
+    assert lines[2].split()[-2] == '100.0%'
+    assert lines[4].split()[2:] == ['-', '-', '-', 'removed']
+    assert '\x1b[' not in table
+
+    highlighted = format_comparisons(comparisons, highlight=True)
+    assert '\x1b[31m' in highlighted
+    assert strip_ansi(highlighted) == table
+
+
+def test_comparison_repr():
+    assert repr(Comparison('x', None, make_stats(10))) == "<Comparison 'x' change=None p_value=None>"
+
+
+def test_timer_save_compare(tmp_path, capsys):
+    path = tmp_path / 'baseline.json'
+    t = Timer(verbose=False)
+    for name in 'ab':
+        for _ in range(5):
+            with t(name):
+                pass
+    assert set(t.stats_by_name()) == {'a', 'b'}
+    t.save(path)
+    assert load(path)['a'].count == 5
+
+    t = Timer(verbose=True)
+    for _ in range(5):
+        t.start('a', verbose=False)
+        t.capture()
+    capsys.readouterr()
+    comparisons = t.compare(path, highlight=False)
+    assert [c.name for c in comparisons] == ['a', 'b']
+    stdout, _ = capsys.readouterr()
+    assert stdout.startswith('name ')
+
+
+def test_streaming_stats_by_name():
+    t = Timer('s', streaming=True, verbose=False)
+    assert t.stats_by_name() == {}
+    with t:
+        pass
+    assert list(t.stats_by_name()) == ['s']
+
+
+def test_registry_save_compare(tmp_path, capsys):
+    path = tmp_path / 'baseline.json'
+    with debug.timer.span('baseline-test'):
+        pass
+    debug.timer.save(path)
+    assert 'baseline-test' in load(path)
+    comparisons = debug.timer.compare(path)
+    assert 'baseline-test' in [c.name for c in comparisons]
+    assert 'baseline-test' in capsys.readouterr()[0]
+
+
+def test_cli(tmp_path):
+    old, new = tmp_path / 'old.json', tmp_path / 'new.json'
+    save({'a': make_stats(1000)}, old)
+    save({'a': make_stats(1000, seed=1)}, new)
+    p = subprocess.run(
+        [sys.executable, '-m', 'devtools', 'compare', str(old), str(new)], capture_output=True, text=True
+    )
+    assert p.returncode == 0, p.stdout
+    assert p.stdout.split('\n')[1].split()[0] == 'a'
+
+    save({'a': make_stats(2000)}, new)
+    p = subprocess.run(
+        [sys.executable, '-m', 'devtools', 'compare', str(old), str(new)], capture_output=True, text=True
+    )
+    assert p.returncode == 1
+    assert 'slower' in p.stdout
+
+    p = subprocess.run([sys.executable, '-m', 'devtools', 'compare', str(old)], capture_output=True, text=True)
+    assert p.returncode == 1
+    assert p.stdout.startswith('usage:')
+
+
+def test_cli_threshold(tmp_path):
+    old, new = tmp_path / 'old.json', tmp_path / 'new.json'
+    save({'a': make_stats(1000, n=2000)}, old)
+    save({'a': make_stats(1050, n=2000, seed=1)}, new)
+    cmd = [sys.executable, '-m', 'devtools', 'compare', str(old), str(new)]
+    # significantly slower but by less than the default threshold of 10%
+    p = subprocess.run(cmd, capture_output=True, text=True)
+    assert 'slower' in p.stdout
+    assert p.returncode == 0, p.stdout
+    p = subprocess.run([*cmd, '--threshold=0.02'], capture_output=True, text=True)
+    assert p.returncode == 1, p.stdout
+    p = subprocess.run([*cmd, '--threshold=x'], capture_output=True, text=True)
+    assert p.returncode == 1
+    assert p.stdout == "invalid threshold '--threshold=x'\n"
+
+
+def test_regressed():
+    c = Comparison('a', make_stats(1000, n=2000), make_stats(1050, n=2000, seed=1))
+    assert c.verdict() == 'slower'
+    assert not c.regressed()
+    assert c.regressed(0.02)
+    assert not Comparison('a', None, make_stats(1000)).regressed()
@@ -0,0 +1,86 @@
+import gc
+import io
+import re
+
+import pytest
+
+from devtools import debug
+from devtools.bench import BenchResult, _reject_outliers, bench
+from devtools.timer import Timer
+
+
+def test_bench():
+    calls = []
+
+    def func(a, b=0):
+        calls.append((a, b))
+
+    r = bench(func, (1,), {'b': 2}, duration=0.02, rounds=5, warmup=1)
+    assert isinstance(r, BenchResult)
+    assert r.name == 'test_bench.<locals>.func'
+    assert r.rounds == 5
+    assert r.loops > 1
+    assert r.stats.count + r.outliers == 5
+    assert r.mean > 0
+    assert r.ci >= 0
+    assert r.overhead_ns > 0
+    assert set(calls) == {(1, 2)}
+    assert re.fullmatch(
+        r'test_bench\.<locals>\.func: \S+ ± \S+ per call \(5 rounds of [\d,]+ loops, \d outliers rejected\) '
+        r'min=\S+ max=\S+ p50=\S+ p90=\S+ p99=\S+ p999=\S+',
+        str(r),
+    )
+
+
+def test_bench_slow_func():
+    r = bench(sum, (range(10_000),), name='sum', duration=0.01, rounds=2, warmup=0)
+    assert r.name == 'sum'
+    assert r.loops >= 1
+    assert r.stats.count == 2
+
+
+def test_gc():
+    states = []
+    bench(lambda: states.append(gc.isenabled()), duration=0.001, rounds=1, warmup=0)
+    assert not any(states)
+    assert gc.isenabled()
+
+    states.clear()
+    bench(lambda: states.append(gc.isenabled()), duration=0.001, rounds=1, warmup=0, enable_gc=True)
+    assert all(states)
+
+
+def test_invalid_rounds():
+    with pytest.raises(ValueError, match='rounds must be at least 1'):
+        bench(int, rounds=0)
+
+
+def test_reject_outliers():
+    assert _reject_outliers([1.0, 2.0, 3.0]) == [1.0, 2.0, 3.0]
+    assert _reject_outliers([10.0, 11.0, 10.5, 10.2, 9.9, 10.1, 50.0, 10.3]) == [
+        10.0,
+        11.0,
+        10.5,
+        10.2,
+        9.9,
+        10.1,
+        10.3,
+    ]
+
+
+def test_timer_bench():
+    f = io.StringIO()
+    r = Timer('named', file=f).bench(divmod, 7, 2, duration_=0.01, rounds_=3)
+    assert r.name == 'named'
+    assert f.getvalue().startswith('named: ')
+
+    f = io.StringIO()
+    Timer(file=f, verbose=False).bench(divmod, 7, 2, duration_=0.01, rounds_=3)
+    assert f.getvalue() == ''
+
+
+def test_registry_bench(capsys):
+    r = debug.timer.bench(max, 1, 2, name_='max', duration_=0.01, rounds_=3)
+    assert r.name == 'max'
+    stdout, _ = capsys.readouterr()
+    assert stdout.startswith('max: ')
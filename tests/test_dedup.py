@@ -0,0 +1,112 @@
+from devtools import Debug
+from devtools.dedup import value_fingerprint
+
+from .utils import normalise_output
+
+
+def test_dedup(capsys):
+    debug_ = Debug(dedup=True)
+    for v in [1, 1, 1, 2, 2, 1]:
+        debug_(v)
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_dedup.py:<line no> test_dedup\n'
+        '    v: 1 (int)\n'
+        'tests/test_dedup.py:<line no> test_dedup (last message repeated 2 times)\n'
+        'tests/test_dedup.py:<line no> test_dedup\n'
+        '    v: 2 (int)\n'
+        'tests/test_dedup.py:<line no> test_dedup (last message repeated 1 time)\n'
+        'tests/test_dedup.py:<line no> test_dedup\n'
+        '    v: 1 (int)\n'
+    )
+
+
+def test_dedup_formatted(capsys):
+    debug_ = Debug(dedup=True)
+    for _ in range(3):
+        debug_([1, 2, 3])
+    debug_.flush()
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_dedup.py:<line no> test_dedup_formatted\n'
+        '    [1, 2, 3] (list) len=3\n'
+        'tests/test_dedup.py:<line no> test_dedup_formatted (last message repeated 2 times)\n'
+    )
+
+
+def test_dedup_mutated(capsys):
+    debug_ = Debug(dedup=True)
+    value = []
+    for i in range(2):
+        value.append(i)
+        debug_(value)
+    stdout, _ = capsys.readouterr()
+    assert stdout.count('value: ') == 2
+
+
+def test_dedup_sites_separate(capsys):
+    debug_ = Debug(dedup=True)
+    for _ in range(2):
+        debug_(1)
+        debug_(1)
+    stdout, _ = capsys.readouterr()
+    assert stdout.count('    1 (int)') == 2
+
+
+def test_dedup_env(capsys, monkeypatch):
+    monkeypatch.setenv('PY_DEVTOOLS_DEDUP', 'true')
+    debug_ = Debug()
+    for _ in range(3):
+        assert debug_('x') == 'x'
+    stdout, _ = capsys.readouterr()
+    assert stdout.count("    'x' (str) len=1") == 1
+
+
+def test_dedup_hash_collisions(capsys):
+    assert hash(-1) == hash(-2)
+    assert hash(0.0) == hash(-0.0)
+    debug_ = Debug(dedup=True)
+    for v in [-1, -2, -1, 0.0, -0.0, -0.0]:
+        debug_(v)
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert [line.strip() for line in normalise_output(stdout).splitlines() if not line.startswith('tests/')] == [
+        'v: -1 (int)',
+        'v: -2 (int)',
+        'v: -1 (int)',
+        'v: 0.0 (float)',
+        'v: -0.0 (float)',
+    ]
+    assert stdout.count('(last message repeated 1 time)') == 1
+
+
+def test_dedup_metadata(capsys):
+    debug_ = Debug(dedup=True, metadata=True)
+    for _ in range(3):
+        debug_([1, 2, 3])
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert stdout.count('[1, 2, 3] (list) len=3') == 1
+    assert '(last message repeated 2 times)' in stdout
+
+
+def test_dedup_off(capsys):
+    debug_ = Debug(dedup=False)
+    for _ in range(3):
+        debug_(1)
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert stdout.count('    1 (int)') == 3
+
+
+def test_value_fingerprint():
+    assert value_fingerprint((1, 'a'), {'b': None}) == value_fingerprint((1, 'a'), {'b': None})
+    assert value_fingerprint((1,), {}) != value_fingerprint((True,), {})
+    assert value_fingerprint((-1,), {}) != value_fingerprint((-2,), {})
+    assert value_fingerprint((0.0,), {}) != value_fingerprint((-0.0,), {})
+    assert value_fingerprint((float('nan'),), {}) == value_fingerprint((float('nan'),), {})
+    assert value_fingerprint((), {'a': 1}) != value_fingerprint((), {'b': 1})
+    assert value_fingerprint(([],), {}) is None
+    assert value_fingerprint((), {'x': {}}) is None
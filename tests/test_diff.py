@@ -0,0 +1,241 @@
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass
+
+from devtools import Debug, debug
+from devtools.diff import Change, Node, diff, diff_values, snapshot, thaw
+from devtools.pytest_plugin import pytest_assertrepr_compare
+
+from .utils import normalise_output
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+Pair = namedtuple('Pair', 'a b')
+
+
+def test_no_changes():
+    value = {'a': [1, 2, {'b': 3}], 'c': Point(1, 2)}
+    assert diff(snapshot(value), snapshot(value)) == []
+
+
+def test_dict_changes():
+    old = snapshot({'a': 1, 'b': 2, 'c': {'d': 3}})
+    new = snapshot({'a': 1, 'c': {'d': 4}, 'e': 5})
+    assert diff(old, new, 'x') == [
+        Change('-', "x['b']", old=2),
+        Change('~', "x['c']['d']", 3, 4),
+        Change('+', "x['e']", new=5),
+    ]
+
+
+def test_seq_insert():
+    old = snapshot([[i] for i in range(100)])
+    new = snapshot([[i] for i in range(50)] + [['new']] + [[i] for i in range(50, 100)])
+    assert diff(old, new) == [Change('+', '[50]', new=['new'])]
+
+
+def test_seq_remove():
+    assert diff(snapshot([1, 2, 3, 4]), snapshot([1, 3, 4])) == [Change('-', '[1]', old=2)]
+
+
+def test_seq_changed():
+    assert diff(snapshot((1, 2, 3)), snapshot((1, 5, 3))) == [Change('~', '[1]', 2, 5)]
+
+
+def test_set_changes():
+    assert diff(snapshot({1, 2}), snapshot({2, 3})) == [Change('-', '{1}', old=1), Change('+', '{3}', new=3)]
+
+
+def test_objects():
+    assert diff(snapshot(Point(1, 2)), snapshot(Point(1, 3))) == [Change('~', '.y', 2, 3)]
+    assert diff(snapshot(Pair(1, 2)), snapshot(Pair(0, 2))) == [Change('~', '.a', 1, 0)]
+
+
+def test_type_changed():
+    assert diff(snapshot({'a': [1]}), snapshot({'a': (1,)})) == [Change('~', "['a']", [1], (1,))]
+    assert diff(snapshot({'a': 1}), snapshot({'a': 1.0})) == [Change('~', "['a']", 1, 1.0)]
+    assert diff(snapshot([1]), snapshot('x')) == [Change('~', '', [1], 'x')]
+
+
+def test_limit():
+    assert len(diff(snapshot(list(range(10))), snapshot(list(range(1, 11))), limit=3)) == 3
+
+
+def test_leaves():
+    class Foo:
+        def __repr__(self):
+            return '<Foo>'
+
+    s = snapshot({'foo': Foo(), 'gen': (i for i in range(3))})
+    assert repr(s.children['foo']) == '<Foo>'
+    assert s.children['gen'].startswith('<generator object')
+
+
+def test_recursion():
+    v = [1]
+    v.append(v)
+    assert thaw(snapshot(v)) == [1, '<recursion>']
+
+
+def test_thaw():
+    value = {'a': [1, (2, 3)], 'b': {4}, 'c': Point(1, 2)}
+    thawed = thaw(snapshot(value))
+    assert thawed['a'] == [1, (2, 3)]
+    assert thawed['b'] == {4}
+    assert repr(thawed['c']) == 'Point(x=1, y=2)'
+
+
+def test_node_hash():
+    assert snapshot([1, {'a': 2}]) == snapshot([1, {'a': 2}])
+    assert snapshot([1, {'a': 2}]) != snapshot([1, {'a': 3}])
+    assert isinstance(snapshot([1]), Node)
+
+
+def test_hash_collision():
+    assert hash(-1) == hash(-2)
+    assert snapshot({'a': -1}).hash == snapshot({'a': -2}).hash
+    assert snapshot({'a': -1}) != snapshot({'a': -2})
+    assert snapshot([-1, {-1}]) != snapshot([-2, {-2}])
+    assert diff(snapshot({'a': -1}), snapshot({'a': -2})) == [Change('~', "['a']", -1, -2)]
+    assert diff(snapshot({'x': {'a': -1}}), snapshot({'x': {'a': -2}})) == [Change('~', "['x']['a']", -1, -2)]
+    # common prefix and suffix trimming mustn't skip the changed items
+    assert diff(snapshot([[-1], 1, [-1]]), snapshot([[-2], 1, [-2]])) == [
+        Change('~', '[0][0]', -1, -2),
+        Change('~', '[2][0]', -1, -2),
+    ]
+
+
+def test_watch_hash_collision(capsys):
+    debug_ = Debug()
+    state = {'x': {'a': -1}}
+    for _ in range(2):
+        debug_.watch(state)
+        state['x']['a'] = -2
+    assert "~ state['x']['a']: -1 -> -2" in capsys.readouterr().out
+
+
+def test_watch(capsys):
+    state = {'a': 1, 'b': [1, 2]}
+    for i in range(3):
+        debug.watch(state)
+        if i == 0:
+            state['a'] = 2
+            state['b'].append(3)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_diff.py:<line no> test_watch\n'
+        '    state: {\n'
+        "        'a': 1,\n"
+        "        'b': [1, 2],\n"
+        '    } (dict) len=2\n'
+        'tests/test_diff.py:<line no> test_watch\n'
+        "    ~ state['a']: 1 -> 2\n"
+        "    + state['b'][2]: 3\n"
+    )
+
+
+def test_watch_key(capsys):
+    debug_ = Debug()
+    assert debug_.watch([1], key='x') == [1]
+    debug_.watch([1], key='x')
+    debug_.watch([2], key='x')
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_diff.py:<line no> test_watch_key\n'
+        '    [1] (list) len=1\n'
+        'tests/test_diff.py:<line no> test_watch_key\n'
+        '    ~ value[0]: 1 -> 2\n'
+    )
+
+
+def test_watch_highlight():
+    debug_ = Debug(highlight=True)
+    debug_.watch({'a': 1}, key='y', file_=None)
+    v = debug_.watch({'a': 2}, key='y')
+    assert v == {'a': 2}
+
+
+def test_diff_values():
+    old = {'a': [1, 2, 3], 'b': Point(1, 2), 'c': Pair(1, {2})}
+    new = {'a': [1, 3], 'b': Point(1, 3), 'c': Pair(1, {3}), 'd': None}
+    assert diff_values(old, new) == [
+        Change('-', "['a'][1]", old=2),
+        Change('~', "['b'].y", 2, 3),
+        Change('-', "['c'].b{2}", old=2),
+        Change('+', "['c'].b{3}", new=3),
+        Change('+', "['d']", new=None),
+    ]
+
+
+def test_diff_values_types():
+    assert diff_values([1, (2, 3)], [1, [2, 3]]) == [Change('~', '[1]', (2, 3), [2, 3])]
+    assert diff_values({'a': 1, 'b': True}, {'a': 1.0, 'b': 1}) == []
+    assert diff_values({'a': 1, 'b': 2}, {'a': 1.0, 'b': 3}) == [Change('~', "['b']", 2, 3)]
+    assert diff_values([{'a': 1}, 1], [OrderedDict(a=1), 1.0]) == []
+    assert diff_values({'a': 1}, OrderedDict(a=2)) == [Change('~', '', {'a': 1}, OrderedDict(a=2))]
+
+
+def test_diff_values_recursive():
+    old = [1]
+    old.append(old)
+    new = [2]
+    new.append(new)
+    assert diff_values(old, new, limit=2)[0] == Change('~', '[0]', 1, 2)
+
+
+def test_diff_values_limit():
+    assert len(diff_values(list(range(100)), list(range(1, 101)), limit=5)) == 5
+
+
+def test_diff_values_large():
+    old = {'items': [{'id': i, 'tags': ['a', 'b']} for i in range(100_000)]}
+    new = {'items': [{'id': i, 'tags': ['a', 'b']} for i in range(100_000)]}
+    new['items'][50_000]['tags'][1] = 'c'
+    assert diff_values(old, new) == [Change('~', "['items'][50000]['tags'][1]", 'b', 'c')]
+
+
+def test_assertrepr_compare(pytestconfig):
+    old = {'a': [1, 2, 3], 'b': {'c': 'x'}}
+    new = {'a': [1, 3], 'b': {'c': 'y'}, 'd': list(range(20))}
+    assert pytest_assertrepr_compare(pytestconfig, '==', old, new) == [
+        'dict == dict: 3 differences (- left only, + right only, ~ left -> right)',
+        "- ['a'][1]: 2",
+        "~ ['b']['c']: 'x' -> 'y'",
+        "+ ['d']: [",
+        '    0,',
+        '    1,',
+        '    2,',
+        '    3,',
+        '    4,',
+        '    5,',
+        '    6,',
+        '    7,',
+        '... 13 more lines',
+    ]
+    assert pytest_assertrepr_compare(pytestconfig, '==', 1, 2) is None
+    assert pytest_assertrepr_compare(pytestconfig, '!=', old, old) is None
+    lines = pytest_assertrepr_compare(pytestconfig, '==', list(range(100)), list(range(1, 101)))
+    assert lines[0].startswith('list == list: 50+ differences')
+    assert lines[-1] == '... more differences not shown'
+
+
+def test_assertrepr_compare_pytest(pytester):
+    pytester.makeconftest("pytest_plugins = ['devtools.pytest_plugin']")
+    pytester.makepyfile(
+        """
+def test_big():
+    old = [{'id': i} for i in range(100_000)]
+    new = [{'id': i} for i in range(100_000)]
+    new[123]['id'] = -1
+    assert old == new
+"""
+    )
+    result = pytester.runpytest('-p', 'no:pretty')
+    result.assert_outcomes(failed=1)
+    output = result.stdout.str()
+    assert 'assert list == list: 1 difference (- left only, + right only, ~ left -> right)' in output
+    assert "~ [123]['id']: 123 -> -1" in output
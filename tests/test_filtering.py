@@ -0,0 +1,84 @@
+import pytest
+
+from devtools import Debug
+from devtools.filtering import CallFilter, parse_filter
+
+from .utils import normalise_output
+
+
+@pytest.mark.parametrize(
+    'spec,module,allowed',
+    [
+        ('billing.*', 'billing', True),
+        ('billing.*', 'billing.invoices', True),
+        ('billing.*', 'shipping', False),
+        ('billing.*,-billing.tests.*', 'billing.tests.test_x', False),
+        ('billing.*,-billing.tests.*', 'billing.models', True),
+        ('-billing.*', 'billing.models', False),
+        ('-billing.*', 'shipping', True),
+        ('billing.*, shipping', 'shipping', True),
+        ('*/billing/*.py', 'whatever', True),
+        ('*/shipping/*.py', 'whatever', False),
+    ],
+)
+def test_allowed(spec, module, allowed):
+    assert CallFilter(spec).allowed(module, '/path/to/billing/models.py') is allowed
+
+
+def test_debug_filter(capsys):
+    debug_ = Debug(filter='tests.*,-tests.test_main')
+    debug_('included')
+    debug_.set_filter('-tests.*')
+    debug_('excluded')
+    debug_.set_filter(None)
+    debug_('no filter')
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_filtering.py:<line no> test_debug_filter\n'
+        "    'included' (str) len=8\n"
+        'tests/test_filtering.py:<line no> test_debug_filter\n'
+        "    'no filter' (str) len=9\n"
+    )
+
+
+def test_debug_filter_return():
+    debug_ = Debug(filter='-tests.*')
+    assert debug_(1, 2) == (1, 2)
+    assert debug_(3) == 3
+
+
+def test_env_filter(capsys, monkeypatch):
+    monkeypatch.setenv('PY_DEVTOOLS_FILTER', 'foobar.*')
+    debug_ = Debug()
+    assert repr(debug_.filter) == "<CallFilter 'foobar.*'>"
+    debug_('excluded')
+    stdout, _ = capsys.readouterr()
+    assert stdout == ''
+
+
+def test_filter_and_sample(capsys):
+    debug_ = Debug(filter='tests.*', sample='every:2')
+    for i in range(3):
+        debug_(i)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_filtering.py:<line no> test_filter_and_sample\n'
+        '    i: 0 (int)\n'
+        'tests/test_filtering.py:<line no> test_filter_and_sample (1 call suppressed)\n'
+        '    i: 2 (int)\n'
+    )
+
+
+def test_cached(capsys):
+    call_filter = CallFilter('-tests.*')
+    debug_ = Debug(filter=call_filter)
+    for i in range(3):
+        debug_(i)
+    assert list(call_filter._cache.values()) == [False]
+
+
+def test_parse_filter():
+    assert parse_filter(None) is None
+    assert parse_filter('  ') is None
+    call_filter = CallFilter('foo')
+    assert parse_filter(call_filter) is call_filter
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import devtools
+from devtools.__main__ import install_code
+from devtools.debug import Debug
+
+ROOT = Path(__file__).parent.parent
+# wall clock time is unreliable under load, e.g. with pytest-xdist, so the time budget is only checked when set,
+# e.g. `DEVTOOLS_IMPORT_BUDGET_US=5000`, eager submodule imports are always caught by the list of modules imported
+IMPORT_BUDGET_US = int(os.getenv('DEVTOOLS_IMPORT_BUDGET_US') or 0)
+ON_DEMAND = 'executing', 'pygments', 'asttokens', 'sqlalchemy'
+
+
+def run_python(tmp_path, *args):
+    env = dict(os.environ)
+    # bytecode is cached outside the source tree so compiling isn't counted
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPYCACHEPREFIX'] = str(tmp_path)
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def import_times(stderr):
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason='PYTHONPYCACHEPREFIX requires Python 3.8+')
+def test_import_budget(tmp_path):
+    code = 'import sys, devtools; print(sorted(m for m in sys.modules if m.startswith("devtools")))'
+    # warm the bytecode cache
+    run_python(tmp_path, '-c', code)
+    p = run_python(tmp_path, '-X', 'importtime', '-c', code)
+    assert p.stdout == "['devtools', 'devtools.version']\n"
+    import_us = import_times(p.stderr)['devtools']
+    if IMPORT_BUDGET_US:
+        assert import_us < IMPORT_BUDGET_US, f'import devtools took {import_us}us, budget is {IMPORT_BUDGET_US}us'
+
+
+def test_on_demand_dependencies(tmp_path):
+    code = (
+        'import sys\n'
+        'from devtools import debug, pformat, sformat, Timer\n'
+        'pformat({"a": [1, 2, 3]}, highlight=False)\n'
+        f'print([m for m in {ON_DEMAND} if m in sys.modules])\n'
+    )
+    p = run_python(tmp_path, '-c', code)
+    assert p.stdout == '[]\n'
+
+
+def test_install_code_lazy(tmp_path):
+    code = (
+        f'{install_code}\n'
+        'import sys\n'
+        'print("devtools" in sys.modules)\n'
+        'debug.format(1)\n'
+        'print("devtools" in sys.modules)\n'
+    )
+    p = run_python(tmp_path, '-c', code)
+    assert p.stdout == 'False\nTrue\n'
+
+
+def test_lazy_attributes():
+    assert isinstance(devtools.debug, Debug)
+    assert devtools.Debug is Debug
+    assert set(devtools.__all__) <= set(dir(devtools))
+    with pytest.raises(AttributeError, match="module 'devtools' has no attribute 'missing'"):
+        devtools.missing
+
+
+def test_debug_submodule(tmp_path):
+    # importing the submodule before the `debug` instance is used mustn't replace it
+    code = (
+        'import devtools.debug\nfrom devtools import debug\nprint(type(debug).__name__, type(devtools.debug).__name__)'
+    )
+    p = run_python(tmp_path, '-c', code)
+    assert p.stdout == 'Debug Debug\n'
@@ -1,9 +1,10 @@
+import json
 import os
 import sys
 
 import pytest
 
-from devtools.pytest_plugin import load_black
+from devtools.pytest_plugin import ToReplace, format_batch, format_replacements, load_black, rewrite_file
 
 pytestmark = pytest.mark.skipif(sys.version_info < (3, 8), reason='requires Python 3.8+')
 
@@ -167,3 +168,260 @@ def test_string_assert(x, insert_assert):
     )
     captured = capsys.readouterr()
     assert '2 insert skipped because an assert statement on that line had already be inserted!\n' in captured.out
+
+
+@pytest.fixture(name='default_black')
+def _fix_default_black(tmp_path, monkeypatch):
+    # black's config is read from the current directory and cached
+    monkeypatch.chdir(tmp_path)
+    load_black.cache_clear()
+    yield
+    load_black.cache_clear()
+
+
+def test_format_batch(default_black):
+    snippets = ["# insert_assert(x)\nassert x == {'a': 1}", 'assert y == [1,2,3]', "assert z == 'foo'"]
+    assert format_batch(snippets) == [load_black()(s) for s in snippets]
+    assert format_batch(snippets) == [
+        '# insert_assert(x)\nassert x == {"a": 1}\n',
+        'assert y == [1, 2, 3]\n',
+        'assert z == "foo"\n',
+    ]
+
+
+def test_format_batch_formatted(default_black):
+    snippets = ['# insert_assert(x)\nassert x == 1\n', '# insert_assert(y)\nassert y == 2\n']
+    assert format_batch(snippets) == snippets
+    assert load_black()(snippets[0]) == snippets[0]
+
+
+def test_format_batch_invalid(default_black, capsys):
+    assert format_batch(['assert x == [1,2]', 'assert y == <Foo object>']) == [
+        'assert x == [1, 2]\n',
+        'assert y == <Foo object>',
+    ]
+    assert 'black error' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('threshold', [200, 1])
+def test_format_replacements(default_black, tmp_path, monkeypatch, threshold):
+    monkeypatch.setattr('devtools.pytest_plugin.PARALLEL_FORMAT_THRESHOLD', threshold)
+    replacements = [
+        ToReplace(tmp_path / 'a.py', 1, 1, "assert a == {'x':1}", 4),
+        ToReplace(tmp_path / 'b.py', 1, 1, 'assert b == (1,2)', 0),
+        ToReplace(tmp_path / 'a.py', 5, 5, 'assert c == None', 8),
+    ]
+    format_replacements(replacements)
+    assert [r.code for r in replacements] == [
+        '    assert a == {"x": 1}\n',
+        'assert b == (1, 2)\n',
+        '        assert c == None\n',
+    ]
+
+
+def test_insert_assert_many(pytester_pretty):
+    os.environ.pop('CI', None)
+    pytester_pretty.makeconftest(config)
+    test_file = pytester_pretty.makepyfile(
+        """\
+def test_many(insert_assert):
+    insert_assert({'a': 1})
+    if True:
+        insert_assert([1,2])
+    insert_assert('x')\
+"""
+    )
+    load_black.cache_clear()
+    result = pytester_pretty.runpytest()
+    load_black.cache_clear()
+    result.assert_outcomes(passed=1)
+    assert test_file.read_text() == (
+        'def test_many(insert_assert):\n'
+        "    # insert_assert({'a': 1})\n"
+        '    assert {"a": 1} == {"a": 1}\n'
+        '    if True:\n'
+        '        # insert_assert([1,2])\n'
+        '        assert [1, 2] == [1, 2]\n'
+        "    # insert_assert('x')\n"
+        '    assert "x" == "x"'
+    )
+
+
+def test_worker_output(tmp_path):
+    from devtools import pytest_plugin
+
+    class FakeConfig:
+        workeroutput = {}
+
+    class FakeSession:
+        config = FakeConfig()
+
+    tr = ToReplace(tmp_path / 'test_x.py', 3, 4, 'assert x == 1', 4)
+    pytest_plugin.to_replace.append(tr)
+    try:
+        pytest_plugin.pytest_sessionfinish(FakeSession())
+        assert pytest_plugin.to_replace == []
+        output = FakeConfig.workeroutput
+
+        class FakeNode:
+            workeroutput = output
+
+        pytest_plugin.pytest_testnodedown(FakeNode(), None)
+        assert pytest_plugin.to_replace == [tr]
+    finally:
+        pytest_plugin.to_replace.clear()
+
+
+def test_call_site_cache():
+    from devtools import pytest_plugin
+
+    try:
+        for i in range(3):
+            pytest_plugin.insert_assert({'i': i})
+        pytest_plugin.insert_assert([1, 2])
+        assert len(pytest_plugin.call_sites) == 2
+        replacements = pytest_plugin.to_replace
+        assert [tr.code for tr in replacements] == [
+            "# insert_assert({'i': i})\nassert {'i': i} == {'i': 0}",
+            "# insert_assert({'i': i})\nassert {'i': i} == {'i': 1}",
+            "# insert_assert({'i': i})\nassert {'i': i} == {'i': 2}",
+            '# insert_assert([1, 2])\nassert [1, 2] == [1, 2]',
+        ]
+        loop_line = replacements[0].start_line
+        assert [(tr.start_line, tr.end_line, tr.indent) for tr in replacements] == [
+            (loop_line, loop_line, 12),
+            (loop_line, loop_line, 12),
+            (loop_line, loop_line, 12),
+            (loop_line + 1, loop_line + 1, 8),
+        ]
+    finally:
+        pytest_plugin.to_replace.clear()
+        pytest_plugin.call_sites.clear()
+
+
+def test_xdist(pytester_pretty):
+    pytest.importorskip('xdist')
+    os.environ.pop('CI', None)
+    pytester_pretty.makeconftest(config)
+    test_files = [
+        pytester_pretty.makepyfile(
+            **{
+                f'test_{name}': f"""\
+import pytest
+
+@pytest.mark.parametrize('x', range(4))
+def test_{name}(x, insert_assert):
+    insert_assert(x + 1)
+
+def test_{name}_other(insert_assert):
+    insert_assert('{name}')\
+"""
+            }
+        )
+        for name in ('a', 'b')
+    ]
+    result = pytester_pretty.runpytest('-n', '2', '-p', 'xdist')
+    result.assert_outcomes(passed=10)
+    for path, name in zip(test_files, 'ab'):
+        code = path.read_text()
+        assert code.count('# insert_assert(x + 1)') == 1
+        assert '    assert x + 1 == ' in code
+        assert f'    assert "{name}" == "{name}"' in code
+    assert any(line.startswith('Replaced 10 insert_assert() calls in 2 files (+') for line in result.outlines)
+
+
+def test_rewrite_file(tmp_path):
+    path = tmp_path / 'test_x.py'
+    old = b'def test():\r\n    insert_assert(a)\r\n    x = 1\r\n    insert_assert(\r\n        b\r\n    )\r\n'
+    path.write_bytes(old)
+    dups, changed = rewrite_file(
+        path,
+        [
+            ToReplace(path, 4, 6, '    assert b == 2\n'),
+            ToReplace(path, 2, 2, '    # insert_assert(a)\n    assert a == 1\n'),
+            ToReplace(path, 2, 2, '    assert a == 3\n'),
+        ],
+    )
+    assert dups == 1
+    new = path.read_bytes()
+    assert new == (
+        b'def test():\r\n'
+        b'    # insert_assert(a)\r\n'
+        b'    assert a == 1\r\n'
+        b'    x = 1\r\n'
+        b'    assert b == 2\r\n'
+    )
+    assert changed == len(new) - len(old)
+    assert [p.name for p in tmp_path.iterdir()] == ['test_x.py']
+
+
+def test_rewrite_file_no_trailing_newline(tmp_path):
+    path = tmp_path / 'test_x.py'
+    path.write_text('x = 1\ninsert_assert(x)')
+    assert rewrite_file(path, [ToReplace(path, 2, 2, 'assert x == 1\n')]) == (0, -3)
+    assert path.read_text() == 'x = 1\nassert x == 1'
+    assert rewrite_file(path, [ToReplace(path, 2, 2, 'assert x == 1\n')]) == (0, 0)
+
+
+def test_rewrite_file_unusual_line_breaks(tmp_path):
+    path = tmp_path / 'test_x.py'
+    old = 'x = "a\x0cb\x1cc\x85d\u2028e"\ninsert_assert(x)\ny = 1\n'
+    path.write_text(old, encoding='utf-8')
+    rewrite_file(path, [ToReplace(path, 2, 2, 'assert x == "a\x0cb"\n')])
+    assert path.read_text(encoding='utf-8') == 'x = "a\x0cb\x1cc\x85d\u2028e"\nassert x == "a\x0cb"\ny = 1\n'
+
+
+def test_interleaved_files(tmp_path, capsys):
+    from devtools import pytest_plugin
+
+    a, b = tmp_path / 'test_a.py', tmp_path / 'test_b.py'
+    a.write_text('insert_assert(1)\ninsert_assert(2)\n')
+    b.write_text('insert_assert(3)\n')
+    pytest_plugin.to_replace.extend(
+        [
+            ToReplace(a, 1, 1, '# insert_assert(1)\nassert 1 == 1'),
+            ToReplace(b, 1, 1, 'assert 3 == 3'),
+            ToReplace(a, 2, 2, 'assert 2 == 2'),
+        ]
+    )
+    try:
+        pytest_plugin.apply_replacements(print_instead=False)
+    finally:
+        pytest_plugin.to_replace.clear()
+    assert a.read_text() == '# insert_assert(1)\nassert 1 == 1\nassert 2 == 2\n'
+    assert b.read_text() == 'assert 3 == 3\n'
+    assert pytest_plugin.insert_assert_summary.get() == ['Replaced 3 insert_assert() calls in 2 files (+10 bytes)']
+
+
+def test_insert_assert_snapshot(pytester_pretty):
+    os.environ.pop('CI', None)
+    pytester_pretty.makeconftest(config)
+    test_file = pytester_pretty.makepyfile(
+        test_big="""\
+def test_big(insert_assert):
+    data = {'items': [{'id': i, 'name': f'item {i}'} for i in range(10)], 'tags': ('a', 'b')}
+    insert_assert(data)
+    insert_assert(data['tags'])\
+"""
+    )
+    load_black.cache_clear()
+    result = pytester_pretty.runpytest('--insert-assert-snapshot-size', '40')
+    load_black.cache_clear()
+    result.assert_outcomes(passed=1)
+    assert test_file.read_text().endswith(
+        '    # insert_assert(data)\n'
+        '    assert data == snapshot("test_big:data")\n'
+        "    # insert_assert(data['tags'])\n"
+        '    assert data["tags"] == ("a", "b")'
+    )
+    snapshots = json.loads((test_file.parent / '__snapshots__' / 'test_big.json').read_text())
+    assert list(snapshots) == ['test_big:data']
+    assert snapshots['test_big:data']['items'][9] == {'id': 9, 'name': 'item 9'}
+    assert snapshots['test_big:data']['tags'] == ['a', 'b']
+
+    # the inserted assertion passes, and fails if the value changes
+    result = pytester_pretty.runpytest()
+    result.assert_outcomes(passed=1)
+    test_file.write_text(test_file.read_text().replace('range(10)', 'range(11)'))
+    result = pytester_pretty.runpytest()
+    result.assert_outcomes(failed=1)
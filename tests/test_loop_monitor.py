@@ -0,0 +1,111 @@
+import asyncio
+import io
+import re
+import sys
+import threading
+import time
+
+import pytest
+
+from devtools import debug
+from devtools.loop_monitor import LoopMonitor
+
+
+def blocking():
+    time.sleep(0.1)
+
+
+async def handler():
+    await asyncio.sleep(0.01)
+    blocking()
+
+
+def test_loop_monitor():
+    f = io.StringIO()
+
+    async def main():
+        async with debug.loop_monitor(30, interval_ms=5, file=f) as monitor:
+            for _ in range(2):
+                await handler()
+            await asyncio.sleep(0.02)
+        return monitor
+
+    monitor = asyncio.run(main())
+    assert monitor.lag.count > 2
+    assert monitor.lag.max >= 50_000_000
+    assert len(monitor.blocking) == 1
+    (call,) = monitor.blocking.values()
+    assert call.stats.count == 2
+    assert call.stats.min >= 50_000_000
+    assert call.task_name.startswith('Task-')
+    assert call.stack[0] == f'{__file__}:{blocking.__code__.co_firstlineno + 1} blocking'
+    assert call.stack[1] == f'{__file__}:{handler.__code__.co_firstlineno + 2} handler'
+
+    report = f.getvalue()
+    assert re.match(
+        r'loop monitor: \d+ heartbeats over \S+, lag mean=\S+ p99=\S+ max=\S+\n'
+        r'    2 times blocked for more than 30\.00ms:\n'
+        r"        2 times in task 'Task-\d+': mean=\S+ max=\S+ total=\S+\n"
+        rf'            .*test_loop_monitor\.py:{blocking.__code__.co_firstlineno + 1} blocking\n',
+        report,
+    )
+
+
+def test_no_blocking():
+    f = io.StringIO()
+
+    async def main():
+        with LoopMonitor(interval_ms=1, file=f) as monitor:
+            await asyncio.sleep(0.02)
+        return monitor
+
+    monitor = asyncio.run(main())
+    assert monitor.blocking == {}
+    assert f.getvalue().count('\n') == 1
+    assert repr(monitor).startswith('<LoopMonitor heartbeats=')
+
+
+def test_blocked_at_stop():
+    async def main():
+        monitor = LoopMonitor(10, interval_ms=1, verbose=False).start()
+        time.sleep(0.05)
+        monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(main())
+    (call,) = monitor.blocking.values()
+    assert call.stats.count == 1
+    assert call.task_name.startswith('Task-')
+
+
+def test_no_running_loop():
+    with pytest.raises(RuntimeError):
+        LoopMonitor().start()
+
+
+@pytest.mark.parametrize('heartbeat_ran', [False, True])
+def test_watch_heartbeat_race(monkeypatch, heartbeat_ran):
+    monitor = LoopMonitor(10, interval_ms=1, verbose=False)
+    monitor._loop_thread_id = threading.get_ident()
+    monitor._due_ns = time.perf_counter_ns() - 50_000_000
+    current_frames = sys._current_frames
+
+    def take_frames():
+        # the heartbeat runs between the watchdog finding it overdue and taking the loop thread's frame
+        if heartbeat_ran:
+            monitor._due_ns = time.perf_counter_ns() + monitor.interval_ns
+        monitor._stop_event.set()
+        return current_frames()
+
+    async def main():
+        monitor._loop = asyncio.get_running_loop()
+        monitor._watch()
+
+    monkeypatch.setattr(sys, '_current_frames', take_frames)
+    asyncio.run(main())
+    if heartbeat_ran:
+        assert monitor._pending is None
+        assert monitor.blocking == {}
+    else:
+        assert monitor._pending is not None
+        assert list(monitor.blocking.values()) == [monitor._pending]
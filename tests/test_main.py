@@ -1,5 +1,9 @@
+import asyncio
+import os
 import re
 import sys
+import threading
+import time
 from collections.abc import Generator
 from pathlib import Path
 from subprocess import run
@@ -8,6 +12,7 @@ import pytest
 
 from devtools import Debug, debug
 from devtools.ansi import strip_ansi
+from devtools.debug import DebugOutput
 
 from .utils import normalise_output
 
@@ -312,3 +317,102 @@ def test_return_args(capsys):
     assert debug(spam=123) == ({'spam': 123},)
     stdout, stderr = capsys.readouterr()
     print(stdout)
+
+
+def test_metadata():
+    debug_ = Debug(metadata=True)
+    v = debug_.format(1)
+    assert v.monotonic_ns > 0
+    assert v.pid == os.getpid()
+    assert v.thread_name == threading.current_thread().name
+    assert v.task_name is None
+    assert v.duration_ns > 0
+    assert abs(v.timestamp - time.time()) < 10
+    duration_ns = v.duration_ns
+    s = str(v)
+    # formatting the output later doesn't change the duration
+    assert v.duration_ns == duration_ns
+    assert str(v) == s
+    assert re.fullmatch(
+        r'tests/test_main.py:\d+ test_metadata \[\d\d:\d\d:\d\d\.\d{6} pid=\d+ thread=MainThread [\d.]+ms\]\n'
+        r'    1 \(int\)',
+        s,
+    ), s
+
+
+def test_metadata_formatting_duration(capsys):
+    class Slow:
+        def __repr__(self):
+            time.sleep(0.02)
+            return 'Slow'
+
+    Debug(metadata=True)(Slow())
+    stdout, _ = capsys.readouterr()
+    assert float(re.search(r' ([\d.]+)ms\]', stdout).group(1)) >= 20
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason='task names require Python 3.8+')
+def test_metadata_task():
+    debug_ = Debug(metadata=True)
+
+    async def my_task():
+        return debug_.format(1)
+
+    async def main():
+        return await asyncio.create_task(my_task(), name='foobar')
+
+    v = asyncio.run(main())
+    assert v.task_name == 'foobar'
+    assert ' task=foobar ' in str(v)
+
+
+def test_metadata_off():
+    v = debug.format(1)
+    assert v.monotonic_ns is None
+    assert v.timestamp is None
+    assert '[' not in str(v)
+
+
+def test_capture(capsys, monkeypatch):
+    def str_(*args, **kwargs):
+        raise AssertionError('captured output should not be formatted')
+
+    monkeypatch.setattr(DebugOutput, 'str', str_)
+    debug_ = Debug()
+    a = [1, 2]
+    with debug_.capture() as records:
+        assert debug_(a, b=3) == (a, {'b': 3})
+        debug_.watch(a)
+    assert capsys.readouterr().out == ''
+    assert [r.frame for r in records] == ['test_capture', 'test_capture']
+    assert records[0].filename == 'tests/test_main.py'
+    assert [(arg.name, arg.value) for arg in records[0].arguments] == [('a', [1, 2]), ('b', 3)]
+    assert records[0].arguments[0].value is a
+    assert records[1].arguments[0].value is a
+    monkeypatch.undo()
+
+    debug_(a)
+    assert 'a: [1, 2] (list) len=2' in capsys.readouterr().out
+
+
+def test_debug_records_fixture(pytester):
+    pytester.makeconftest("pytest_plugins = ['devtools.pytest_plugin']")
+    pytester.makepyfile(
+        """
+from devtools import debug
+
+def test_records(debug_records, capsys):
+    x = {'a': 1}
+    debug(x)
+    assert capsys.readouterr().out == ''
+    assert len(debug_records) == 1
+    assert debug_records[0].arguments[0].name == 'x'
+    assert debug_records[0].arguments[0].value == {'a': 1}
+
+def test_not_captured(capsys):
+    debug(1)
+    assert '1 (int)' in capsys.readouterr().out
+"""
+    )
+    result = pytester.runpytest('-p', 'no:pretty')
+    result.assert_outcomes(passed=2)
@@ -0,0 +1,113 @@
+import io
+import signal
+import sys
+import threading
+from time import perf_counter
+
+import pytest
+
+from devtools import debug
+from devtools.profiler import Profile, _format_path
+
+
+def busy(seconds):
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        pass
+
+
+@pytest.mark.parametrize(
+    'mode', ['thread', pytest.param('signal', marks=pytest.mark.skipif(sys.platform != 'linux', reason='not on linux'))]
+)
+def test_profile(mode):
+    f = io.StringIO()
+    with debug.profile(1, mode=mode, file=f, top=3) as p:
+        busy(0.2)
+    assert p.mode == mode
+    assert p.count > 5
+    assert p.duration_ns >= 200_000_000
+    top_function = p.functions()[0]
+    assert top_function[0].startswith('busy (test_profiler.py:')
+    assert top_function[1] / p.count > 0.5
+    assert 'Profile.stop' not in str(p.locations)
+
+    report = f.getvalue()
+    assert report.startswith(f'profile: {p.count} samples every 1.000ms ({mode} mode) over ')
+    assert '    top functions (self, total):\n' in report
+    assert 'busy (test_profiler.py:' in report
+    assert ' > test_profile > busy\n' in report
+    if mode == 'signal':
+        assert signal.getsignal(signal.SIGPROF) in (signal.SIG_DFL, None)
+
+
+def test_profile_threads():
+    p = Profile(1, mode='thread', verbose=False, all_threads=True)
+    thread = threading.Thread(target=busy, args=(0.2,))
+    with p:
+        thread.start()
+        thread.join()
+    assert any(location.startswith('busy ') for location in p.locations)
+    assert not any(location.startswith('Profile._run ') for location in p.locations)
+
+
+def test_profile_own_thread():
+    stop = threading.Event()
+    idle = threading.Thread(target=stop.wait)
+    idle.start()
+    try:
+        with Profile(1, mode='thread', verbose=False) as p:
+            busy(0.1)
+    finally:
+        stop.set()
+        idle.join()
+    assert p.count > 5
+    assert any(location.startswith('busy ') for location in p.locations)
+    assert not any(location.startswith('Event.wait ') for location in p.locations)
+
+
+def test_default_mode():
+    assert Profile().mode == ('signal' if hasattr(signal, 'setitimer') else 'thread')
+    modes = []
+    thread = threading.Thread(target=lambda: modes.append(Profile().mode))
+    thread.start()
+    thread.join()
+    assert modes == ['thread']
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError, match="invalid profile mode 'foo', should be one of: signal, thread"):
+        Profile(mode='foo')
+
+
+def test_export(tmp_path):
+    p = Profile(1, mode='thread', verbose=False)
+    with p:
+        busy(0.05)
+    path = tmp_path / 'stacks.txt'
+    p.export(path)
+    lines = path.read_text().splitlines()
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == p.count
+    f = io.StringIO()
+    p.export(f)
+    assert f.getvalue() == path.read_text()
+
+
+def test_max_depth():
+    def recurse(n):
+        if n:
+            return recurse(n - 1)
+        busy(0.05)
+
+    p = Profile(1, mode='thread', max_depth=5, verbose=False)
+    with p:
+        recurse(20)
+    assert p.samples
+    assert all(len(stack) <= 5 for stack in p.samples)
+
+
+def test_format_path():
+    assert _format_path(['a (x.py:1)', 'b (x.py:2)', 'b (x.py:2)', 'c (x.py:3)']) == 'a > b ×2 > c'
+
+
+def test_repr():
+    assert repr(Profile(mode='thread')) == '<Profile thread samples=0 locations=0>'
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from devtools import pytest_plugin
+
+config = "pytest_plugins = ['devtools.pytest_plugin']"
+# language=Python
+bench_test = """\
+import time
+
+import pytest
+
+
+def fast():
+    pass
+
+
+def slow():
+    time.sleep(0.0002)
+
+
+def test_fast(devtools_bench):
+    result = devtools_bench(fast, duration_=0.05, rounds_=10)
+    assert result.stats.count > 0
+
+
+def test_slow(devtools_bench):
+    devtools_bench(slow, duration_=0.05, rounds_=10, name_='slow')
+
+
+@pytest.mark.parametrize('x', range(3))
+def test_param(x):
+    pass
+"""
+
+
+@pytest.fixture(autouse=True)
+def reset_plugin_state():
+    yield
+    pytest_plugin.durations.clear()
+    pytest_plugin.bench_stats.clear()
+    pytest_plugin.bench_baseline = None
+
+
+def test_durations(pytester):
+    pytester.makeconftest(config)
+    pytester.makepyfile(bench_test)
+    result = pytester.runpytest('-p', 'no:pretty', '--devtools-durations=0')
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines(
+        [
+            '*= devtools durations =*',
+            'test * phase * count * mean * p50 * p90 * p99 * max * total',
+            'test_durations.py::test_param * setup * 3 *',
+            '* call * 3 *',
+            '* teardown * 3 *',
+        ]
+    )
+
+
+def test_durations_top(pytester):
+    pytester.makeconftest(config)
+    pytester.makepyfile(bench_test)
+    result = pytester.runpytest('-p', 'no:pretty', '--devtools-durations=1')
+    result.stdout.fnmatch_lines(['*= devtools durations (top 1) =*'])
+    assert 'test_durations_top.py::test_param' not in result.stdout.str()
+
+
+def test_no_durations(pytester):
+    pytester.makeconftest(config)
+    pytester.makepyfile(bench_test)
+    result = pytester.runpytest('-p', 'no:pretty')
+    assert 'devtools durations' not in result.stdout.str()
+
+
+def test_bench_save_compare(pytester):
+    pytester.makeconftest(config)
+    pytester.makepyfile(bench_test)
+    result = pytester.runpytest('-p', 'no:pretty', '--devtools-bench-save=bench.json')
+    result.assert_outcomes(passed=5)
+    data = json.loads((pytester.path / 'bench.json').read_text())
+    assert set(data['timers']) == {'test_bench_save_compare.py::test_fast', 'slow'}
+
+    # make "slow" look much faster in the baseline, "test_fast" isn't compared since it's only in the baseline
+    data['timers'] = {'slow': data['timers']['test_bench_save_compare.py::test_fast']}
+    (pytester.path / 'bench.json').write_text(json.dumps(data))
+    pytest_plugin.bench_stats.clear()
+
+    result = pytester.runpytest('-p', 'no:pretty', '--devtools-bench-compare=bench.json')
+    result.assert_outcomes(passed=4, failed=1)
+    result.stdout.fnmatch_lines(['*devtools-bench: slow is *% slower than the baseline (* -> * per call, p=*)'])
+
+    result = pytester.runpytest(
+        '-p', 'no:pretty', '--devtools-bench-compare=bench.json', '--devtools-bench-threshold=1000000'
+    )
+    result.assert_outcomes(passed=5)
+
+
+def test_bench_compare_missing(pytester):
+    pytester.makeconftest(config)
+    pytester.makepyfile(bench_test)
+    result = pytester.runpytest('-p', 'no:pretty', '--devtools-bench-compare=missing.json')
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(['*--devtools-bench-compare: unable to load baseline:*'])
+
+
+def test_bench_xdist(pytester):
+    pytest.importorskip('xdist')
+    pytester.makeconftest(config)
+    pytester.makepyfile(bench_test)
+    result = pytester.runpytest('-p', 'no:pretty', '-n', '2', '--devtools-bench-save=bench.json')
+    result.assert_outcomes(passed=5)
+    data = json.loads((pytester.path / 'bench.json').read_text())
+    assert set(data['timers']) == {'test_bench_xdist.py::test_fast', 'slow'}
@@ -0,0 +1,153 @@
+import pytest
+
+from devtools import Debug, debug
+from devtools.sampling import Sampler, parse_sample
+
+from .utils import normalise_output
+
+
+def test_every(capsys):
+    for i in range(7):
+        debug.every(3)(i)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_sampling.py:<line no> test_every\n'
+        '    i: 0 (int)\n'
+        'tests/test_sampling.py:<line no> test_every (2 calls suppressed)\n'
+        '    i: 3 (int)\n'
+        'tests/test_sampling.py:<line no> test_every (2 calls suppressed)\n'
+        '    i: 6 (int)\n'
+    )
+
+
+def test_every_return(capsys):
+    assert [debug.every(2)(i) for i in range(3)] == [0, 1, 2]
+    assert debug.every(2)(1, 2, a=3) == (1, 2, {'a': 3})
+    stdout, _ = capsys.readouterr()
+    assert stdout.count('tests/test_sampling.py:') == 3
+
+
+def test_once(capsys):
+    for i in range(5):
+        debug.once()(i)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == 'tests/test_sampling.py:<line no> test_once\n    i: 0 (int)\n'
+
+
+def test_sites_separate(capsys):
+    for i in range(3):
+        debug.once()(i)
+        debug.once()(i * 10)
+    stdout, _ = capsys.readouterr()
+    assert '    i: 0 (int)\n' in stdout
+    assert '    i * 10: 0 (int)\n' in stdout
+    assert stdout.count('test_sites_separate') == 2
+
+
+def test_rate(capsys):
+    for i in range(5):
+        debug.rate(0.001)(i)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == 'tests/test_sampling.py:<line no> test_rate\n    i: 0 (int)\n'
+
+
+def test_flush_suppressed(capsys):
+    debug_ = Debug()
+    for i in range(5):
+        debug_.once()(i)
+        debug_.every(3)(i)
+    capsys.readouterr()
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_sampling.py:<line no> test_flush_suppressed (4 calls suppressed)\n'
+        'tests/test_sampling.py:<line no> test_flush_suppressed (1 call suppressed)\n'
+    )
+    # counts are reset once reported
+    debug_.flush()
+    assert capsys.readouterr() == ('', '')
+
+
+def test_flush_suppressed_env(capsys, monkeypatch):
+    monkeypatch.setenv('PY_DEVTOOLS_SAMPLE', 'once')
+    debug_ = Debug()
+    for i in range(3):
+        debug_(i)
+    debug_.flush()
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_sampling.py:<line no> test_flush_suppressed_env\n'
+        '    i: 0 (int)\n'
+        'tests/test_sampling.py:<line no> test_flush_suppressed_env (2 calls suppressed)\n'
+    )
+
+
+def test_sampled_filter(capsys):
+    debug_ = Debug(filter='tests.*')
+    for i in range(3):
+        debug_.every(2)(i)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_sampling.py:<line no> test_sampled_filter\n'
+        '    i: 0 (int)\n'
+        'tests/test_sampling.py:<line no> test_sampled_filter (1 call suppressed)\n'
+        '    i: 2 (int)\n'
+    )
+
+
+def test_sampled_cached():
+    assert debug.every(5) is debug.every(5)
+    assert debug.every(5) is not debug.every(6)
+    assert repr(debug.every(5)) == '<SampledDebug <Sampler every 5>>'
+    assert repr(debug.once()) == '<SampledDebug <Sampler once>>'
+
+
+def test_env_default(capsys, monkeypatch):
+    monkeypatch.setenv('PY_DEVTOOLS_SAMPLE', 'every:2')
+    debug_ = Debug()
+    for i in range(4):
+        debug_(i)
+    stdout, _ = capsys.readouterr()
+    assert normalise_output(stdout) == (
+        'tests/test_sampling.py:<line no> test_env_default\n'
+        '    i: 0 (int)\n'
+        'tests/test_sampling.py:<line no> test_env_default (1 call suppressed)\n'
+        '    i: 2 (int)\n'
+    )
+
+
+def test_suppressed_total(capsys):
+    sampled = Debug().once()
+    for i in range(4):
+        sampled(i)
+    assert sampled.sampler.suppressed() == 3
+    sampled.sampler.reset()
+    assert sampled.sampler.suppressed() == 0
+
+
+@pytest.mark.parametrize(
+    'spec,mode,value',
+    [
+        ('every:10', 'every', 10),
+        ('10', 'every', 10),
+        ('once', 'once', 1),
+        ('RATE:2.5', 'rate', 2.5),
+    ],
+)
+def test_parse_sample(spec, mode, value):
+    sampler = parse_sample(spec)
+    assert sampler.mode == mode
+    assert sampler.value == value
+
+
+def test_parse_sample_empty():
+    assert parse_sample(None) is None
+    assert parse_sample(' ') is None
+    sampler = Sampler('once')
+    assert parse_sample(sampler) is sampler
+
+
+@pytest.mark.parametrize('spec', ['foobar:1', 'every:0', 'rate:x'])
+def test_parse_sample_invalid(spec):
+    with pytest.raises(ValueError, match='invalid sampling specification'):
+        parse_sample(spec)
@@ -0,0 +1,54 @@
+import json
+from enum import Enum
+
+import pytest
+
+from devtools.snapshot import Snapshot, load_snapshots, snapshot, snapshot_path, to_snapshot, update_snapshots
+
+
+class Colour(Enum):
+    red = 1
+
+
+def test_to_snapshot():
+    assert to_snapshot({'a': (1, 2.5, None), 3: {2, 1}, 'c': Colour.red, 'd': b'x'}) == {
+        'a': [1, 2.5, None],
+        '3': [1, 2],
+        'c': 'Colour.red',
+        'd': "b'x'",
+    }
+
+
+def test_snapshot_path(tmp_path):
+    assert snapshot_path(tmp_path / 'test_foo.py') == tmp_path / '__snapshots__' / 'test_foo.json'
+
+
+def test_update_and_compare(tmp_path):
+    path = tmp_path / '__snapshots__' / 'test_foo.json'
+    update_snapshots(path, {'b': [1, 2], 'a': {'x': 'y'}})
+    assert path.read_text() == '{\n  "a": {\n    "x": "y"\n  },\n  "b": [\n    1,\n    2\n  ]\n}\n'
+    update_snapshots(path, {'b': (3,)})
+    assert json.loads(path.read_text()) == {'a': {'x': 'y'}, 'b': [3]}
+
+    assert Snapshot(path, 'a') == {'x': 'y'}
+    assert Snapshot(path, 'b') == (3,)
+    assert Snapshot(path, 'b') != [4]
+    assert Snapshot(path, 'a') == Snapshot(path, 'a')
+    assert repr(Snapshot(path, 'a')) == "snapshot('a')"
+    with pytest.raises(KeyError, match="snapshot 'missing' not found in .*test_foo.json, use insert_assert"):
+        Snapshot(path, 'missing') == 1
+
+
+def test_load_cached(tmp_path):
+    path = tmp_path / 'snap.json'
+    assert load_snapshots(path) == {}
+    path.write_text('{"a": 1}')
+    first = load_snapshots(path)
+    assert first == {'a': 1}
+    assert load_snapshots(path) is first
+
+
+def test_snapshot_caller_file():
+    s = snapshot('foo')
+    assert s.path.name == 'test_snapshot.json'
+    assert s.path.parent.name == '__snapshots__'
@@ -1,12 +1,15 @@
+import asyncio
 import io
 import re
 import sys
+import threading
+from contextvars import copy_context
 from time import sleep
 
 import pytest
 
 from devtools import debug
-from devtools.timer import Timer
+from devtools.timer import Timer, TimerRegistry, TimerStats, _bucket_index, bucket_value, format_duration
 
 
 @pytest.mark.skipif(sys.platform != 'linux', reason='not on linux')
@@ -32,7 +35,7 @@ def test_multiple():
         '0.00X: 0.00Xs elapsed\n'
         '0.00X: 0.00Xs elapsed\n'
         '0.00X: 0.00Xs elapsed\n'
-        '3 times: mean=0.00Xs stdev=0.00Xs min=0.00Xs max=0.00Xs\n'
+        '3 times: mean=0.00Xs stdev=0.00Xs min=0.00Xs max=0.00Xs p50=0.00Xs p90=0.00Xs p99=0.00Xs p999=0.00Xs\n'
     )
 
 
@@ -54,7 +57,7 @@ def test_multiple_not_verbose():
         '    0.010s elapsed\n'
         '    0.020s elapsed\n'
         '    0.030s elapsed\n'
-        '3 times: mean=0.020s stdev=0.010s min=0.010s max=0.030s\n'
+        '3 times: mean=0.020s stdev=0.010s min=0.010s max=0.030s p50=0.020s p90=0.030s p99=0.030s p999=0.030s\n'
     )
 
 
@@ -63,9 +66,460 @@ def test_unfinished_summary():
     t = Timer(file=f).start()
     t.summary()
     v = f.getvalue()
-    assert v == '1 times: mean=0.000s stdev=0.000s min=0.000s max=0.000s\n'
+    assert v == '1 times: mean=0.000s stdev=0.000s min=0.000s max=0.000s p50=0.000s p90=0.000s p99=0.000s p999=0.000s\n'
 
 
 def test_summary_not_started():
     with pytest.raises(RuntimeError):
         Timer().summary()
+
+
+def test_streaming():
+    f = io.StringIO()
+    t = Timer(file=f, streaming=True)
+    for _ in range(1000):
+        with t(verbose=False):
+            pass
+    assert t.results == []
+    assert t.stats.count == 1000
+    assert t.summary(verbose=True) == []
+    v = f.getvalue()
+    assert re.fullmatch(
+        r'1000 times: mean=0\.000s stdev=0\.000s min=0\.000s max=0\.\d{3}s '
+        r'p50=0\.000s p90=0\.000s p99=0\.\d{3}s p999=0\.\d{3}s\n',
+        v,
+    ), v
+
+
+def test_streaming_nested():
+    f = io.StringIO()
+    t = Timer(file=f, streaming=True)
+    t.start('outer')
+    with t('inner'):
+        pass
+    assert t.stats.count == 1
+    t.capture()
+    assert t.stats.count == 2
+    assert f.getvalue().startswith('inner: 0.000s elapsed\nouter: 0.000s elapsed\n')
+
+
+def test_streaming_unfinished_summary():
+    f = io.StringIO()
+    t = Timer(file=f, streaming=True).start()
+    t.summary()
+    assert f.getvalue() == (
+        '1 times: mean=0.000s stdev=0.000s min=0.000s max=0.000s p50=0.000s p90=0.000s p99=0.000s p999=0.000s\n'
+    )
+
+
+def test_streaming_not_started():
+    with pytest.raises(RuntimeError):
+        Timer(streaming=True).summary()
+
+
+def test_stats():
+    stats = TimerStats()
+    values = [i * 1_000 for i in range(1, 1001)]
+    for v in values:
+        stats.add(v)
+    assert stats.count == 1000
+    assert stats.total == sum(values)
+    assert stats.mean == 500_500
+    assert stats.min == 1_000
+    assert stats.max == 1_000_000
+    assert abs(stats.stdev - 288_819.43) < 1
+    assert abs(stats.percentile(0.5) - 500_000) / 500_000 < 0.016
+    assert abs(stats.percentile(0.99) - 990_000) / 990_000 < 0.016
+    assert stats.percentile(1) == 1_000_000
+    assert TimerStats().percentile(0.5) == 0
+
+
+def test_stats_merge():
+    a, b, both = TimerStats(), TimerStats(), TimerStats()
+    for i in range(100):
+        (a if i % 3 else b).add(i * 7)
+        both.add(i * 7)
+    a.merge(b)
+    a.merge(TimerStats())
+    assert a.count == both.count
+    assert a.min == both.min
+    assert a.max == both.max
+    assert abs(a.mean - both.mean) < 1e-9
+    assert abs(a.stdev - both.stdev) < 1e-9
+    assert a.histogram() == both.histogram()
+
+
+def test_stats_merge_while_recording():
+    for _ in range(20):
+        recording = TimerStats()
+
+        def record():
+            # a new bucket for every sample
+            for i in range(1, 500):
+                recording.add(int(1.04**i))
+
+        thread = threading.Thread(target=record)
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            thread.start()
+            while thread.is_alive():
+                TimerStats().merge(recording)
+        finally:
+            sys.setswitchinterval(switch_interval)
+            thread.join()
+        merged = TimerStats()
+        merged.merge(recording)
+        assert merged.histogram() == recording.histogram()
+
+
+def test_timers_dont_grow_context():
+    with Timer(verbose=False):
+        pass
+    context_size = len(copy_context())
+    for _ in range(100):
+        with Timer(verbose=False):
+            pass
+    assert len(copy_context()) == context_size
+
+
+def test_nested_timers():
+    outer, inner = Timer(verbose=False), Timer(verbose=False)
+    outer.start('a')
+    inner.start('b')
+    outer.start('c')
+    assert outer.capture()._name == 'c'
+    assert outer.capture()._name == 'a'
+    assert inner.capture()._name == 'b'
+
+
+def test_registry_threads():
+    timers = TimerRegistry()
+
+    def run():
+        for _ in range(5000):
+            with timers.span('x'):
+                pass
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    stats = timers.stats['x']
+    assert stats.count == 40_000
+    assert sum(n for _, n in stats.histogram()) == 40_000
+    assert timers.tree[('x',)].stats.count == 40_000
+
+
+def test_bucket_values():
+    for ns in [0, 1, 63, 64, 65, 1_000, 123_456_789, 10**12]:
+        index = _bucket_index(ns)
+        assert bucket_value(index) <= ns < bucket_value(index + 1)
+
+
+def test_result_times():
+    r = Timer().start().results[0]
+    assert r.finish is None
+    assert r.elapsed_ns() == -1
+    r.capture()
+    assert r.finish >= r.start
+    assert r.elapsed_ns() >= 0
+
+
+def test_registry_call():
+    t = debug.timer('foo', verbose=False)
+    assert isinstance(t, Timer)
+    assert t is not debug.timer('foo')
+
+
+def test_measure():
+    timers = TimerRegistry()
+
+    @timers.measure()
+    def add(a, b):
+        return a + b
+
+    @timers.measure('named')
+    def fails():
+        raise ValueError('boom')
+
+    assert add.__name__ == 'add'
+    assert [add(i, 1) for i in range(5)] == [1, 2, 3, 4, 5]
+    with pytest.raises(ValueError):
+        fails()
+    assert set(timers.stats) == {'test_measure.<locals>.add', 'named'}
+    assert timers.stats['test_measure.<locals>.add'].count == 5
+    assert timers.stats['named'].count == 1
+
+
+def test_measure_async():
+    timers = TimerRegistry()
+
+    @timers.measure('coro')
+    async def coro(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    assert asyncio.run(coro(2)) == 4
+    assert timers.stats['coro'].count == 1
+
+
+def test_span_report():
+    f = io.StringIO()
+    timers = TimerRegistry(file=f)
+    for _ in range(3):
+        with timers.span('quick'):
+            pass
+    with timers.span('slow'):
+        sleep(0.01)
+    assert timers.stats['quick'].count == 3
+    timers.report()
+    lines = f.getvalue().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith('slow: total=')
+    assert re.fullmatch(r'quick: total=\S+ \(\d\.\d%\) self=\S+ \(\d\.\d%\) calls=3 mean=\S+ p99=\S+', lines[1])
+    timers.reset()
+    assert timers.stats == {}
+    assert timers.tree == {}
+
+
+def test_span_tree():
+    f = io.StringIO()
+    timers = TimerRegistry(file=f)
+
+    @timers.measure('work')
+    def work():
+        with timers.span('fast'):
+            pass
+        with timers.span('slow'):
+            sleep(0.002)
+
+    with timers.span('outer'):
+        work()
+        work()
+        with timers.span('direct'):
+            pass
+
+    assert set(timers.tree) == {
+        ('outer',),
+        ('outer', 'work'),
+        ('outer', 'work', 'fast'),
+        ('outer', 'work', 'slow'),
+        ('outer', 'direct'),
+    }
+    outer = timers.tree[('outer',)]
+    work_stats = timers.tree[('outer', 'work')]
+    slow = timers.tree[('outer', 'work', 'slow')]
+    assert work_stats.stats.count == 2
+    assert outer.stats.total >= work_stats.stats.total >= slow.stats.total >= 4_000_000
+    assert slow.self_ns == slow.stats.total
+    assert work_stats.self_ns < work_stats.stats.total - slow.stats.total + 1
+    assert timers.stats['fast'].count == 2
+
+    timers.report()
+    v = re.sub(r'total=\S+ \(\d+\.\d%\) self=\S+ \(\d+\.\d%\) calls=(\d) mean=\S+ p99=\S+', r'\1', f.getvalue())
+    assert v.splitlines() == [
+        'outer: 1',
+        '    work: 2',
+        '        slow: 2',
+        '        fast: 2',
+        '    direct: 1',
+    ]
+    assert 'outer: total=' in f.getvalue()
+    assert '(100.0%)' in f.getvalue()
+
+
+def test_span_tasks():
+    timers = TimerRegistry()
+
+    async def child(name):
+        with timers.span(name):
+            await asyncio.sleep(0.001)
+
+    async def main():
+        with timers.span('main'):
+            await asyncio.gather(child('a'), child('b'))
+        with timers.span('after'):
+            pass
+
+    asyncio.run(main())
+    assert set(timers.tree) == {('main',), ('main', 'a'), ('main', 'b'), ('after',)}
+
+
+def test_span_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    timers = TimerRegistry()
+
+    def run(i):
+        with timers.span('thread'):
+            with timers.span('inner'):
+                pass
+
+    with timers.span('main'):
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(run, range(8)))
+
+    # threads don't inherit the context of the thread which started them
+    assert set(timers.tree) == {('main',), ('thread',), ('thread', 'inner')}
+    assert timers.tree[('thread', 'inner')].stats.count == 8
+
+
+@pytest.mark.parametrize(
+    'ns,expected',
+    [
+        (5, '5.000ns'),
+        (1_500, '1.500us'),
+        (25_000_000, '25.00ms'),
+        (123_400_000, '123.4ms'),
+        (2_000_000_000, '2.000s'),
+        (0, '0.000ns'),
+    ],
+)
+def test_format_duration(ns, expected):
+    assert format_duration(ns) == expected
+
+
+def test_resources():
+    import gc
+
+    f = io.StringIO()
+    t = debug.timer(name='res', file=f, cpu=True, gc=True, memory=True)
+    for _ in range(2):
+        with t:
+            data = [object() for _ in range(10_000)]
+            gc.collect()
+    r = t.results[0].resources
+    assert r.cpu_ns > 0
+    assert r.thread_ns > 0
+    assert r.gc_collections >= 1
+    assert r.memory_delta > 0
+    assert r.memory_peak >= r.memory_delta
+    assert re.fullmatch(
+        r'res: \d\.\d{3}s elapsed cpu=\d\.\d{3}s thread=\d\.\d{3}s gc=\d+ \(\d\.\d{3}s\) mem=\+\d+\.\dKiB peak=\S+\n',
+        f.getvalue().splitlines(keepends=True)[0],
+    )
+    f.truncate(0)
+    t.summary()
+    assert re.search(r' cpu mean=\d\.\d{3}s gc=\d+ \(\d\.\d{3}s\) mem mean=\+\S+ peak max=\S+\n$', f.getvalue())
+    del data
+
+
+def test_resources_cleanup():
+    import gc
+    import tracemalloc
+
+    n_callbacks = len(gc.callbacks)
+    t = Timer(gc=True, memory=True, verbose=False, streaming=True)
+    with t:
+        assert len(gc.callbacks) == n_callbacks + 1
+        assert tracemalloc.is_tracing()
+    assert len(gc.callbacks) == n_callbacks
+    assert not tracemalloc.is_tracing()
+    assert t.resource_totals.count == 1
+
+
+def test_no_resources():
+    t = Timer(verbose=False)
+    with t:
+        pass
+    assert t.results[0].resources is None
+
+
+def test_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    t = Timer(verbose=False)
+    barrier = threading.Barrier(4)
+
+    def run(i):
+        with t(verbose=False):
+            # all threads have started before any captures
+            barrier.wait()
+            sleep(0.001 * i)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(run, range(4)))
+    assert len(t.results) == 4
+    assert all(r.finish is not None for r in t.results)
+    assert [r.start for r in t.results] == sorted(r.start for r in t.results)
+
+
+def test_threads_streaming():
+    from concurrent.futures import ThreadPoolExecutor
+
+    t = Timer(streaming=True, verbose=False)
+
+    def run(i):
+        for _ in range(100):
+            with t:
+                pass
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(run, range(8)))
+    assert t.stats.count == 800
+    assert t.results == []
+
+
+def test_tasks():
+    t = Timer(verbose=False)
+
+    async def run(delay):
+        t.start(name=f'task-{delay}')
+        await asyncio.sleep(delay)
+        return t.capture()
+
+    async def main():
+        return await asyncio.gather(run(0.02), run(0.001))
+
+    slow, fast = asyncio.run(main())
+    assert slow._name == 'task-0.02'
+    assert fast._name == 'task-0.001'
+    assert slow.elapsed() > fast.elapsed()
+
+
+def test_capture_other_thread():
+    t = Timer(verbose=False).start()
+    thread = threading.Thread(target=t.capture)
+    thread.start()
+    thread.join()
+    assert t.results[0].finish is not None
+    with pytest.raises(RuntimeError, match='timer not started'):
+        t.capture()
+
+
+def _dump_worker(directory):
+    t = Timer('worker', streaming=True, verbose=False)
+    for _ in range(10):
+        with t:
+            pass
+    t.dump(directory)
+
+
+def test_dump_collect(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(2) as pool:
+        list(pool.map(_dump_worker, [tmp_path] * 3))
+
+    t = Timer('worker', streaming=True, verbose=False)
+    with t:
+        pass
+    own_path = t.dump(tmp_path)
+    t.collect(tmp_path)
+    # workers processes may be reused, each dumps its own cumulative stats
+    assert t.stats.count in {21, 31}
+    assert t.stats_by_name()['worker'].count == t.stats.count
+    t.collect(tmp_path)
+    assert t.stats.count in {21, 31}
+
+    other = Timer(verbose=False)
+    other.collect(tmp_path)
+    assert own_path.exists()
+    assert other.stats.count == t.stats.count
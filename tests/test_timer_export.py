@@ -0,0 +1,73 @@
+import io
+import json
+import os
+import threading
+
+import pytest
+
+from devtools.timer import TimerRegistry
+from devtools.timer_export import ChromeTraceExporter, CollapsedStackExporter, SpanExporter
+
+
+def run_spans(timers):
+    with timers.span('outer'):
+        with timers.span('inner'):
+            pass
+        with timers.span('inner'):
+            pass
+
+
+def test_chrome_trace(tmp_path):
+    path = tmp_path / 'trace.json'
+    timers = TimerRegistry()
+    with timers.export(path) as exporter:
+        assert isinstance(exporter, ChromeTraceExporter)
+        run_spans(timers)
+    assert timers.exporters == []
+    assert exporter.count == 3
+
+    events = json.loads(path.read_text())
+    assert [(e['name'], e['args']['path'], e['args']['depth']) for e in events] == [
+        ('inner', 'outer;inner', 1),
+        ('inner', 'outer;inner', 1),
+        ('outer', 'outer', 0),
+    ]
+    inner, _, outer = events
+    assert all(e['ph'] == 'X' for e in events)
+    assert all(e['pid'] == os.getpid() and e['tid'] == threading.get_ident() for e in events)
+    assert outer['ts'] <= inner['ts']
+    assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+    # spans after the export is closed aren't written
+    run_spans(timers)
+    assert len(json.loads(path.read_text())) == 3
+
+
+def test_chrome_trace_empty():
+    f = io.StringIO()
+    TimerRegistry().export(f).close()
+    assert json.loads(f.getvalue()) == []
+
+
+def test_collapsed(tmp_path):
+    path = tmp_path / 'stacks.txt'
+    timers = TimerRegistry()
+    exporter = timers.export(str(path), format='collapsed')
+    assert isinstance(exporter, CollapsedStackExporter)
+    run_spans(timers)
+    with timers.span('semi;colon'):
+        pass
+    exporter.close()
+    lines = path.read_text().splitlines()
+    assert [line.rsplit(' ', 1)[0] for line in lines] == ['outer;inner', 'outer;inner', 'outer', 'semi:colon']
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError, match="invalid export format 'foobar', should be one of: chrome, collapsed"):
+        TimerRegistry().export(io.StringIO(), format='foobar')
+
+
+def test_exporter_abstract():
+    with pytest.raises(TypeError, match='abstract'):
+        SpanExporter(io.StringIO())